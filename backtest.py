@@ -1,6 +1,11 @@
+import os
+import sys
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stock_return_estimator_backend'))
+from strategy import run_strategy
+
 # Load data & features (same as training)
 df = pd.read_csv('data/AAPL_features.csv', index_col=0, parse_dates=True)
 X = df.drop(columns=['Return'])
@@ -11,9 +16,10 @@ model = LinearRegression().fit(X, y)
 df['Pred'] = model.predict(X)
 
 # Strategy: If Pred > 0, go long; else, stay out
-df['Strategy_Return'] = df['Pred'].apply(lambda p: 1 if p > 0 else 0) * df['Return']
-df['Cumulative_Strategy'] = (1 + df['Strategy_Return']).cumprod()
-df['Cumulative_Market'] = (1 + df['Return']).cumprod()
+result = run_strategy(df['Pred'].to_numpy(), df['Return'].to_numpy())
+df['Strategy_Return'] = result['strategy_returns']
+df['Cumulative_Strategy'] = result['cumulative_strategy']
+df['Cumulative_Market'] = result['cumulative_market']
 
 # Plot
 import matplotlib.pyplot as plt
@@ -1,8 +1,10 @@
 import yfinance as yf
 import pandas as pd
 
-def fetch_data(ticker, start, end):
-    df = yf.download(ticker, start=start, end=end)
+def fetch_data(ticker, start, end, interval='1d'):
+    df = yf.download(ticker, start=start, end=end, interval=interval)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
     df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
     df.dropna(inplace=True)
     return df
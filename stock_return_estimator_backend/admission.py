@@ -0,0 +1,210 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+import pandas as pd
+
+from bars import INTRADAY_INTERVALS, interval_seconds
+from budget import MEMORY_POLICY, max_bars
+import montecarlo
+from risk import BOOTSTRAP_MAX_RESAMPLES
+
+# Cost-aware admission control. Each request's compute cost is estimated from
+# its parameters (bars in the date range, features, tickers, sweep, bootstrap
+# and forecast sizes) in rough CPU-seconds, fitted to `python -m benchmarks.run`
+# timings. A client's token bucket refills at ADMISSION_CLIENT_BUDGET per
+# minute and may run into debt for one large request; an empty bucket gets
+# 429. Admitted requests then share ADMISSION_GLOBAL_BUDGET of in-flight cost;
+# when it is used up they wait in a priority queue (interactive before
+# standard before bulk, then first come first served) for up to
+# ADMISSION_MAX_WAIT seconds before getting 503.
+ADMISSION_CLIENT_BUDGET = float(os.getenv('ADMISSION_CLIENT_BUDGET', 30))   # cost units per client per minute
+ADMISSION_GLOBAL_BUDGET = float(os.getenv('ADMISSION_GLOBAL_BUDGET', 2 * (os.cpu_count() or 2)))  # in flight
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 64))
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 10))
+
+INTERACTIVE, STANDARD, BULK = 0, 1, 2
+DEFAULT_COST = 0.01      # routes without an estimator (model listing, job status, ...)
+DEFAULT_DAYS = 365       # the app's default range
+TRADING_SECONDS = 6.5 * 3600
+FEATURE_COUNT = 13       # len(utils.ALL_FEATURES)
+REBALANCES_PER_YEAR = {'W': 52, 'M': 12, 'Q': 4, 'Y': 1}
+
+
+class Rejected(Exception):
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+# --- Cost estimates ---
+
+def _days(data):
+    try:
+        days = (pd.Timestamp(data['end']) - pd.Timestamp(data['start'])).days
+    except (KeyError, TypeError, ValueError):
+        days = DEFAULT_DAYS
+    return max(days, 1)
+
+
+def _bars(data, request_type=None):
+    """Bars a request will process, capped by the memory budget when it degrades"""
+    interval = data.get('interval') or '1d'
+    per_day = TRADING_SECONDS / interval_seconds(interval) if interval in INTRADAY_INTERVALS else 1
+    bars = _days(data) * 252 / 365 * per_day
+    if request_type and MEMORY_POLICY == 'degrade':
+        bars = min(bars, max_bars(request_type))
+    return bars
+
+
+def _count(value, default=0):
+    return len(value) if isinstance(value, (list, tuple, dict)) else default
+
+
+def predict_cost(data):
+    features = _count(data.get('features'), FEATURE_COUNT)
+    cost = 0.03 + _bars(data, 'predict') * 2e-6 * (FEATURE_COUNT + features)
+    try:
+        forecast = montecarlo.options(data.get('forecast'))
+    except ValueError:
+        forecast = None
+    if forecast:
+        cost += forecast['horizon'] * forecast['paths'] * 5e-8
+    return cost
+
+
+def backtest_cost(data):
+    bars = _bars(data, 'backtest')
+    cost = 0.03 + bars * 3e-6 * (FEATURE_COUNT + _count(data.get('features'), FEATURE_COUNT))
+    cost += bars * 2e-6 * _count(data.get('cost_sweep'))
+    try:
+        # Out-of-range counts are rejected by the view, so they do not count against the budget
+        resamples = int(data.get('bootstrap') or 0)
+        cost += (resamples if resamples <= BOOTSTRAP_MAX_RESAMPLES else 0) * bars * 5e-8
+    except (TypeError, ValueError):
+        pass
+    return cost
+
+
+def optimize_cost(data):
+    return 0.02 + 0.05 * (_count(data.get('tickers')) / 100) ** 3
+
+
+def portfolio_backtest_cost(data):
+    n = _count(data.get('tickers'))
+    every = str(data.get('rebalance', 'M'))
+    years = _days(data) / 365
+    rebalances = years * 252 / int(every) if every.isdigit() and int(every) > 0 else years * REBALANCES_PER_YEAR.get(every.upper(), 12)
+    return 0.05 + rebalances * 0.012 * max(n / 100, 0.1) ** 2 + n * 0.005
+
+
+def screen_cost(data):
+    return 0.02 + 0.05 * _count(data.get('tickers'))
+
+
+# --- Budgets ---
+
+class Admission:
+    """Per-client token buckets and a global in-flight budget with a priority wait queue"""
+
+    def __init__(self, client_budget=ADMISSION_CLIENT_BUDGET, global_budget=ADMISSION_GLOBAL_BUDGET,
+                 max_queue=ADMISSION_MAX_QUEUE, max_wait=ADMISSION_MAX_WAIT):
+        self.client_budget = client_budget
+        self.global_budget = global_budget
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.buckets = {}      # client -> (tokens, updated_at)
+        self.in_flight = 0.0
+        self.waiting = []      # heap of [priority, seq, charge]
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+
+    def _tokens(self, client, now):
+        tokens, updated = self.buckets.get(client, (self.client_budget, now))
+        return min(self.client_budget, tokens + (now - updated) * self.client_budget / 60)
+
+    def _charge(self, client, cost, now):
+        tokens = self._tokens(client, now)
+        if tokens <= 0:
+            raise Rejected(429, 'Compute budget exceeded. Please try again later.',
+                           -tokens * 60 / self.client_budget + 1)
+        if len(self.buckets) > 10000:
+            # Forget clients whose buckets have refilled
+            self.buckets = {c: b for c, b in self.buckets.items() if self._tokens(c, now) < self.client_budget}
+        self.buckets[client] = (tokens - cost, now)
+
+    def acquire(self, client, cost, priority=INTERACTIVE):
+        """Block until the request may run; returns the in-flight charge to release, or raises Rejected"""
+        now = time.monotonic()
+        charge = min(cost, self.global_budget)  # anything larger runs alone
+        with self.cond:
+            if self.client_budget > 0:
+                self._charge(client, cost, now)
+            if self.global_budget <= 0 or (not self.waiting and self.in_flight + charge <= self.global_budget):
+                self.in_flight += charge
+                return charge
+            if len(self.waiting) >= self.max_queue:
+                self._refund(client, cost)
+                raise Rejected(503, 'Server is busy. Please try again shortly.', self.max_wait)
+            entry = [priority, next(self.seq), charge]
+            heapq.heappush(self.waiting, entry)
+            deadline = now + self.max_wait
+            while True:
+                if self.waiting[0] is entry and self.in_flight + charge <= self.global_budget:
+                    heapq.heappop(self.waiting)
+                    self.in_flight += charge
+                    self.cond.notify_all()
+                    return charge
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.waiting.remove(entry)
+                    heapq.heapify(self.waiting)
+                    self.cond.notify_all()
+                    self._refund(client, cost)
+                    raise Rejected(503, 'Server is busy. Please try again shortly.', self.max_wait)
+                self.cond.wait(remaining)
+
+    def _refund(self, client, cost):
+        if client in self.buckets:
+            tokens, updated = self.buckets[client]
+            self.buckets[client] = (tokens + cost, updated)
+
+    def release(self, charge):
+        if not charge:
+            return
+        with self.cond:
+            self.in_flight = max(self.in_flight - charge, 0.0)
+            self.cond.notify_all()
+
+
+controller = Admission()
+
+
+def cost(estimate, priority=INTERACTIVE):
+    """Route decorator: estimate(json_body) -> cost units, and the route's queue priority"""
+    def register(view):
+        view.admission_cost = (estimate, priority)
+        return view
+    return register
+
+
+def exempt(view):
+    """Route decorator for long-lived or monitoring routes that bypass admission control"""
+    view.admission_cost = None
+    return view
+
+
+def admit(view, data, client):
+    """Acquire a budget for a request to `view`; returns the charge to release afterwards"""
+    spec = getattr(view, 'admission_cost', (None, INTERACTIVE))
+    if spec is None:
+        return None
+    estimate, priority = spec
+    try:
+        units = estimate(data) if estimate else DEFAULT_COST
+    except Exception:
+        units = DEFAULT_COST  # malformed parameters fail fast in the view
+    return controller.acquire(client, units, priority)
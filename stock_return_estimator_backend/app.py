@@ -1,7 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
-from utils import fetch_and_predict, save_model, load_model, list_models, run_backtest, optimize_portfolio, get_stock_sentiment, delete_model
+from utils import save_model, load_model, list_models, get_stock_sentiment, fetch_news_sentiment, delete_model, load_prices, predict_prices, select_features, backtest_prices, load_portfolio_prices, optimize_prices, price_panel, backtest_portfolio_prices, screen_universe, movers_board, load_recent_bars
+from executors import run_io, run_cpu
+from risk import DEFAULT_MAX_POINTS, bootstrap_options
+from tracing import span, record_cache, start_request_timings, format_timings, format_server_timing, render_prometheus
+import profiling
+import encoding
+import snapshots
+import movers
+import jobs
+import job_events
+import admission
+import montecarlo
+from admission import INTERACTIVE, STANDARD, BULK
+import json
+from budget import MemoryBudgetError
+import asyncio
 import os
+import time
 import requests
 from datetime import datetime, timedelta
 from flask_limiter import Limiter
@@ -9,14 +25,14 @@ from flask_limiter.util import get_remote_address
 from flasgger import Swagger
 
 app = Flask(__name__)
+app.json = encoding.JSONProvider(app)  # Chart series are encoded at response time
 CORS(app)  # Allow Flutter web/app to access this
 swagger = Swagger(app)
 
-# Add rate limiting: 30 requests per minute per IP
+# Request admission is cost-based (admission.py); the limiter only guards the admin routes
 limiter = Limiter(
     get_remote_address,
-    app=app,
-    default_limits=["30 per minute"]
+    app=app
 )
 
 # Simple in-memory cache for daily updates
@@ -26,9 +42,79 @@ cache = {
 }
 
 NODE_API_BASE = 'http://localhost:3000/nse'  # Example: replace with your deployed Node.js API
+MOVERS_PROVIDER = os.getenv('MOVERS_PROVIDER', 'local')  # 'local' (bar store) or 'node' (NODE_API_BASE proxy)
+MOVERS_TOP = 20
+
+def timed_jsonify(payload, timings=None):
+    """Serialize a response as JSON, or as MessagePack when the client's Accept header asks for it"""
+    with span('serialize'):
+        if timings is not None:
+            payload['timings'] = format_timings(timings)
+        if encoding.wants_msgpack(request.headers.get('Accept')):
+            response = Response(encoding.pack(payload), mimetype='application/msgpack')
+        else:
+            response = jsonify(payload)
+        response.vary.add('Accept')
+    if timings is not None:
+        # The body's block is written before serialization ends; the header also has 'serialize'
+        response.headers['Server-Timing'] = format_server_timing(timings)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-compress larger bodies for clients that send Accept-Encoding"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers or not encoding.is_compressible(response.mimetype)):
+        return response
+    body, content_encoding = encoding.compress(response.get_data(), request.headers.get('Accept-Encoding'))
+    if content_encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = content_encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def wants_timings(data):
+    return bool(data.get('timings') or request.args.get('timings'))
+
+@app.before_request
+def start_profile():
+    flag = request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+    g.profile = profiling.begin(flag, request.headers.get('X-Admin-Token'))
+
+@app.after_request
+def finish_profile(response):
+    profile_id = profiling.end(g.pop('profile', None), request.method, request.path, response.status_code)
+    if profile_id:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@app.teardown_request
+def abort_profile(exc):
+    # Only reached with a live profile if the view raised before after_request ran
+    profiling.end(g.pop('profile', None), request.method, request.path, 500)
+
+@app.before_request
+def admit_request():
+    """Charge the request's estimated cost to its client and wait for global capacity"""
+    view = app.view_functions.get(request.endpoint)
+    if view is None or request.method == 'OPTIONS':
+        return None
+    try:
+        g.admission = admission.admit(view, request.get_json(silent=True) or {}, get_remote_address())
+    except admission.Rejected as e:
+        response = jsonify({'status': 'error', 'message': str(e)})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(int(e.retry_after + 0.5))
+        return response
+    return None
+
+@app.teardown_request
+def release_admission(exc):
+    admission.controller.release(g.pop('admission', None))
 
 @app.route('/predict', methods=['POST'])
-def predict():
+@admission.cost(admission.predict_cost, INTERACTIVE)
+async def predict():
     """
     Predict stock returns using the selected model and features.
     ---
@@ -57,9 +143,45 @@ def predict():
             model_name:
               type: string
               example: latest_model.pkl
+            interval:
+              type: string
+              example: 1d
+              description: Bar interval (1m, 5m, 15m, 30m, 60m, 1d, 1wk). Intraday data is limited by yfinance to recent days.
+            resample:
+              type: string
+              example: 15m
+              description: Optional coarser interval to aggregate the bars to
+            forecast:
+              type: object
+              description: Optional Monte Carlo forecast (true for the defaults, a horizon in bars, or an object). Adds quantile bands of the next closes.
+              properties:
+                horizon:
+                  type: integer
+                  example: 60
+                paths:
+                  type: integer
+                  example: 100000
+                seed:
+                  type: integer
+                  example: 0
+                volatility:
+                  type: string
+                  example: garch
+                  description: garch (residuals rescaled by GARCH(1,1) volatility) or bootstrap (residuals as they are)
+            timings:
+              type: boolean
+              example: false
+              description: Include per-stage timings (ms) in the response
+    produces:
+      - application/json
+      - application/msgpack
     responses:
       200:
-        description: Prediction result
+        description: Prediction result (truncated_bars is set when the range was cut to the memory budget)
+      400:
+        description: Invalid forecast options
+      413:
+        description: Date range exceeds the per-request memory budget (MEMORY_POLICY=reject)
       500:
         description: Error
     """
@@ -69,10 +191,26 @@ def predict():
     end = data.get("end")
     features = data.get("features")  # Optional
     model_name = data.get("model_name")  # Optional
+    interval = data.get("interval", "1d")
+    resample = data.get("resample")  # Optional
+    timings = start_request_timings(wants_timings(data))
+    try:
+        forecast = montecarlo.options(data.get("forecast"))  # Optional
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
     try:
-        result = fetch_and_predict(ticker, start, end, features, model_name)
-        return jsonify({"status": "success", "data": result})
+        # Default-model daily requests can be answered from the nightly snapshot
+        if model_name is None and interval == "1d" and not resample and forecast is None:
+            result = await run_io(snapshots.get, ticker, start, end, select_features(features))
+            record_cache('snapshots', result is not None)
+            if result is not None:
+                return timed_jsonify({"status": "success", "data": result}, timings)
+        df = await run_io(load_prices, ticker, start, end, interval, resample)
+        result = await run_cpu(predict_prices, df, features, model_name, forecast=forecast)
+        return timed_jsonify({"status": "success", "data": result}, timings)
+    except MemoryBudgetError as e:
+        return jsonify({"status": "error", "message": str(e)}), 413
     except Exception as e:
         import traceback
         traceback.print_exc()  # This will print the full error in your terminal
@@ -165,8 +303,43 @@ def list_models_route():
         traceback.print_exc()
         return jsonify({"status": "error", "message": str(e)}), 500
 
+async def node_movers(kind):
+    """Proxy the movers list from the Node.js NSE service, cached for 10 minutes"""
+    now = datetime.now()
+    if cache[kind]['data'] and cache[kind]['timestamp'] and (now - cache[kind]['timestamp']) < timedelta(minutes=10):
+        record_cache('movers', True)
+        return cache[kind]['data']
+    record_cache('movers', False)
+    resp = await run_io(requests.get, f'{NODE_API_BASE}/get_{kind}', timeout=10)
+    resp.raise_for_status()
+    data = resp.json()
+    cache[kind] = {'data': data, 'timestamp': now}
+    return data
+
+async def local_movers(kind):
+    """Rank the movers universe from the bar store, refreshing its bars every MOVERS_TTL seconds"""
+    stale = movers_board.stale()
+    record_cache('movers', not stale)
+    if stale:
+        # Tickers that fail to download just drop out of the ranking
+        await asyncio.gather(*(run_io(load_recent_bars, t) for t in movers.universe()), return_exceptions=True)
+        movers_board.refreshed_at = time.time()
+    if not len(movers_board):
+        raise RuntimeError('No price data available for the movers universe.')
+    return movers_board.top(MOVERS_TOP, losers=(kind == 'losers'))
+
+async def movers_response(kind):
+    try:
+        if MOVERS_PROVIDER == 'node':
+            data = await node_movers(kind)
+        else:
+            data = await local_movers(kind)
+        return jsonify({'status': 'success', 'data': data})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/api/top_gainers', methods=['GET'])
-def top_gainers():
+async def top_gainers():
     """
     Get top gainers from the stock market.
     ---
@@ -174,25 +347,14 @@ def top_gainers():
       - Market Data
     responses:
       200:
-        description: Top gainers
+        description: Top gainers by latest daily percent change (symbol, price, change, percent, volume, high52, low52)
       500:
         description: Error
     """
-    now = datetime.now()
-    # Cache for 10 minutes
-    if cache['gainers']['data'] and cache['gainers']['timestamp'] and (now - cache['gainers']['timestamp']) < timedelta(minutes=10):
-        return jsonify({'status': 'success', 'data': cache['gainers']['data']})
-    try:
-        resp = requests.get(f'{NODE_API_BASE}/get_gainers', timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        cache['gainers'] = {'data': data, 'timestamp': now}
-        return jsonify({'status': 'success', 'data': data})
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    return await movers_response('gainers')
 
 @app.route('/api/top_losers', methods=['GET'])
-def top_losers():
+async def top_losers():
     """
     Get top losers from the stock market.
     ---
@@ -200,24 +362,15 @@ def top_losers():
       - Market Data
     responses:
       200:
-        description: Top losers
+        description: Top losers by latest daily percent change (symbol, price, change, percent, volume, high52, low52)
       500:
         description: Error
     """
-    now = datetime.now()
-    if cache['losers']['data'] and cache['losers']['timestamp'] and (now - cache['losers']['timestamp']) < timedelta(minutes=10):
-        return jsonify({'status': 'success', 'data': cache['losers']['data']})
-    try:
-        resp = requests.get(f'{NODE_API_BASE}/get_losers', timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        cache['losers'] = {'data': data, 'timestamp': now}
-        return jsonify({'status': 'success', 'data': data})
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    return await movers_response('losers')
 
 @app.route('/backtest', methods=['POST'])
-def backtest():
+@admission.cost(admission.backtest_cost, STANDARD)
+async def backtest():
     """
     Run a backtest on the selected strategy and model.
     ---
@@ -246,6 +399,18 @@ def backtest():
             model_name:
               type: string
               example: latest_model.pkl
+            interval:
+              type: string
+              example: 1d
+              description: Bar interval (1m, 5m, 15m, 30m, 60m, 1d, 1wk). Intraday data is limited by yfinance to recent days.
+            resample:
+              type: string
+              example: 15m
+              description: Optional coarser interval to aggregate the bars to
+            timings:
+              type: boolean
+              example: false
+              description: Include per-stage timings (ms) in the response
             threshold:
               type: number
               example: 0.0
@@ -255,9 +420,53 @@ def backtest():
             allow_short:
               type: boolean
               example: false
+            commission:
+              type: number
+              example: 0.0005
+              description: Commission per side as a fraction of traded notional
+            slippage_bps:
+              type: number
+              example: 2
+              description: Fixed slippage in basis points per side
+            atr_slippage:
+              type: number
+              example: 0.05
+              description: Slippage as a multiple of ATR_14 / price per side
+            cost_sweep:
+              type: array
+              description: Extra cost scenarios evaluated in one batch, each with commission, slippage_bps and atr_slippage
+              items:
+                type: object
+            risk_window:
+              type: integer
+              example: 63
+              description: Optional window (bars) for rolling Sharpe, volatility, Sortino, hit rate and drawdown
+            risk_points:
+              type: integer
+              example: 500
+              description: Maximum points per rolling series (downsampled evenly)
+            bootstrap:
+              type: integer
+              example: 10000
+              description: Optional number of stationary-bootstrap resamples for confidence intervals on the summary metrics
+            bootstrap_block:
+              type: number
+              example: 10
+              description: Mean bootstrap block length in bars (default n^(1/3))
+            confidence:
+              type: number
+              example: 0.95
+              description: Confidence level of the bootstrap intervals
+    produces:
+      - application/json
+      - application/msgpack
     responses:
       200:
-        description: Backtest result
+        description: Backtest result (truncated_bars is set when the range was cut to the memory budget)
+      400:
+        description: Invalid parameters (e.g. risk_window longer than the backtest) or no data for the range
+      413:
+        description: Date range exceeds the per-request memory budget (MEMORY_POLICY=reject)
       500:
         description: Error
     """
@@ -270,16 +479,40 @@ def backtest():
     threshold = data.get("threshold", 0.0)
     holding_period = data.get("holding_period", 1)
     allow_short = data.get("allow_short", False)
+    interval = data.get("interval", "1d")
+    resample = data.get("resample")  # Optional
+    risk_window = data.get("risk_window")  # Optional
+    risk_points = data.get("risk_points", DEFAULT_MAX_POINTS)
+    commission = data.get("commission", 0.0)
+    slippage_bps = data.get("slippage_bps", 0.0)
+    atr_slippage = data.get("atr_slippage", 0.0)
+    cost_sweep = data.get("cost_sweep")  # Optional
+    bootstrap = data.get("bootstrap")  # Optional
+    bootstrap_block = data.get("bootstrap_block")  # Optional
+    confidence = data.get("confidence", 0.95)
+    if bootstrap:
+        try:
+            bootstrap, bootstrap_block, confidence = bootstrap_options(bootstrap, bootstrap_block, confidence)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+    timings = start_request_timings(wants_timings(data))
     try:
-        result = run_backtest(ticker, start, end, features, model_name, threshold, holding_period, allow_short)
-        return jsonify({"status": "success", "data": result})
+        df = await run_io(load_prices, ticker, start, end, interval, resample)
+        result = await run_cpu(backtest_prices, df, features, model_name, threshold, holding_period, allow_short, interval, resample, risk_window, risk_points,
+                                   commission, slippage_bps, atr_slippage, cost_sweep, bootstrap, bootstrap_block, confidence)
+        return timed_jsonify({"status": "success", "data": result}, timings)
+    except MemoryBudgetError as e:
+        return jsonify({"status": "error", "message": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/optimize_portfolio', methods=['POST'])
-def optimize_portfolio_route():
+@admission.cost(admission.optimize_cost, STANDARD)
+async def optimize_portfolio_route():
     """
     Optimize a portfolio for maximum Sharpe ratio.
     ---
@@ -316,7 +549,8 @@ def optimize_portfolio_route():
     quantities = data.get('quantities')
     risk_free_rate = data.get('risk_free_rate', 0.02)
     try:
-        result = optimize_portfolio(tickers, quantities, risk_free_rate)
+        prices, dropped = await run_io(load_portfolio_prices, tickers, quantities)
+        result = await run_cpu(optimize_prices, prices, risk_free_rate, dropped)
         return jsonify({'status': 'success', 'data': result})
     except ValueError as e:
         # User-facing error (e.g., no asset exceeds risk-free rate)
@@ -326,8 +560,158 @@ def optimize_portfolio_route():
         traceback.print_exc()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+PORTFOLIO_MAX_TICKERS = 200  # tickers a single /portfolio_backtest request may load
+
+async def load_close(ticker, start, end):
+    try:
+        df = await run_io(load_prices, ticker, start, end)
+        return df['Close'].astype('float64')
+    except Exception:
+        return None
+
+@app.route('/portfolio_backtest', methods=['POST'])
+@admission.cost(admission.portfolio_backtest_cost, BULK)
+async def portfolio_backtest():
+    """
+    Backtest a max-Sharpe portfolio re-optimized on a rolling window at every rebalance date.
+    ---
+    tags:
+      - Portfolio
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            tickers:
+              type: array
+              items:
+                type: string
+              example: ["TCS.NS", "INFY.NS", "HDFCBANK.NS"]
+            start:
+              type: string
+              example: "2015-01-01"
+            end:
+              type: string
+              example: "2025-01-01"
+            lookback:
+              type: integer
+              example: 252
+              description: Bars of history used to estimate returns and covariance at each rebalance
+            rebalance:
+              type: string
+              example: M
+              description: W, M, Q or Y (last trading day of each period), or a number of bars
+            risk_free_rate:
+              type: number
+              example: 0.02
+            cost_bps:
+              type: number
+              example: 10
+              description: Trading cost in basis points of turnover, charged at each rebalance
+    responses:
+      200:
+        description: Portfolio equity curve, summary metrics and the weights chosen at each rebalance
+      400:
+        description: User error
+      500:
+        description: Error
+    """
+    data = request.get_json() or {}
+    tickers = [t.strip().upper() for t in data.get('tickers') or [] if t and t.strip()]
+    timings = start_request_timings(wants_timings(data))
+    if not tickers or not data.get('start') or not data.get('end'):
+        return jsonify({'status': 'error', 'message': 'tickers, start and end are required.'}), 400
+    if len(tickers) > PORTFOLIO_MAX_TICKERS:
+        return jsonify({'status': 'error', 'message': f'At most {PORTFOLIO_MAX_TICKERS} tickers per request.'}), 400
+    try:
+        closes = await asyncio.gather(*(load_close(t, data['start'], data['end']) for t in tickers))
+        prices, dropped = price_panel(dict(zip(tickers, closes)))
+        result = await run_cpu(backtest_portfolio_prices, prices, data.get('lookback', 252), data.get('rebalance', 'M'),
+                               data.get('risk_free_rate', 0.02), data.get('cost_bps', 0.0), dropped)
+        return timed_jsonify({'status': 'success', 'data': result}, timings)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+SCREEN_MAX_SEED = 200  # tickers a single /screen request may add to the universe
+
+@app.route('/screen', methods=['POST'])
+@admission.cost(admission.screen_cost, INTERACTIVE)
+async def screen():
+    """
+    Rank the cached ticker universe by predicted return or any indicator, with filters.
+    ---
+    tags:
+      - Screening
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            filters:
+              type: array
+              items:
+                type: string
+              example: ["RSI_14 < 30"]
+              description: Conditions on predicted_return, Close or any feature (<, <=, >, >=, ==, !=)
+            sort_by:
+              type: string
+              example: predicted_return
+            top:
+              type: integer
+              example: 20
+            order:
+              type: string
+              example: desc
+            columns:
+              type: array
+              items:
+                type: string
+              description: Columns to return (default sort_by plus filtered columns)
+            tickers:
+              type: array
+              items:
+                type: string
+              description: Optional tickers to load (last year of daily bars) into the universe first
+    responses:
+      200:
+        description: Top tickers (each with the as_of date of the bar its values come from), the number that matched and the universe size
+      400:
+        description: Invalid filter or parameter
+      500:
+        description: Error
+    """
+    data = request.get_json() or {}
+    tickers = [t.strip().upper() for t in data.get('tickers') or [] if t and t.strip()]
+    timings = start_request_timings(wants_timings(data))
+    if len(tickers) > SCREEN_MAX_SEED:
+        return jsonify({'status': 'error', 'message': f'At most {SCREEN_MAX_SEED} tickers can be loaded per request.'}), 400
+    try:
+        if tickers:
+            end = datetime.now()
+            start = end - timedelta(days=365)
+            # Tickers that fail to download are simply left out of the universe
+            await asyncio.gather(*(run_io(load_prices, t, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+                                   for t in tickers), return_exceptions=True)
+        result = await run_cpu(screen_universe, data.get('filters'), data.get('sort_by', 'predicted_return'),
+                               data.get('top', 20), data.get('order', 'desc') != 'asc', data.get('columns'))
+        return timed_jsonify({'status': 'success', 'data': result}, timings)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/sentiment', methods=['POST'])
-def sentiment_analysis():
+async def sentiment_analysis():
     """
     Get sentiment analysis for a stock ticker.
     ---
@@ -343,6 +727,10 @@ def sentiment_analysis():
             ticker:
               type: string
               example: AAPL
+            days:
+              type: integer
+              example: 7
+              description: News window in days (default 7)
     responses:
       200:
         description: Sentiment analysis result
@@ -358,7 +746,55 @@ def sentiment_analysis():
         return jsonify({'status': 'error', 'message': 'Ticker is required'}), 400
     
     try:
-        result = get_stock_sentiment(ticker.upper())
+        result = await run_io(get_stock_sentiment, ticker.upper(), int(data.get('days', 7)))
+        return jsonify({'status': 'success', 'data': result})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/news', methods=['POST'])
+async def news_sentiment():
+    """
+    News articles and their average sentiment for a ticker or company name, from the local news archive.
+    ---
+    tags:
+      - Sentiment
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            ticker:
+              type: string
+              example: AAPL
+              description: Ticker symbol or registered company name
+            days:
+              type: integer
+              example: 90
+              description: Window in days (default 7)
+    responses:
+      200:
+        description: Latest articles and the sentiment summary over the whole window
+      400:
+        description: Missing ticker or invalid window
+      500:
+        description: Error
+    """
+    data = request.get_json() or {}
+    ticker = (data.get('ticker') or '').strip()
+    if not ticker:
+        return jsonify({'status': 'error', 'message': 'Ticker is required'}), 400
+    try:
+        days = int(data.get('days', 7))
+    except (TypeError, ValueError):
+        days = 0
+    if days < 1:
+        return jsonify({'status': 'error', 'message': 'days must be a positive integer.'}), 400
+    try:
+        result = await run_io(fetch_news_sentiment, ticker, days)
         return jsonify({'status': 'success', 'data': result})
     except Exception as e:
         import traceback
@@ -407,6 +843,197 @@ def delete_model_route():
         traceback.print_exc()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/jobs', methods=['POST'])
+@admission.cost(None, BULK)
+async def submit_job():
+    """
+    Queue a heavy job for the worker processes (python jobs.py worker).
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            kind:
+              type: string
+              example: backtest_universe
+              description: backtest_universe, optimize_portfolio, portfolio_backtest, retrain or snapshots
+            params:
+              type: object
+              example: {"tickers": ["AAPL", "MSFT"], "start": "2023-01-01", "end": "2024-01-01"}
+    responses:
+      202:
+        description: Job queued; poll /jobs/{job_id} or stream /jobs/{job_id}/events
+      400:
+        description: Unknown job kind
+    """
+    data = request.get_json() or {}
+    try:
+        job_id = await run_io(jobs.submit, data.get('kind'), data.get('params'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', 'data': {'job_id': job_id, 'job_status': jobs.QUEUED}}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+async def job_status(job_id):
+    """
+    Status, progress and (once finished) result of a job.
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Job status
+      404:
+        description: Unknown job
+    """
+    job = await run_io(jobs.get, job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'data': job})
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+async def cancel_job(job_id):
+    """
+    Cancel a queued or running job.
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Cancellation requested
+      404:
+        description: Unknown or already finished job
+    """
+    if not await run_io(jobs.cancel, job_id):
+        return jsonify({'status': 'error', 'message': 'Job not found or already finished'}), 404
+    return jsonify({'status': 'success', 'message': 'Cancellation requested'})
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events_route(job_id):
+    """
+    Stream a job's progress as server-sent events until it finishes.
+    Each stream closes after JOB_EVENT_MAX_SECONDS; EventSource clients reconnect.
+    Under uvicorn (asgi.py) this path is served natively by job_events.serve.
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    produces:
+      - text/event-stream
+    responses:
+      200:
+        description: One `progress` event per change, then a final `done`, `failed` or `cancelled` event
+      404:
+        description: Unknown job
+    """
+    if jobs.get(job_id) is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return Response(job_events.stream(job_id), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/metrics', methods=['GET'])
+@admission.exempt
+def metrics():
+    """
+    Per-stage latency histograms and cache hit ratios in Prometheus format.
+    ---
+    tags:
+      - Monitoring
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Prometheus text exposition
+    """
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def admin_error():
+    """Response for unauthorized admin calls, or None when the caller holds the admin token"""
+    if not profiling.ADMIN_TOKEN:
+        return jsonify({'status': 'error', 'message': 'Profiling admin endpoints are disabled'}), 404
+    if not profiling.admin_authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({'status': 'error', 'message': 'Invalid admin token'}), 403
+    return None
+
+@app.route('/admin/profiles', methods=['GET'])
+@limiter.limit("10 per minute")
+def list_profiles_route():
+    """
+    List captured request profiles (newest first).
+    ---
+    tags:
+      - Monitoring
+    parameters:
+      - in: header
+        name: X-Admin-Token
+        type: string
+        required: true
+    responses:
+      200:
+        description: Profile metadata
+      403:
+        description: Invalid admin token
+      404:
+        description: Profiling admin endpoints are disabled
+    """
+    error = admin_error()
+    if error:
+        return error
+    return jsonify({'status': 'success', 'profiles': profiling.list_profiles()})
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+@limiter.limit("10 per minute")
+def get_profile_route(profile_id):
+    """
+    Download a captured profile as collapsed stacks (flamegraph.pl / speedscope input).
+    ---
+    tags:
+      - Monitoring
+    parameters:
+      - in: path
+        name: profile_id
+        type: string
+        required: true
+      - in: header
+        name: X-Admin-Token
+        type: string
+        required: true
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Collapsed stacks, one "frame;frame;frame count" line per stack
+      403:
+        description: Invalid admin token
+      404:
+        description: Profile not found
+    """
+    error = admin_error()
+    if error:
+        return error
+    stacks = profiling.collapsed_stacks(profile_id)
+    if stacks is None:
+        return jsonify({'status': 'error', 'message': f'Profile {profile_id} not found'}), 404
+    return Response(stacks, mimetype='text/plain')
+
 # Error handler for rate limit exceeded
 @app.errorhandler(429)
 def ratelimit_handler(e):
@@ -0,0 +1,55 @@
+"""ASGI entry point for the backend.
+
+Serves the same Flask app (routes, admission control and Swagger docs at /apidocs)
+behind an ASGI server. Each HTTP request runs on its own thread from the
+request pool (HTTP_WORKERS), so slow requests do not hold up others; async
+handlers run on the server's event loop and await upstream I/O on the I/O pool
+and CPU-bound work on the bounded CPU pool (see executors.py). WebSocket
+connections to /ws/predictions go to the prediction stream (stream.py);
+uvicorn serves them with the websockets package. Job progress streams
+(/jobs/<id>/events) are served natively too (job_events.py), so they wait on
+the event loop rather than on a request thread.
+
+    uvicorn asgi:asgi_app --host 0.0.0.0 --port 8000 --workers 2
+"""
+import os
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import app
+from executors import http_executor
+import job_events
+import stream
+
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI call on one shared thread, which serializes all
+    # requests; run each on a thread from the request pool instead
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func,
+                                 thread_sensitive=False, executor=http_executor)
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+flask_app = ThreadedWsgiToAsgi(app)
+
+
+async def asgi_app(scope, receive, send):
+    if scope['type'] == 'websocket':
+        if scope['path'] == stream.STREAM_PATH:
+            return await stream.serve(scope, receive, send)
+        # Refuse other WebSocket paths during the handshake
+        await receive()
+        return await send({'type': 'websocket.close', 'code': 1008})
+    if scope['type'] == 'http' and scope['method'] == 'GET' and job_events.JOB_EVENTS_PATH.match(scope['path']):
+        return await job_events.serve(scope, receive, send)
+    return await flask_app(scope, receive, send)
+
+if __name__ == "__main__":
+    import uvicorn
+    if not os.path.exists('models'):
+        os.makedirs('models')
+    uvicorn.run("asgi:asgi_app", host="0.0.0.0", port=int(os.getenv('PORT', 8000)),
+                workers=int(os.getenv('WEB_CONCURRENCY', 1)))
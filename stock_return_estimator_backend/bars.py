@@ -0,0 +1,295 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from tracing import record_cache
+
+# Seconds per bar for the intervals yfinance supports
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '2m': 120,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '60m': 3600,
+    '90m': 5400,
+    '1h': 3600,
+    '1d': 86400,
+    '5d': 5 * 86400,
+    '1wk': 7 * 86400,
+}
+INTRADAY_INTERVALS = {k for k, v in INTERVAL_SECONDS.items() if v < 86400}
+
+# 1970-01-01 was a Thursday; shift weekly buckets so they start on Monday
+WEEK_ORIGIN = 4 * 86400
+
+UINT32_MAX = np.iinfo(np.uint32).max
+INT32 = np.iinfo(np.int32)
+
+
+def interval_seconds(interval):
+    """Return the bar length in seconds for an interval string like '5m' or '1d'"""
+    if interval not in INTERVAL_SECONDS:
+        raise ValueError(f"Unsupported interval '{interval}'. Use one of: {', '.join(INTERVAL_SECONDS)}")
+    return INTERVAL_SECONDS[interval]
+
+
+def _volume_array(values):
+    """Store volumes as uint32, widening to uint64 only if a bar overflows it"""
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+    values = np.clip(values, 0, None)
+    if values.size and values.max() > UINT32_MAX:
+        return values.astype(np.uint64)
+    return values.astype(np.uint32)
+
+
+def _offset_array(ts, base):
+    """Seconds since `base` as int32, widening to int64 only for spans beyond ~68 years"""
+    offsets = ts - base
+    if offsets.size and (offsets.min() < INT32.min or offsets.max() > INT32.max):
+        return offsets
+    return offsets.astype(np.int32)
+
+
+class Bars:
+    """OHLCV bars held as compact parallel NumPy arrays.
+
+    Timestamps are int32 second offsets from the first bar (UTC epoch
+    seconds in `ts`), prices float32 and volumes uint32: 24 bytes per bar
+    against about 48 for the equivalent float64 DataFrame with a
+    DatetimeIndex, or half its memory. Prices stay float32 rather than a
+    lossy encoding because indicators and backtests read them directly.
+    """
+
+    __slots__ = ('base', 'offsets', 'open', 'high', 'low', 'close', 'volume', 'interval', 'tz')
+
+    def __init__(self, ts, open, high, low, close, volume, interval='1d', tz=None):
+        ts = np.asarray(ts, dtype=np.int64)
+        self.base = int(ts[0]) if len(ts) else 0
+        self.offsets = _offset_array(ts, self.base)
+        self.open = np.asarray(open, dtype=np.float32)
+        self.high = np.asarray(high, dtype=np.float32)
+        self.low = np.asarray(low, dtype=np.float32)
+        self.close = np.asarray(close, dtype=np.float32)
+        self.volume = volume if isinstance(volume, np.ndarray) and volume.dtype.kind == 'u' else _volume_array(volume)
+        self.interval = interval
+        self.tz = tz
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def ts(self):
+        """Epoch seconds (UTC) of each bar, as int64"""
+        return self.base + self.offsets.astype(np.int64)
+
+    @property
+    def last_ts(self):
+        return self.base + int(self.offsets[-1])
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ('offsets', 'open', 'high', 'low', 'close', 'volume'))
+
+    @classmethod
+    def empty(cls, interval='1d', tz=None):
+        return cls([], [], [], [], [], np.array([], dtype=np.uint32), interval, tz)
+
+    @classmethod
+    def from_frame(cls, df, interval='1d'):
+        """Build bars from a yfinance-style OHLCV DataFrame"""
+        df = df.dropna(subset=['Open', 'High', 'Low', 'Close'])
+        index = pd.DatetimeIndex(df.index)
+        tz = str(index.tz) if index.tz is not None else None
+        if tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        ts = index.values.astype('datetime64[s]').astype(np.int64)
+        volume = df['Volume'].to_numpy() if 'Volume' in df.columns else np.zeros(len(df))
+        return cls(ts, df['Open'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy(),
+                   df['Close'].to_numpy(), _volume_array(volume), interval, tz)
+
+    def to_frame(self, dtype=np.float64):
+        """Expand back into a DataFrame for indicator code that expects pandas"""
+        index = pd.to_datetime(self.ts, unit='s')
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return pd.DataFrame({
+            'Open': self.open.astype(dtype),
+            'High': self.high.astype(dtype),
+            'Low': self.low.astype(dtype),
+            'Close': self.close.astype(dtype),
+            'Volume': self.volume.astype(dtype),
+        }, index=index)
+
+    def _take(self, sel):
+        # Views on the same base; no timestamps are rebuilt
+        bars = Bars.__new__(Bars)
+        bars.base, bars.offsets = self.base, self.offsets[sel]
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            setattr(bars, name, getattr(self, name)[sel])
+        bars.interval, bars.tz = self.interval, self.tz
+        return bars
+
+    def _search(self, ts):
+        # Clipped to the offsets' dtype; every stored offset lies inside it
+        info = np.iinfo(self.offsets.dtype)
+        return np.searchsorted(self.offsets, self.offsets.dtype.type(min(max(ts - self.base, info.min), info.max)), side='left')
+
+    def slice(self, start_ts=None, end_ts=None):
+        """Bars with start_ts <= ts < end_ts, located by binary search"""
+        lo = 0 if start_ts is None else self._search(start_ts)
+        hi = len(self) if end_ts is None else self._search(end_ts)
+        return self._take(slice(lo, hi))
+
+    def merge(self, other):
+        """Combine with newer bars, letting `other` win on duplicate timestamps"""
+        if not len(self):
+            return other
+        if not len(other):
+            return self
+        ts = np.concatenate([other.ts, self.ts])
+        # np.unique keeps the first occurrence, i.e. the bar from `other`
+        _, first = np.unique(ts, return_index=True)
+        cat = lambda name: np.concatenate([getattr(other, name), getattr(self, name)])[first]
+        volume = np.concatenate([other.volume.astype(np.uint64), self.volume.astype(np.uint64)])[first]
+        return Bars(ts[first], cat('open'), cat('high'), cat('low'), cat('close'),
+                    _volume_array(volume), self.interval, self.tz or other.tz)
+
+    def resample(self, interval):
+        """Aggregate into coarser bars (e.g. 1m -> 15m, 1d -> 1wk) without going through pandas"""
+        target = interval_seconds(interval)
+        source = interval_seconds(self.interval)
+        if target < source:
+            raise ValueError(f"Cannot resample {self.interval} bars to the finer interval {interval}.")
+        if target == source or not len(self):
+            bars = self._take(slice(None))
+            bars.interval = interval
+            return bars
+        # Bucket in exchange-local time, so a session crossing UTC midnight stays one day
+        ts = self.ts
+        local = ts
+        if self.tz is not None:
+            index = pd.to_datetime(ts, unit='s').tz_localize('UTC').tz_convert(self.tz).tz_localize(None)
+            local = index.values.astype('datetime64[s]').astype(np.int64)
+        if target < 86400:
+            # Intraday buckets start at each session's first bar (e.g. 09:15 on NSE), not on the hour
+            day = local // 86400
+            first = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+            session_open = np.repeat(local[first], np.diff(np.r_[first, len(local)]))
+            bucket = day * (86400 // target + 1) + (local - session_open) // target
+        else:
+            origin = WEEK_ORIGIN if interval == '1wk' else 0
+            bucket = (local - origin) // target
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        ends = np.r_[starts[1:], len(bucket)] - 1
+        volume = np.add.reduceat(self.volume.astype(np.uint64), starts)
+        return Bars(
+            ts[starts],
+            self.open[starts],
+            np.maximum.reduceat(self.high, starts),
+            np.minimum.reduceat(self.low, starts),
+            self.close[ends],
+            _volume_array(volume),
+            interval,
+            self.tz,
+        )
+
+
+def _to_epoch(date):
+    return int(pd.Timestamp(date).value // 10**9)
+
+
+class BarStore:
+    """In-memory store of compact bars per (ticker, interval).
+
+    Each entry remembers the date range it was fetched for, so requests
+    inside that range are served by slicing instead of re-downloading.
+    Ranges touching today are refreshed after `ttl` seconds, and the least
+    recently used entries are evicted beyond `max_entries`. Listeners added
+    with subscribe() are called with (ticker, interval, bars) whenever an
+    entry's bars change.
+    """
+
+    def __init__(self, loader, ttl=600, max_entries=256):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, key, bars):
+        # Called outside the lock so listeners may read the store
+        for listener in self.listeners:
+            listener(key[0], key[1], bars)
+
+    def _fresh(self, entry, end_ts):
+        if end_ts < _to_epoch(pd.Timestamp.now().normalize()):
+            return True
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def _store(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while self.max_entries and len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, ticker, start, end, interval='1d'):
+        interval_seconds(interval)
+        start_ts, end_ts = _to_epoch(start), _to_epoch(end)
+        key = (ticker.upper(), interval)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry['start'] <= start_ts and end_ts <= entry['end'] and self._fresh(entry, end_ts):
+                self.entries.move_to_end(key)
+                record_cache('bars', True)
+                return entry['bars'].slice(start_ts, end_ts)
+        record_cache('bars', False)
+        bars = Bars.from_frame(self.loader(ticker, start, end, interval), interval)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and start_ts <= entry['end'] and entry['start'] <= end_ts:
+                # Overlapping ranges: extend the cached entry instead of replacing it
+                entry = dict(entry, bars=entry['bars'].merge(bars), start=min(start_ts, entry['start']),
+                             end=max(end_ts, entry['end']), fetched_at=time.time())
+            else:
+                entry = {'bars': bars, 'start': start_ts, 'end': end_ts, 'fetched_at': time.time()}
+            self._store(key, entry)
+        self._notify(key, entry['bars'])
+        return bars.slice(start_ts, end_ts)
+
+    def put(self, ticker, bars):
+        """Append freshly arrived bars for a ticker"""
+        key = (ticker.upper(), bars.interval)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                end = bars.last_ts + interval_seconds(bars.interval) if len(bars) else 0
+                start = int(bars.ts[0]) if len(bars) else 0
+                entry = {'bars': bars, 'start': start, 'end': end, 'fetched_at': time.time()}
+            else:
+                end = entry['end']
+                if len(bars):
+                    end = max(end, bars.last_ts + interval_seconds(bars.interval))
+                entry = dict(entry, bars=entry['bars'].merge(bars), end=end, fetched_at=time.time())
+            self._store(key, entry)
+        self._notify(key, entry['bars'])
+        return entry['bars']
+
+    def cached(self, ticker, interval='1d'):
+        """All bars held for a ticker, or None; never downloads"""
+        with self.lock:
+            entry = self.entries.get((ticker.upper(), interval))
+            return entry['bars'] if entry else None
+
+    def tickers(self, interval='1d'):
+        with self.lock:
+            return sorted(t for t, i in self.entries if i == interval)
+
+    def nbytes(self):
+        with self.lock:
+            return sum(entry['bars'].nbytes for entry in self.entries.values())
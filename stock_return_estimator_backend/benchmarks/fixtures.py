@@ -0,0 +1,58 @@
+"""Deterministic synthetic fixtures for the benchmarks (no network access)"""
+import numpy as np
+import pandas as pd
+
+POSITIVE = ['surges', 'beats estimates', 'record profit', 'strong growth', 'upgrade', 'bullish outlook']
+NEGATIVE = ['plunges', 'misses estimates', 'heavy losses', 'weak demand', 'downgrade', 'bearish outlook']
+NEUTRAL = ['reports results', 'holds meeting', 'announces dividend', 'files quarterly report']
+SOURCES = ['Reuters', 'Bloomberg', 'CNBC', 'Economic Times', 'MarketWatch']
+
+
+def make_ohlcv(n_days=2520, seed=0, start='2015-01-01', drift=0.0004, vol=0.015):
+    """Geometric-Brownian OHLCV bars on business days, identical for a given seed"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=n_days)
+    close = 100 * np.exp(np.cumsum(rng.normal(drift, vol, n_days)))
+    spread = np.abs(rng.normal(0, vol / 2, n_days))
+    open_ = close * (1 + rng.normal(0, vol / 4, n_days))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + spread),
+        'Low': np.minimum(open_, close) * (1 - spread),
+        'Close': close,
+        'Volume': rng.integers(100_000, 10_000_000, n_days).astype(np.float64),
+    }, index=index)
+
+
+def make_price_panel(n_assets, n_days=252, seed=0):
+    """Closing prices for n_assets correlated tickers (one common factor)"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0005, 0.008, n_days)
+    beta = rng.uniform(0.5, 1.5, n_assets)
+    drift = rng.uniform(0.0005, 0.0015, n_assets)
+    idio = rng.normal(0, 0.01, (n_days, n_assets))
+    returns = drift + market[:, None] * beta + idio
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    index = pd.bdate_range('2024-01-01', periods=n_days)
+    return pd.DataFrame(prices, index=index, columns=[f'T{i:04d}' for i in range(n_assets)])
+
+
+def make_articles(n, seed=0, ticker='AAPL', company='Apple Inc.'):
+    """NewsAPI-style article dicts with a deterministic mix of tones"""
+    rng = np.random.default_rng(seed)
+    tones = [POSITIVE, NEGATIVE, NEUTRAL]
+    published = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, n), unit='m')
+    articles = []
+    for i in range(n):
+        phrases = tones[int(rng.integers(0, 3))]
+        headline = phrases[int(rng.integers(0, len(phrases)))]
+        subject = company if rng.random() < 0.5 else ticker
+        articles.append({
+            'title': f'{subject} {headline}',
+            'description': f'Shares of {subject} moved after the company {headline} in the latest session.',
+            'content': '',
+            'url': f'https://example.com/news/{seed}/{i}',
+            'publishedAt': published[i].strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'source': {'name': SOURCES[i % len(SOURCES)]},
+        })
+    return articles
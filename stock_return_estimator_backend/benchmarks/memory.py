@@ -0,0 +1,77 @@
+"""Peak RSS per request type.
+
+Each request type runs once in a fresh interpreter so its peak resident set
+size is not hidden by an earlier, larger run. The reported delta is the peak
+during the request (CPU part plus JSON serialization) minus the peak after
+imports and fixture setup.
+
+    python -m benchmarks.memory
+    python -m benchmarks.memory --bars 2520 20000 --only predict backtest
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+REQUEST_TYPES = ('predict', 'backtest', 'backtest_full')
+
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def _child(request_type, bars):
+    import encoding
+    import utils
+    from benchmarks.fixtures import make_ohlcv
+
+    utils.MODEL_DIR = tempfile.mkdtemp(prefix='bench_models_')
+    df = make_ohlcv(bars, seed=7)
+    # Warm up imports and lazily initialized libraries on a small frame first
+    utils.predict_prices(make_ohlcv(300, seed=8), persist=False)
+    before = _peak_rss_mb()
+
+    if request_type == 'predict':
+        result = utils.predict_prices(df, persist=False)
+    elif request_type == 'backtest':
+        result = utils.backtest_prices(df, holding_period=3, allow_short=True)
+    else:
+        result = utils.backtest_prices(df, holding_period=3, allow_short=True, risk_window=63,
+                                       commission=0.0005, atr_slippage=0.1, cost_sweep=[{'slippage_bps': bps} for bps in (0, 5, 10, 20)])
+    json.dumps(result, default=encoding.to_builtin)
+    after = _peak_rss_mb()
+    print(json.dumps({'baseline_mb': before, 'peak_mb': after, 'delta_mb': max(after - before, 0.0),
+                      'truncated_bars': result.get('truncated_bars', 0)}))
+
+
+def run(request_type, bars):
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.memory', '--child', request_type, '--bars', str(bars)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=REQUEST_TYPES)
+    parser.add_argument('--bars', nargs='+', type=int, default=[2520, 20000])
+    parser.add_argument('--child', choices=REQUEST_TYPES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.bars[0])
+        return
+
+    print(f'{"request":16s} {"bars":>7s} {"baseline":>10s} {"peak":>10s} {"delta":>9s}  truncated')
+    for request_type in args.only or REQUEST_TYPES:
+        for bars in args.bars:
+            r = run(request_type, bars)
+            print(f'{request_type:16s} {bars:7d} {r["baseline_mb"]:8.1f}MB {r["peak_mb"]:8.1f}MB '
+                  f'{r["delta_mb"]:7.1f}MB  {r["truncated_bars"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""Benchmark suite for the backend hot paths.
+
+Runs every benchmark on deterministic synthetic fixtures (no network),
+records wall time and peak traced memory, appends the run to
+benchmarks/history.jsonl and compares it against a stored baseline.
+
+    python -m benchmarks.run                      # run and compare with the baseline
+    python -m benchmarks.run --save-baseline      # store this run as the new baseline
+    python -m benchmarks.run --only backtest --max-regression 15
+
+Exits with status 1 when any benchmark's median time is more than
+--max-regression percent slower than its baseline, and with status 2 when
+the baseline file or a benchmark's entry in it is missing (baselines are
+machine-specific, so record one with --save-baseline first).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.fixtures import make_ohlcv, make_price_panel, make_articles
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+HISTORY_PATH = os.path.join(HERE, 'history.jsonl')
+NEWS_FIXTURE = os.path.join(HERE, 'newsapi_aapl.json')  # a NewsAPI response for AAPL
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a setup function that returns the zero-argument callable to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _utils():
+    import utils
+    # Keep benchmark runs from overwriting saved models
+    utils.MODEL_DIR = tempfile.mkdtemp(prefix='bench_models_')
+    return utils
+
+
+@benchmark('feature_block')
+def bench_feature_block():
+    utils = _utils()
+    df = make_ohlcv(2520, seed=1)
+    return lambda: utils.build_features(df.copy())
+
+
+@benchmark('backtest')
+def bench_backtest():
+    utils = _utils()
+    df = make_ohlcv(2520, seed=2)
+    return lambda: utils.backtest_prices(df.copy(), holding_period=3, allow_short=True)
+
+
+@benchmark('bootstrap_10k')
+def bench_bootstrap():
+    import numpy as np
+    from risk import bootstrap_summary
+    rng = np.random.default_rng(5)
+    returns = rng.normal(0.0004, 0.012, 2520)
+    positions = (rng.random(2520) > 0.4).astype(np.int8)
+    return lambda: bootstrap_summary(returns * positions, returns, positions, resamples=10_000)
+
+
+@benchmark('fit_and_shap')
+def bench_fit_and_shap():
+    import shap
+    from sklearn.linear_model import LinearRegression
+    utils = _utils()
+    df = utils.build_features(make_ohlcv(2520, seed=3))
+    X = df.drop(columns=['Open', 'High', 'Low', 'Close', 'Volume', 'Return'])
+    y = df['Return']
+
+    def run():
+        model = LinearRegression().fit(X, y)
+        explainer = shap.Explainer(model, X)
+        return explainer(X.iloc[-1:])
+    return run
+
+
+def _portfolio(n_assets):
+    utils = _utils()
+    # Keep more observations than assets so the sample covariance is well conditioned
+    prices = make_price_panel(n_assets, n_days=max(252, 2 * n_assets), seed=n_assets)
+    return lambda: utils.optimize_prices(prices, risk_free_rate=0.0)
+
+
+@benchmark('optimize_portfolio_10')
+def bench_portfolio_10():
+    return _portfolio(10)
+
+
+@benchmark('optimize_portfolio_100')
+def bench_portfolio_100():
+    return _portfolio(100)
+
+
+@benchmark('optimize_portfolio_500')
+def bench_portfolio_500():
+    return _portfolio(500)
+
+
+@benchmark('news_sentiment_scoring')
+def bench_news_scoring():
+    utils = _utils()
+    articles = make_articles(2000, seed=4)
+    return lambda: utils.score_articles(articles)
+
+
+@benchmark('forecast_100k_x_60')
+def bench_forecast():
+    import montecarlo
+    import numpy as np
+    residuals = np.random.default_rng(6).standard_t(4, 2520) * 0.012
+    return lambda: montecarlo.simulate(100.0, residuals, 0.001, 0.0004, horizon=60, paths=100_000)
+
+
+@benchmark('news_archive_query_365d')
+def bench_news_archive():
+    import news
+    utils = _utils()
+    news.NEWS_DB = os.path.join(tempfile.mkdtemp(prefix='bench_news_'), 'news.db')
+    news.register('AAPL', 'Apple Inc.')
+    news.add(utils.score_article(a) for a in make_articles(5000, seed=5))
+    now = datetime(2026, 1, 1).timestamp()
+    return lambda: news.query('AAPL', 365, now=now)
+
+
+@benchmark('news_ingest_fixture')
+def bench_news_ingest():
+    """Offline ingestion of a saved NewsAPI response into a fresh archive; every article must be indexed under its ticker"""
+    import news
+    utils = _utils()
+    articles = news.load_file(NEWS_FIXTURE)
+    folder = tempfile.mkdtemp(prefix='bench_news_')
+    runs = itertools.count()
+    now = datetime(2025, 7, 1).timestamp()
+
+    def ingest():
+        news.NEWS_DB = os.path.join(folder, f'news_{next(runs)}.db')
+        news.register('AAPL', 'Apple Inc.')
+        news.add((utils.score_article(a) for a in articles), 'AAPL')
+        return news.query('AAPL', 60, now=now)
+
+    _, _, count = ingest()
+    if count != len(articles):
+        raise AssertionError(f'{count} of {len(articles)} fixture articles indexed under AAPL')
+    return ingest
+
+
+def measure(fn, repeat):
+    """Median/min wall time over `repeat` runs (after one warm-up) and peak traced memory"""
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'peak_mem_mb': peak / 2**20,
+        'repeat': repeat,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=HERE, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results, baseline, max_regression):
+    """Return (names slower than baseline by more than max_regression percent, names without a baseline)"""
+    failures, missing = [], []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            print(f'{name:28s} {result["median_s"] * 1000:10.2f} ms   (no baseline)')
+            missing.append(name)
+            continue
+        change = (result['median_s'] / base['median_s'] - 1) * 100
+        mem_change = result['peak_mem_mb'] - base['peak_mem_mb']
+        flag = 'REGRESSION' if change > max_regression else 'ok'
+        print(f'{name:28s} {result["median_s"] * 1000:10.2f} ms  {change:+7.1f}%  '
+              f'mem {result["peak_mem_mb"]:8.2f} MB ({mem_change:+.2f})  {flag}')
+        if change > max_regression:
+            failures.append(name)
+    return failures, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='Run a subset of benchmarks')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-regression', type=float, default=float(os.getenv('BENCH_MAX_REGRESSION', 20)),
+                        help='Allowed slowdown versus the baseline, in percent')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        fn = BENCHMARKS[name]()
+        results[name] = measure(fn, args.repeat)
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(HISTORY_PATH, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.setdefault('results', {}).update(results)
+        baseline.update({k: v for k, v in run.items() if k != 'results'})
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f'Saved baseline for {len(results)} benchmarks to {args.baseline}')
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures, missing = compare(results, baseline, args.max_regression)
+    if failures:
+        print(f'FAILED: {", ".join(failures)} slowed by more than {args.max_regression}%')
+        sys.exit(1)
+    if missing:
+        print(f'FAILED: no baseline for {", ".join(missing)} in {args.baseline}; '
+              'record one on this machine with --save-baseline')
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+
+# Per-request memory budget for /predict and /backtest. The working set grows
+# linearly with the number of bars, so the budget is enforced as a bar limit
+# before any indicator is computed. Bytes per bar were measured with
+# `python -m benchmarks.memory` (peak RSS growth over the request, including
+# JSON serialization) and rounded up.
+REQUEST_MEMORY_MB = float(os.getenv('REQUEST_MEMORY_MB', 64))
+MEMORY_POLICY = os.getenv('MEMORY_POLICY', 'degrade')  # 'degrade' keeps the most recent bars, 'reject' refuses
+BYTES_PER_BAR = {
+    'predict': 300,
+    'backtest': 450,  # with rolling metrics and a cost sweep
+}
+MIN_BARS = 100  # below this the indicators and fit are not meaningful
+
+
+class MemoryBudgetError(ValueError):
+    """The requested date range does not fit in the per-request memory budget"""
+
+
+def max_bars(request_type, budget_mb=None):
+    budget_mb = REQUEST_MEMORY_MB if budget_mb is None else budget_mb
+    return max(int(budget_mb * 2**20 / BYTES_PER_BAR[request_type]), MIN_BARS)
+
+
+def limit_bars(df, request_type):
+    """Fit a price frame into the budget: returns (df, bars_dropped) or raises MemoryBudgetError"""
+    limit = max_bars(request_type)
+    if REQUEST_MEMORY_MB <= 0 or len(df) <= limit:
+        return df, 0
+    if MEMORY_POLICY == 'reject':
+        raise MemoryBudgetError(
+            f'{len(df)} bars exceed the per-request limit of {limit}. Request a shorter range or a coarser interval.')
+    # Degrade: keep the most recent bars, which is what the prediction depends on most
+    return df.iloc[-limit:], len(df) - limit
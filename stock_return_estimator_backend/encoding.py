@@ -0,0 +1,122 @@
+import gzip
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are optional
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # Brotli compression is optional; gzip is always available
+    brotli = None
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+# MessagePack extension codes for typed arrays (raw little-endian payloads)
+EXT_FLOAT32 = 1
+EXT_INT8 = 2
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE = ('application/json', 'application/msgpack', 'text/')
+
+
+class Series:
+    """A numeric chart series kept as a NumPy array until the response is encoded.
+
+    JSON clients get `np.round(values, decimals).tolist()`, exactly what the
+    endpoints returned before; MessagePack clients get a typed array.
+    """
+
+    __slots__ = ('values', 'decimals')
+
+    def __init__(self, values, decimals=4):
+        self.values = np.asarray(values)
+        self.decimals = decimals
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, item):
+        return Series(self.values[item], self.decimals)
+
+    def tolist(self):
+        if self.values.dtype.kind == 'f':
+            return np.round(self.values, self.decimals).tolist()
+        return self.values.tolist()
+
+
+def to_builtin(obj):
+    """Fallback conversion for values the JSON/MessagePack encoders do not know"""
+    if isinstance(obj, Series):
+        return obj.tolist()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f'Object of type {type(obj).__name__} is not serializable')
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that understands Series and NumPy values"""
+
+    @staticmethod
+    def default(obj):
+        try:
+            return to_builtin(obj)
+        except TypeError:
+            return DefaultJSONProvider.default(obj)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, Series):
+        values = obj.values
+        if values.dtype.kind in 'iub' and values.size and values.min() >= -128 and values.max() <= 127:
+            return msgpack.ExtType(EXT_INT8, values.astype('<i1').tobytes())
+        return msgpack.ExtType(EXT_FLOAT32, values.astype('<f4').tobytes())
+    return to_builtin(obj)
+
+
+def wants_msgpack(accept):
+    """True when the Accept header prefers MessagePack over JSON"""
+    if msgpack is None or not accept:
+        return False
+    best, best_q = None, -1.0
+    for part in accept.split(','):
+        fields = part.strip().split(';')
+        media = fields[0].strip().lower()
+        q = 1.0
+        for param in fields[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in MSGPACK_TYPES or media == 'application/json':
+            if q > best_q:
+                best, best_q = media, q
+    return best in MSGPACK_TYPES and best_q > 0
+
+
+def pack(payload):
+    """Encode a response payload as MessagePack with series as typed-array extensions"""
+    return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+
+
+def compress(body, accept_encoding):
+    """Compress a response body for the client, returning (body, content_encoding)"""
+    if len(body) < COMPRESS_MIN_BYTES or not accept_encoding:
+        return body, None
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    if brotli is not None and 'br' in accepted:
+        return brotli.compress(body, quality=5), 'br'
+    if 'gzip' in accepted:
+        return gzip.compress(body, compresslevel=5), 'gzip'
+    return body, None
+
+
+def is_compressible(mimetype):
+    return any(mimetype.startswith(prefix) for prefix in COMPRESSIBLE)
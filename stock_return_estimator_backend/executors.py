@@ -0,0 +1,37 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import profiling
+
+# Upstream calls (yfinance, NewsAPI, the Node movers service) mostly wait on the
+# network, so they get a wide pool. Feature building, fitting and SHAP are
+# CPU-bound; their pool is capped near the core count so concurrent requests
+# queue instead of oversubscribing the CPU.
+# Under the ASGI entry point each HTTP request runs its Flask handler on its
+# own thread from the request pool (asgi.py).
+IO_WORKERS = int(os.getenv('IO_WORKERS', 32))
+CPU_WORKERS = int(os.getenv('CPU_WORKERS', os.cpu_count() or 2))
+HTTP_WORKERS = int(os.getenv('HTTP_WORKERS', 64))
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='io')
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix='cpu')
+http_executor = ThreadPoolExecutor(max_workers=HTTP_WORKERS, thread_name_prefix='http')
+
+
+def _submit(executor, fn, args, kwargs):
+    # Copy the caller's context so per-request state (e.g. timings) follows the work
+    ctx = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, ctx.run, profiling.track_threads(partial(fn, *args, **kwargs)))
+
+
+async def run_io(fn, *args, **kwargs):
+    """Await a blocking upstream call without holding the event loop"""
+    return await _submit(io_executor, fn, args, kwargs)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Await CPU-bound work on the bounded CPU pool"""
+    return await _submit(cpu_executor, fn, args, kwargs)
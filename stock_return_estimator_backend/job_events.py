@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+import re
+import time
+
+import admission
+import jobs
+from encoding import to_builtin
+from executors import run_io
+
+# Job progress as server-sent events. Under the ASGI entry point, GET
+# /jobs/<id>/events is served natively here (like the prediction WebSocket in
+# stream.py): the stream waits on the event loop between polls instead of
+# holding a request thread. The Flask route serves the same events for the
+# threaded dev server. Either way a stream closes after JOB_EVENT_MAX_SECONDS;
+# EventSource clients reconnect on their own.
+JOB_EVENTS_PATH = re.compile(r'^/jobs/([^/]+)/events$')
+JOB_EVENT_INTERVAL = 0.5  # seconds between job progress checks
+JOB_EVENT_MAX_SECONDS = float(os.getenv('JOB_EVENT_MAX_SECONDS', 300))
+
+
+def poll(job_id, last=None):
+    """(event text or None, state, finished) for a job's current row; no event when unchanged since `last`"""
+    job = jobs.get(job_id)
+    if job is None:
+        # Pruned while streaming
+        return None, last, True
+    if job['status'] in jobs.FINISHED:
+        return f"event: {job['status']}\ndata: {json.dumps(job, default=to_builtin)}\n\n", last, True
+    state = (job['status'], job['progress'], job['message'])
+    if state == last:
+        return None, last, False
+    update = {k: job[k] for k in ('status', 'progress', 'message')}
+    return f"event: progress\ndata: {json.dumps(update)}\n\n", state, False
+
+
+def stream(job_id):
+    """Blocking event stream for the WSGI route; each open stream holds a server thread"""
+    deadline = time.monotonic() + JOB_EVENT_MAX_SECONDS
+    last = None
+    while True:
+        text, last, finished = poll(job_id, last)
+        if text:
+            yield text
+        if finished or time.monotonic() >= deadline:
+            return
+        time.sleep(JOB_EVENT_INTERVAL)
+
+
+async def _json(send, status, body, headers=()):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'access-control-allow-origin', b'*'), *headers]})
+    await send({'type': 'http.response.body', 'body': json.dumps(body).encode()})
+
+
+async def serve(scope, receive, send):
+    """ASGI handler for GET /jobs/<id>/events, admitted like any other request"""
+    job_id = JOB_EVENTS_PATH.match(scope['path']).group(1)
+    client = (scope.get('client') or ('127.0.0.1',))[0]
+    try:
+        charge = await run_io(admission.controller.acquire, client, admission.DEFAULT_COST)
+    except admission.Rejected as e:
+        return await _json(send, e.status, {'status': 'error', 'message': str(e)},
+                           [(b'retry-after', str(int(e.retry_after + 0.5)).encode())])
+    disconnected = asyncio.Event()
+
+    async def watch():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch())
+    try:
+        text, last, finished = await run_io(poll, job_id)
+        if text is None and finished:
+            return await _json(send, 404, {'status': 'error', 'message': 'Job not found'})
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+                                (b'access-control-allow-origin', b'*')]})
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + JOB_EVENT_MAX_SECONDS
+        while True:
+            if text:
+                await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+            if finished or loop.time() >= deadline:
+                break
+            try:
+                await asyncio.wait_for(disconnected.wait(), JOB_EVENT_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            text, last, finished = await run_io(poll, job_id, last)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        admission.controller.release(charge)
@@ -0,0 +1,335 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from encoding import to_builtin
+
+# Background jobs for work too heavy for a request (universe backtests,
+# large portfolio optimizations, retraining, nightly snapshots). Jobs are rows
+# in a SQLite table that acts as the broker: the API inserts them, and any
+# number of worker processes, on this machine or on others sharing JOBS_DB,
+# claim them one at a time. Workers keep a heartbeat while running, and jobs
+# whose worker stops heartbeating are put back in the queue. Every update a
+# worker makes is fenced on its lease (worker name and attempt number), so a
+# worker that lost its lease cannot overwrite the job's new run.
+JOBS_DB = os.getenv('JOBS_DB', 'jobs.db')
+JOB_LEASE = int(os.getenv('JOB_LEASE', 120))           # seconds without a heartbeat before a job is retried
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+JOB_KEEP_DAYS = int(os.getenv('JOB_KEEP_DAYS', 7))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+JOB_KINDS = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and it was requeued or claimed again"""
+
+
+def job_kind(name):
+    """Register fn(params, progress) as a job kind; progress(fraction, message) reports and checks for cancellation"""
+    def register(fn):
+        JOB_KINDS[name] = fn
+        return fn
+    return register
+
+
+# --- Broker ---
+
+_local = threading.local()
+
+
+def _connect():
+    # One connection per thread and process; SQLite connections cannot be shared
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'key', None) != (os.getpid(), JOBS_DB):
+        conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            cancel INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            heartbeat REAL
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at)')
+        _local.conn, _local.key = conn, (os.getpid(), JOBS_DB)
+    return conn
+
+
+def submit(kind, params=None):
+    """Queue a job and return its id"""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind '{kind}'. Use one of: {', '.join(JOB_KINDS)}")
+    job_id = uuid.uuid4().hex
+    _connect().execute('INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?)',
+                       (job_id, kind, json.dumps(params or {}), QUEUED, time.time()))
+    return job_id
+
+
+def get(job_id):
+    """A job's status, progress and (once done) result, or None"""
+    row = _connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = {k: row[k] for k in ('id', 'kind', 'status', 'progress', 'message', 'error', 'attempts', 'worker',
+                               'created_at', 'started_at', 'finished_at')}
+    job['params'] = json.loads(row['params'])
+    job['result'] = json.loads(row['result']) if row['result'] else None
+    return job
+
+
+def cancel(job_id):
+    """Cancel a queued job now, or ask a running one to stop at its next progress report"""
+    conn = _connect()
+    cur = conn.execute('UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?',
+                       (CANCELLED, time.time(), job_id, QUEUED))
+    if not cur.rowcount:
+        cur = conn.execute('UPDATE jobs SET cancel = 1 WHERE id = ? AND status = ?', (job_id, RUNNING))
+    return cur.rowcount > 0
+
+
+def claim(worker):
+    """Atomically take the oldest queued job, first requeuing jobs whose worker stopped heartbeating.
+
+    Returns (job_id, kind, params, lease) or None; the lease is (worker, attempt).
+    """
+    conn = _connect()
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('''UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                        error = CASE WHEN attempts >= ? THEN 'Worker lost' ELSE error END,
+                        finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END
+                        WHERE status = ? AND heartbeat < ?''',
+                     (JOB_MAX_ATTEMPTS, FAILED, QUEUED, JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, now, RUNNING, now - JOB_LEASE))
+        row = conn.execute('SELECT id, kind, params, attempts FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1',
+                           (QUEUED,)).fetchone()
+        if row is not None:
+            conn.execute('''UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat = ?,
+                            attempts = attempts + 1, progress = 0, message = NULL WHERE id = ?''',
+                         (RUNNING, worker, now, now, row['id']))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return None if row is None else (row['id'], row['kind'], json.loads(row['params']), (worker, row['attempts'] + 1))
+
+
+# Updates from a worker only apply while it still holds the job's lease
+LEASED = 'id = ? AND status = ? AND worker = ? AND attempts = ?'
+
+
+def _heartbeat(job_id, lease):
+    """Refresh the lease; False once it has been lost"""
+    return _connect().execute(f'UPDATE jobs SET heartbeat = ? WHERE {LEASED}',
+                              (time.time(), job_id, RUNNING, *lease)).rowcount > 0
+
+
+def _report(job_id, lease, progress, message):
+    """Store progress (refreshing the heartbeat); True when the job has been asked to cancel"""
+    conn = _connect()
+    cur = conn.execute(f'UPDATE jobs SET progress = ?, message = ?, heartbeat = ? WHERE {LEASED}',
+                       (progress, message, time.time(), job_id, RUNNING, *lease))
+    if not cur.rowcount:
+        raise LeaseLost()
+    row = conn.execute('SELECT cancel FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return bool(row and row[0])
+
+
+def _finish(job_id, lease, status, result=None, error=None):
+    """Record the outcome; False when the lease was lost and the job belongs to another run"""
+    return _connect().execute(
+        f'UPDATE jobs SET status = ?, result = ?, error = ?, progress = COALESCE(?, progress), finished_at = ? WHERE {LEASED}',
+        (status, None if result is None else json.dumps(result, default=to_builtin), error,
+         1.0 if status == DONE else None, time.time(), job_id, RUNNING, *lease)).rowcount > 0
+
+
+def prune(keep_days=JOB_KEEP_DAYS):
+    """Delete finished jobs older than keep_days"""
+    placeholders = ','.join('?' * len(FINISHED))
+    return _connect().execute(f'DELETE FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?',
+                              (*FINISHED, time.time() - keep_days * 86400)).rowcount
+
+
+# --- Workers ---
+
+def run_job(job_id, kind, params, lease):
+    """Execute one claimed job and record its outcome; stops at the next progress report once the lease is lost"""
+    lost = threading.Event()
+
+    def progress(fraction, message=None):
+        if lost.is_set():
+            raise LeaseLost()
+        if _report(job_id, lease, round(float(fraction), 4), message):
+            raise JobCancelled()
+
+    # Heartbeat from a side thread so long steps without progress reports keep the lease
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(JOB_LEASE / 4):
+            if not _heartbeat(job_id, lease):
+                lost.set()
+                return
+
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+    try:
+        finished = _finish(job_id, lease, DONE, result=JOB_KINDS[kind](params, progress))
+    except LeaseLost:
+        finished = False
+    except JobCancelled:
+        finished = _finish(job_id, lease, CANCELLED, error='Cancelled')
+    except Exception as e:
+        traceback.print_exc()
+        finished = _finish(job_id, lease, FAILED, error=str(e))
+    finally:
+        stop.set()
+        beat.join()
+    if not finished:
+        print(f'Job {job_id} lost its lease (attempt {lease[1]}); outcome discarded')
+
+
+def work(burst=False, name=None):
+    """Worker loop: claim and run jobs until stopped (or, with burst, until the queue is empty)"""
+    worker = name or f'{socket.gethostname()}:{os.getpid()}'
+    while True:
+        job = claim(worker)
+        if job is None:
+            if burst:
+                return
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+        run_job(*job)
+
+
+def run_workers(processes, burst=False):
+    """Run `processes` worker processes and wait for them"""
+    if processes <= 1:
+        return work(burst)
+    pool = [multiprocessing.Process(target=work, args=(burst,), daemon=True) for _ in range(processes)]
+    for p in pool:
+        p.start()
+    try:
+        for p in pool:
+            p.join()
+    except KeyboardInterrupt:
+        for p in pool:
+            p.terminate()
+
+
+# --- Job kinds ---
+
+@job_kind('backtest_universe')
+def backtest_universe(params, progress):
+    """Backtest one strategy over many tickers; returns each ticker's summary"""
+    from utils import run_backtest
+    tickers = params.get('tickers') or []
+    if not tickers:
+        raise ValueError('tickers is required')
+    options = {k: params[k] for k in ('features', 'threshold', 'holding_period', 'allow_short', 'interval',
+                                      'resample', 'commission', 'slippage_bps', 'atr_slippage') if k in params}
+    results, errors = {}, {}
+    for i, ticker in enumerate(tickers):
+        progress(i / len(tickers), f'Backtesting {ticker}')
+        try:
+            output = run_backtest(ticker, params['start'], params['end'], persist=False, **options)
+            results[ticker] = dict(output['summary'], total_cost_pct=output['costs']['total_cost_pct'])
+        except Exception as e:
+            errors[ticker] = str(e)
+    return {'results': results, 'errors': errors}
+
+
+@job_kind('optimize_portfolio')
+def optimize_portfolio_job(params, progress):
+    from utils import load_portfolio_prices, optimize_prices
+    progress(0.0, 'Downloading prices')
+    prices, dropped = load_portfolio_prices(params.get('tickers'), params.get('quantities'))
+    progress(0.5, 'Optimizing')
+    return optimize_prices(prices, params.get('risk_free_rate', 0.02), dropped)
+
+
+@job_kind('portfolio_backtest')
+def portfolio_backtest_job(params, progress):
+    from utils import load_price_panel, backtest_portfolio_prices
+    progress(0.0, 'Loading prices')
+    prices, dropped = load_price_panel(params.get('tickers') or [], params['start'], params['end'])
+    progress(0.3, 'Backtesting')
+    return backtest_portfolio_prices(prices, params.get('lookback', 252), params.get('rebalance', 'M'),
+                                     params.get('risk_free_rate', 0.02), params.get('cost_bps', 0.0), dropped)
+
+
+@job_kind('retrain')
+def retrain_job(params, progress):
+    from utils import retrain_model
+    progress(0.0, f"Retraining on {params.get('ticker')}")
+    return retrain_model(params['ticker'], params['start'], params['end'], params.get('features'),
+                         params.get('model_name', 'latest_model.pkl'), params.get('interval', '1d'))
+
+
+@job_kind('snapshots')
+def snapshots_job(params, progress):
+    import snapshots
+    tickers = params.get('tickers') or [t for t in snapshots.SNAPSHOT_TICKERS.split(',') if t]
+    start, end = snapshots.default_range()
+    start, end = params.get('start', start), params.get('end', end)
+    stored, failed = 0, {}
+    for i, ticker in enumerate(tickers):
+        progress(i / len(tickers), f'Snapshotting {ticker}')
+        n, errors = snapshots.build([ticker], start, end, params.get('feature_sets'))
+        stored += n
+        failed.update(errors)
+    return {'stored': stored, 'failed': failed, 'pruned': snapshots.prune()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Background job workers')
+    sub = parser.add_subparsers(dest='command', required=True)
+    worker = sub.add_parser('worker', help='Run worker processes')
+    worker.add_argument('--processes', type=int, default=int(os.getenv('JOB_WORKERS', os.cpu_count() or 1)))
+    worker.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+    submit_cmd = sub.add_parser('submit', help='Queue a job')
+    submit_cmd.add_argument('kind', choices=sorted(JOB_KINDS))
+    submit_cmd.add_argument('params', nargs='?', default='{}', help='JSON parameters')
+    status = sub.add_parser('status', help='Show a job')
+    status.add_argument('job_id')
+    sub.add_parser('prune', help='Delete old finished jobs')
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        run_workers(args.processes, args.burst)
+    elif args.command == 'submit':
+        print(submit(args.kind, json.loads(args.params)))
+    elif args.command == 'status':
+        print(json.dumps(get(args.job_id), indent=2))
+    else:
+        print(f'Pruned {prune()} jobs')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Compare throughput of the WSGI and ASGI serving modes.
+
+Start both servers, then point this script at them:
+
+    python app.py                          # WSGI dev server on :5000
+    uvicorn asgi:asgi_app --port 8000      # ASGI mode on :8000
+    python loadtest.py http://localhost:5000 http://localhost:8000 --endpoint /sentiment -c 32 -n 200
+
+Each request is charged to the client's compute budget, so raise
+ADMISSION_CLIENT_BUDGET (or set it to 0 to disable it) before running large
+loads.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+PAYLOADS = {
+    '/predict': {'ticker': 'AAPL', 'start': '2023-01-01', 'end': '2024-01-01'},
+    '/backtest': {'ticker': 'AAPL', 'start': '2023-01-01', 'end': '2024-01-01'},
+    '/sentiment': {'ticker': 'AAPL'},
+    '/optimize_portfolio': {'tickers': ['AAPL', 'MSFT', 'GOOGL'], 'quantities': [1, 1, 1]},
+    '/api/top_gainers': None,
+    '/api/top_losers': None,
+    '/list_models': None,
+}
+
+
+def _one(session, url, payload):
+    t0 = time.perf_counter()
+    try:
+        if payload is None:
+            resp = session.get(url, timeout=120)
+        else:
+            resp = session.post(url, json=payload, timeout=120)
+        ok = resp.status_code == 200
+        status = resp.status_code
+    except requests.RequestException:
+        ok, status = False, None
+    return time.perf_counter() - t0, ok, status
+
+
+def run_load(base_url, endpoint, payload, concurrency, total):
+    url = base_url.rstrip('/') + endpoint
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: _one(session, url, payload), range(total)))
+    elapsed = time.perf_counter() - t0
+    latencies = sorted(r[0] for r in results)
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    statuses = {}
+    for _, _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'url': url,
+        'requests': total,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 2),
+        'success': sum(1 for r in results if r[1]),
+        'statuses': statuses,
+        'latency_p50_ms': round(pct(0.50) * 1000, 1),
+        'latency_p95_ms': round(pct(0.95) * 1000, 1),
+        'latency_p99_ms': round(pct(0.99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base_urls', nargs='+', help='Servers to compare, e.g. http://localhost:5000 http://localhost:8000')
+    parser.add_argument('--endpoint', default='/sentiment', choices=sorted(PAYLOADS))
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-n', '--requests', type=int, default=100)
+    parser.add_argument('--payload', help='JSON body overriding the default payload for the endpoint')
+    args = parser.parse_args()
+
+    payload = json.loads(args.payload) if args.payload else PAYLOADS[args.endpoint]
+    reports = [run_load(url, args.endpoint, payload, args.concurrency, args.requests) for url in args.base_urls]
+    for report in reports:
+        print(json.dumps(report, indent=2))
+    if len(reports) > 1:
+        base = reports[0]['throughput_rps'] or 1e-9
+        for report in reports[1:]:
+            print(f"{report['url']}: {report['throughput_rps'] / base:.2f}x throughput of {reports[0]['url']}")
+
+
+if __name__ == "__main__":
+    main()
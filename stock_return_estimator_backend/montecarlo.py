@@ -0,0 +1,133 @@
+import numpy as np
+from scipy.signal import lfilter
+
+# Monte Carlo forecast distribution for /predict. Paths are simulated in
+# batches of at most MC_BATCH_ELEMENTS (paths x steps) from the model's
+# in-sample residuals: bootstrapped as they are, or standardized and rescaled
+# by a GARCH(1,1) volatility recursion. Every batch is folded into a
+# per-step histogram of log price changes and the quantiles are read from the
+# histogram at the end, so memory stays bounded whatever the path count.
+
+MC_MAX_PATHS = 200_000
+MC_MAX_HORIZON = 252
+MC_BATCH_ELEMENTS = 500_000
+MC_BINS = 4096
+MC_GRID_SD = 10             # histogram spans +-10 standard deviations of the cumulative move per step
+GARCH_ALPHA, GARCH_BETA = 0.08, 0.90  # fixed, RiskMetrics-like persistence; the level comes from the residuals
+VOLATILITY_MODELS = ('garch', 'bootstrap')
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def options(spec):
+    """Normalize the /predict `forecast` parameter (true, a horizon or an options object); None when not requested"""
+    if spec is None or spec is False or spec == 0:
+        return None
+    if spec is True:
+        spec = {}
+    elif isinstance(spec, int):
+        spec = {'horizon': spec}
+    elif not isinstance(spec, dict):
+        raise ValueError('forecast must be true, a horizon in bars or an object with horizon, paths, seed and volatility.')
+    try:
+        # int(True) would quietly be 1
+        if any(isinstance(spec.get(k), bool) for k in ('horizon', 'paths', 'seed')):
+            raise TypeError
+        horizon = int(spec.get('horizon', 60))
+        paths = int(spec.get('paths', 10_000))
+        seed = int(spec.get('seed', 0))
+    except (TypeError, ValueError):
+        raise ValueError('forecast horizon, paths and seed must be integers.')
+    volatility = spec.get('volatility', 'garch')
+    if not 1 <= horizon <= MC_MAX_HORIZON:
+        raise ValueError(f'forecast horizon must be between 1 and {MC_MAX_HORIZON} bars.')
+    if not 100 <= paths <= MC_MAX_PATHS:
+        raise ValueError(f'forecast paths must be between 100 and {MC_MAX_PATHS}.')
+    if volatility not in VOLATILITY_MODELS:
+        raise ValueError(f"forecast volatility must be one of: {', '.join(VOLATILITY_MODELS)}.")
+    return {'horizon': horizon, 'paths': paths, 'seed': seed, 'volatility': volatility}
+
+
+def garch_filter(residuals, alpha=GARCH_ALPHA, beta=GARCH_BETA):
+    """Conditional variance of each residual and of the next one, targeting the sample variance"""
+    var = residuals.var()
+    omega = var * (1 - alpha - beta)
+    # s2[t+1] = omega + alpha * e[t]^2 + beta * s2[t], starting from s2[0] = var
+    s2 = lfilter([1.0], [1.0, -beta], omega + alpha * residuals ** 2, zi=[beta * var])[0]
+    return np.concatenate(([var], s2[:-1])), s2[-1], omega
+
+
+def _quantiles(counts, lo, width, qs):
+    """Interpolated quantiles of each row of a histogram"""
+    cdf = np.cumsum(counts, axis=1)
+    total = cdf[:, -1:]
+    rows = np.arange(len(counts))
+    out = {}
+    for q in qs:
+        target = q * total
+        k = np.minimum((cdf < target).sum(axis=1), counts.shape[1] - 1)
+        below = np.where(k > 0, cdf[rows, k - 1], 0)
+        frac = (target[:, 0] - below) / np.maximum(counts[rows, k], 1)
+        out[q] = lo + (k + frac) * width
+    return out
+
+
+def simulate(last_price, residuals, first_mean, mean, horizon=60, paths=10_000, seed=0, volatility='garch',
+             quantiles=QUANTILES, bins=MC_BINS):
+    """Quantile bands, mean path and probability of ending higher for `paths` simulated price paths.
+
+    Step 1 drifts by the model's prediction (first_mean), later steps by the
+    in-sample mean return. The same seed gives the same result.
+    """
+    residuals = np.asarray(residuals, dtype=np.float64)
+    if len(residuals) < 2:
+        raise ValueError('Not enough history to simulate a forecast.')
+    rng = np.random.default_rng(seed)
+    drift = np.full(horizon, mean, dtype=np.float64)
+    drift[0] = first_mean
+    if volatility == 'garch':
+        s2, var0, omega = garch_filter(residuals)
+        shocks = residuals / np.sqrt(s2)
+        step_sd = np.sqrt(max(var0, residuals.var()))
+    else:
+        shocks = residuals
+        step_sd = residuals.std()
+
+    # Per-step grid around the drift-only path
+    steps = np.arange(1, horizon + 1)
+    half = MC_GRID_SD * step_sd * np.sqrt(steps)
+    lo = np.cumsum(np.log1p(drift)) - half
+    width = 2 * half / bins
+    offsets = np.arange(horizon) * bins
+
+    counts = np.zeros(horizon * bins, dtype=np.int64)
+    price_sum = np.zeros(horizon)
+    ended_up = 0
+    batch = max(MC_BATCH_ELEMENTS // horizon, 1)
+    for start in range(0, paths, batch):
+        n = min(batch, paths - start)
+        draws = shocks[rng.integers(0, len(shocks), (n, horizon))]
+        if volatility == 'garch':
+            log_change = np.empty((n, horizon))
+            level = np.zeros(n)
+            var = np.full(n, var0)
+            for t in range(horizon):
+                eps = np.sqrt(var) * draws[:, t]
+                level += np.log1p(np.maximum(drift[t] + eps, -0.99))
+                log_change[:, t] = level
+                var = omega + GARCH_ALPHA * eps * eps + GARCH_BETA * var
+        else:
+            log_change = np.cumsum(np.log1p(np.maximum(drift + draws, -0.99)), axis=1)
+        del draws
+        idx = ((log_change - lo) / width).astype(np.int64)
+        np.clip(idx, 0, bins - 1, out=idx)  # the edge bins absorb the (rare) paths beyond the grid
+        idx += offsets
+        counts += np.bincount(idx.ravel(), minlength=horizon * bins)
+        ended_up += int((log_change[:, -1] > 0).sum())
+        price_sum += np.exp(log_change).sum(axis=0)
+
+    bands = _quantiles(counts.reshape(horizon, bins), lo, width, quantiles)
+    return {
+        'quantiles': {q: last_price * np.exp(v) for q, v in bands.items()},
+        'mean': last_price * price_sum / paths,
+        'prob_up': ended_up / paths,
+    }
@@ -0,0 +1,92 @@
+import bisect
+import os
+import threading
+import time
+
+import numpy as np
+
+# Top gainers/losers computed from the local bar store. The board keeps every
+# ticker's latest daily move in a list sorted by percent change, updated as
+# bars arrive, so gainers are read from one end and losers from the other.
+
+MOVERS_UNIVERSE = os.getenv('MOVERS_UNIVERSE', ','.join([
+    'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS', 'HINDUNILVR.NS', 'ITC.NS',
+    'SBIN.NS', 'BHARTIARTL.NS', 'KOTAKBANK.NS', 'LT.NS', 'AXISBANK.NS', 'ASIANPAINT.NS', 'MARUTI.NS',
+    'SUNPHARMA.NS', 'TITAN.NS', 'BAJFINANCE.NS', 'WIPRO.NS', 'ULTRACEMCO.NS', 'NESTLEIND.NS',
+    'HCLTECH.NS', 'TATAMOTORS.NS', 'POWERGRID.NS', 'NTPC.NS', 'ONGC.NS', 'TECHM.NS', 'M&M.NS',
+    'TATASTEEL.NS', 'ADANIPORTS.NS', 'JSWSTEEL.NS',
+]))
+MOVERS_TTL = int(os.getenv('MOVERS_TTL', 600))  # seconds between universe refreshes
+MOVERS_LOOKBACK_DAYS = 370                      # enough daily bars for the 52-week range
+YEAR_BARS = 252
+
+
+def universe():
+    return [t.strip().upper() for t in MOVERS_UNIVERSE.split(',') if t.strip()]
+
+
+def daily_move(ticker, bars):
+    """Latest close-to-close move of a ticker in the fields the app's movers pages read, or None"""
+    if len(bars) < 2:
+        return None
+    close = bars.close.astype(np.float64)
+    price, prev = close[-1], close[-2]
+    if not np.isfinite(price) or not np.isfinite(prev) or prev == 0:
+        return None
+    year = slice(-YEAR_BARS, None)
+    return {
+        'symbol': ticker,
+        'price': round(float(price), 2),
+        'change': round(float(price - prev), 2),
+        'percent': round(float((price / prev - 1) * 100), 2),
+        'volume': int(bars.volume[-1]),
+        'high52': round(float(np.nanmax(bars.high[year])), 2),
+        'low52': round(float(np.nanmin(bars.low[year])), 2),
+        'date': time.strftime('%Y-%m-%d', time.gmtime(bars.last_ts)),
+    }
+
+
+class MoversBoard:
+    """Latest daily move per ticker, kept sorted by percent change"""
+
+    def __init__(self, tickers=None):
+        self.tickers = set(tickers) if tickers is not None else None
+        self.moves = {}
+        self.ranking = []  # sorted (percent, ticker)
+        self.as_of = {}    # ticker -> timestamp of the last bar its move was computed from
+        self.refreshed_at = 0.0
+        self.lock = threading.RLock()
+
+    def update(self, ticker, move):
+        """Insert, move or (with move=None) remove a ticker in the ranking"""
+        with self.lock:
+            old = self.moves.pop(ticker, None)
+            if old is not None:
+                del self.ranking[bisect.bisect_left(self.ranking, (old['percent'], ticker))]
+            if move is not None:
+                self.moves[ticker] = move
+                bisect.insort(self.ranking, (move['percent'], ticker))
+
+    def on_bars(self, ticker, interval, bars):
+        """BarStore listener: re-rank a universe ticker when its daily bars change"""
+        if interval != '1d' or not len(bars) or (self.tickers is not None and ticker not in self.tickers):
+            return
+        last = bars.last_ts
+        with self.lock:
+            if last < self.as_of.get(ticker, last):
+                # A historical range replaced the cached bars; keep the newer move
+                return
+            self.as_of[ticker] = last
+            self.update(ticker, daily_move(ticker, bars))
+
+    def top(self, n=20, losers=False):
+        """Top n gainers (or losers), read straight off the sorted ranking"""
+        with self.lock:
+            keys = self.ranking[:n] if losers else self.ranking[max(len(self.ranking) - n, 0):][::-1]
+            return [self.moves[ticker] for _, ticker in keys]
+
+    def stale(self, ttl=MOVERS_TTL):
+        return time.time() - self.refreshed_at > ttl
+
+    def __len__(self):
+        return len(self.moves)
@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+# Local news archive. Articles are ingested once (from NewsAPI or from JSON
+# files), scored for sentiment at ingest and stored in SQLite without their
+# full content. An inverted index maps each registered ticker to the articles
+# that mention its symbol or company name, and to every article NewsAPI
+# returned for it, clustered by (ticker, publish time) so a window query is
+# one range scan. Each ticker's fetched coverage is a set of disjoint spans
+# that only grows by what NewsAPI actually returned, so a refresh cut short
+# leaves exactly the missing slice to query next time. Refreshes run at most
+# every NEWS_TTL seconds per ticker, whether or not they covered the window.
+NEWS_DB = os.getenv('NEWS_DB', 'news.db')
+NEWS_TTL = int(os.getenv('NEWS_TTL', 900))  # seconds before a ticker's articles are refreshed from NewsAPI
+NEWS_MAX_ARTICLES = 20                      # articles returned per query; the summary covers the whole window
+
+_local = threading.local()
+_TOKEN = re.compile(r'[a-z0-9&]+')
+
+
+def _connect():
+    # One connection per thread and process; SQLite connections cannot be shared
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'key', None) != (os.getpid(), NEWS_DB):
+        conn = sqlite3.connect(NEWS_DB, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            published INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            source TEXT NOT NULL,
+            polarity REAL NOT NULL,
+            subjectivity REAL NOT NULL
+        )''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS postings (
+            ticker TEXT NOT NULL,
+            published INTEGER NOT NULL,
+            article INTEGER NOT NULL,
+            polarity REAL NOT NULL,
+            PRIMARY KEY (ticker, published, article)
+        ) WITHOUT ROWID''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS tickers (
+            ticker TEXT PRIMARY KEY,
+            name TEXT,
+            refreshed_at REAL
+        )''')
+        if 'refreshed_at' not in {row[1] for row in conn.execute('PRAGMA table_info(tickers)')}:
+            # Archives written before coverage spans were kept per ticker
+            conn.execute('ALTER TABLE tickers ADD COLUMN refreshed_at REAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS coverage (
+            ticker TEXT NOT NULL,
+            covered_from INTEGER NOT NULL,
+            covered_to INTEGER NOT NULL,
+            PRIMARY KEY (ticker, covered_from)
+        ) WITHOUT ROWID''')
+        _local.conn, _local.key = conn, (os.getpid(), NEWS_DB)
+    return conn
+
+
+def tokens(text):
+    return _TOKEN.findall((text or '').lower())
+
+
+def aliases(ticker, name=None):
+    """Token sequences that count as a mention: the symbol and the company name"""
+    terms = {tuple(tokens(ticker))}
+    if name:
+        terms.add(tuple(tokens(name)))
+    return {t for t in terms if t}
+
+
+class Matcher:
+    """Finds which tickers a text mentions, keyed by the first token of each alias"""
+
+    def __init__(self, names):
+        self.by_first = {}
+        for ticker, name in names.items():
+            for alias in aliases(ticker, name):
+                self.by_first.setdefault(alias[0], []).append((alias, ticker))
+
+    def __call__(self, text):
+        words = tokens(text)
+        found = set()
+        for i, word in enumerate(words):
+            for alias, ticker in self.by_first.get(word, ()):
+                if tuple(words[i:i + len(alias)]) == alias:
+                    found.add(ticker)
+        return found
+
+
+def epoch(published):
+    return int(pd.Timestamp(published).timestamp())
+
+
+def _names(conn):
+    return dict(conn.execute('SELECT ticker, name FROM tickers'))
+
+
+def add(articles, ticker=None):
+    """Store scored articles and index them under every registered ticker they mention; returns how many were new.
+
+    Each article is a score_article dict (title, description, url,
+    publishedAt, source and sentiment). With `ticker` (the ticker they were
+    fetched for), every article is also indexed under it, stored or not.
+    """
+    conn = _connect()
+    match = Matcher(_names(conn))
+    added = 0
+    with conn:
+        for article in articles:
+            published = epoch(article['publishedAt'])
+            url = article.get('url') or f"{article['title']}|{article['publishedAt']}"
+            sentiment = article['sentiment']
+            cur = conn.execute('''INSERT OR IGNORE INTO articles
+                (url, published, title, description, source, polarity, subjectivity) VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                               (url, published, article['title'] or '', article['description'] or '',
+                                article['source'] or '', sentiment['polarity'], sentiment['subjectivity']))
+            if cur.rowcount:
+                added += 1
+                article_id, polarity = cur.lastrowid, sentiment['polarity']
+                tickers = match(f"{article['title']}. {article['description']}")
+            elif ticker:
+                # Already archived (e.g. fetched for another ticker)
+                article_id, published, polarity = conn.execute(
+                    'SELECT id, published, polarity FROM articles WHERE url = ?', (url,)).fetchone()
+                tickers = set()
+            else:
+                continue
+            if ticker:
+                tickers.add(ticker)
+            conn.executemany('INSERT OR IGNORE INTO postings VALUES (?, ?, ?, ?)',
+                             [(t, published, article_id, polarity) for t in tickers])
+    return added
+
+
+def register(ticker, name=None):
+    """Add a ticker (and company name) to the index, indexing articles already in the archive"""
+    conn = _connect()
+    known = conn.execute('SELECT name FROM tickers WHERE ticker = ?', (ticker,)).fetchone()
+    if known is not None and (known[0] == name or name is None):
+        return
+    with conn:
+        conn.execute('INSERT INTO tickers (ticker, name) VALUES (?, ?) ON CONFLICT (ticker) DO UPDATE SET name = excluded.name',
+                     (ticker, name))
+        match = Matcher({ticker: name})
+        rows = conn.execute('SELECT id, published, polarity, title, description FROM articles')
+        conn.executemany('INSERT OR IGNORE INTO postings VALUES (?, ?, ?, ?)',
+                         [(ticker, published, article, polarity)
+                          for article, published, polarity, title, description in rows
+                          if match(f'{title}. {description}')])
+
+
+def resolve(query):
+    """Ticker for a symbol or a registered company name, or None"""
+    conn = _connect()
+    symbol = query.strip().upper()
+    if conn.execute('SELECT 1 FROM tickers WHERE ticker = ?', (symbol,)).fetchone():
+        return symbol
+    row = conn.execute('SELECT ticker FROM tickers WHERE lower(name) = lower(?)', (query.strip(),)).fetchone()
+    return row[0] if row else None
+
+
+def stale(ticker, now=None):
+    """True when a ticker's articles have not been refreshed from NewsAPI in the last NEWS_TTL seconds"""
+    now = time.time() if now is None else now
+    row = _connect().execute('SELECT refreshed_at FROM tickers WHERE ticker = ?', (ticker,)).fetchone()
+    return row is None or row[0] is None or now - row[0] > NEWS_TTL
+
+
+def mark_refreshed(ticker, now=None):
+    """Record a refresh attempt, successful or not, so the next one waits NEWS_TTL seconds"""
+    conn = _connect()
+    with conn:
+        conn.execute('UPDATE tickers SET refreshed_at = ? WHERE ticker = ?', (time.time() if now is None else now, ticker))
+
+
+def fetch_ranges(ticker, days, now=None):
+    """Epoch ranges of the last `days` days not yet fetched for a ticker, newest first"""
+    now = int(time.time() if now is None else now)
+    start = now - days * 86400
+    spans = _connect().execute('''SELECT covered_from, covered_to FROM coverage
+                                  WHERE ticker = ? AND covered_to > ? AND covered_from < ?
+                                  ORDER BY covered_from DESC''', (ticker, start, now)).fetchall()
+    ranges, until = [], now
+    for covered_from, covered_to in spans:
+        if covered_to < until:
+            ranges.append((covered_to, until))
+        until = min(until, covered_from)
+    if start < until:
+        ranges.append((start, until))
+    return ranges
+
+
+def mark_fetched(ticker, start, end):
+    """Record that NewsAPI returned everything for a ticker between two epochs, merging touching spans"""
+    start, end = int(start), int(end)
+    conn = _connect()
+    touching = 'WHERE ticker = ? AND covered_from <= ? AND covered_to >= ?'
+    with conn:
+        spans = conn.execute(f'SELECT covered_from, covered_to FROM coverage {touching}', (ticker, end, start)).fetchall()
+        conn.execute(f'DELETE FROM coverage {touching}', (ticker, end, start))
+        for covered_from, covered_to in spans:
+            start, end = min(start, covered_from), max(end, covered_to)
+        conn.execute('INSERT INTO coverage VALUES (?, ?, ?)', (ticker, start, end))
+
+
+def query(ticker, days=7, limit=NEWS_MAX_ARTICLES, now=None):
+    """(most recent articles, average polarity, article count) for a ticker over the last `days` days"""
+    now = time.time() if now is None else now
+    since, until = int(now - days * 86400), int(now)
+    conn = _connect()
+    count, polarity = conn.execute('''SELECT COUNT(*), AVG(polarity) FROM postings
+                                      WHERE ticker = ? AND published BETWEEN ? AND ?''', (ticker, since, until)).fetchone()
+    rows = conn.execute('''SELECT a.title, a.description, a.url, a.published, a.source, a.polarity, a.subjectivity
+                           FROM postings p JOIN articles a ON a.id = p.article
+                           WHERE p.ticker = ? AND p.published BETWEEN ? AND ?
+                           ORDER BY p.published DESC LIMIT ?''', (ticker, since, until, limit)).fetchall()
+    articles = [{
+        'title': title,
+        'description': description,
+        'url': url,
+        'publishedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(published)),
+        'source': source,
+        'polarity': polarity_,
+        'subjectivity': subjectivity,
+    } for title, description, url, published, source, polarity_, subjectivity in rows]
+    return articles, polarity or 0.0, count
+
+
+def load_file(path):
+    """NewsAPI-style articles from a JSON file (a response object or a list) or a JSON-lines file"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data.get('articles', []) if isinstance(data, dict) else data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local news archive')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest = sub.add_parser('ingest', help='Score and store articles from NewsAPI-style JSON files')
+    ingest.add_argument('files', nargs='+')
+    ingest.add_argument('--ticker', help='Also index every article under this (registered) ticker, e.g. a NewsAPI response for it')
+    reg = sub.add_parser('register', help='Index a ticker and its company name')
+    reg.add_argument('ticker')
+    reg.add_argument('name', nargs='?')
+    q = sub.add_parser('query', help='Sentiment for a ticker or company name over a window')
+    q.add_argument('ticker')
+    q.add_argument('--days', type=int, default=30)
+    q.add_argument('--until', help='End of the window as a date (default: now)')
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        from utils import score_article
+        ticker = args.ticker and resolve(args.ticker)
+        if args.ticker and ticker is None:
+            raise SystemExit(f'{args.ticker} is not registered')
+        for path in args.files:
+            print(f'{path}: {add((score_article(a) for a in load_file(path)), ticker)} new articles')
+    elif args.command == 'register':
+        register(args.ticker.upper(), args.name)
+    else:
+        ticker = resolve(args.ticker)
+        if ticker is None:
+            raise SystemExit(f'{args.ticker} is not registered')
+        articles, polarity, count = query(ticker, args.days, now=epoch(args.until) if args.until else None)
+        print(json.dumps({'ticker': ticker, 'polarity': round(polarity, 3), 'article_count': count,
+                          'latest': articles[:5]}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import contextvars
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import wraps
+
+# Opt-in request profiling. A request is profiled when it carries
+# `X-Profile: 1` (or `?profile=1`) together with a valid `X-Admin-Token`, or
+# when it is picked by PROFILE_SAMPLE_RATE. Without PROFILE_ADMIN_TOKEN set,
+# only sampling works and the admin endpoints stay disabled.
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0.0))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))
+PROFILE_MAX_CONCURRENT = int(os.getenv('PROFILE_MAX_CONCURRENT', 2))
+PROFILE_INTERVAL = max(float(os.getenv('PROFILE_INTERVAL', 0.005)), 0.001)
+PROFILE_MAX_STACKS = 2000
+ADMIN_TOKEN = os.getenv('PROFILE_ADMIN_TOKEN')
+
+PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{6}_[0-9a-f]{8}$')
+
+_active_profile = contextvars.ContextVar('active_profile', default=None)
+_slots = threading.BoundedSemaphore(PROFILE_MAX_CONCURRENT)
+_write_lock = threading.Lock()
+
+
+def _collapse(frame):
+    """Turn a frame into a root-first 'a;b;c' stack string"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Samples the stacks of the threads doing work for one request"""
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.threads = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def add_thread(self, ident):
+        self.threads.add(ident)
+
+    def remove_thread(self, ident):
+        self.threads.discard(ident)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+                    self.samples += 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+
+def admin_authorized(token):
+    """Constant-time check of an admin token; always False when no token is configured"""
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def should_profile(flag, token):
+    if flag and admin_authorized(token):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def begin(flag=False, token=None):
+    """Start profiling the current request if it asked for it (or was sampled) and a slot is free"""
+    if not should_profile(flag, token) or not _slots.acquire(blocking=False):
+        _active_profile.set(None)
+        return None
+    sampler = StackSampler()
+    sampler.add_thread(threading.get_ident())
+    _active_profile.set(sampler)
+    sampler.start()
+    return sampler
+
+
+def end(sampler, method, path, status):
+    """Stop a request profile and write it to the on-disk ring buffer"""
+    _active_profile.set(None)
+    if sampler is None:
+        return None
+    try:
+        sampler.stop()
+        return _write(sampler, method, path, status)
+    finally:
+        _slots.release()
+
+
+def track_threads(fn):
+    """Wrap work submitted to a thread pool so the active request profile samples that thread too"""
+    sampler = _active_profile.get()
+    if sampler is None:
+        return fn
+
+    @wraps(fn)
+    def run(*args, **kwargs):
+        ident = threading.get_ident()
+        sampler.add_thread(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            sampler.remove_thread(ident)
+    return run
+
+
+def _write(sampler, method, path, status):
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    record = {
+        'id': profile_id,
+        'method': method,
+        'path': path,
+        'status': status,
+        'duration_ms': round(sampler.duration * 1000, 2),
+        'samples': sampler.samples,
+        'interval_ms': sampler.interval * 1000,
+        'stacks': dict(sampler.stacks.most_common(PROFILE_MAX_STACKS)),
+    }
+    with _write_lock:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, f'{profile_id}.json'), 'w') as f:
+            json.dump(record, f)
+        # Ring buffer: drop the oldest profiles beyond the limit
+        files = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith('.json'))
+        for old in files[:-PROFILE_MAX_FILES]:
+            os.remove(os.path.join(PROFILE_DIR, old))
+    return profile_id
+
+
+def list_profiles():
+    if not os.path.exists(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(PROFILE_DIR, name)) as f:
+            record = json.load(f)
+        record.pop('stacks', None)
+        profiles.append(record)
+    return profiles
+
+
+def collapsed_stacks(profile_id):
+    """A stored profile in collapsed-stack format ('frame;frame;frame count' per line), the input flamegraph.pl expects"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f'{profile_id}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        record = json.load(f)
+    return ''.join(f'{stack} {count}\n' for stack, count in record['stacks'].items())
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import cvxpy as cp
+except ImportError:  # installed with PyPortfolioOpt; checked when a backtest runs
+    cp = None
+
+# Rebalancing backtest for max-Sharpe portfolios. One price panel is loaded
+# up front; the rolling covariance is updated incrementally between rebalance
+# dates (add the new return rows, subtract the ones leaving the window); the
+# max-Sharpe problem is compiled once with cvxpy parameters and re-solved
+# warm-started from the previous weights; and weight drift between
+# rebalances is simulated per segment with array operations.
+
+TRADING_DAYS = 252
+WEIGHT_CUTOFF = 1e-4   # like EfficientFrontier.clean_weights
+FREQUENCIES = {'W': 'W', 'M': 'M', 'Q': 'Q', 'Y': 'Y'}
+
+
+def rebalance_points(dates, every, lookback):
+    """Positions in `dates` where the portfolio is re-optimized (at the close)"""
+    positions = np.arange(len(dates))
+    if isinstance(every, (int, np.integer)) or str(every).isdigit():
+        every = int(every)
+        if every < 1:
+            raise ValueError('rebalance must be a positive number of bars or one of W, M, Q, Y.')
+        points = positions[lookback::every]
+    else:
+        freq = FREQUENCIES.get(str(every).upper())
+        if freq is None:
+            raise ValueError('rebalance must be a positive number of bars or one of W, M, Q, Y.')
+        # Last trading day of each period
+        points = pd.Series(positions, index=dates).groupby(dates.to_period(freq)).max().to_numpy()
+        points = points[points >= lookback]
+    if not len(points) or points[0] >= len(dates) - 1:
+        # The portfolio must be held for at least one bar after the first rebalance
+        raise ValueError(f'Not enough history: need more than {lookback} bars before the first rebalance '
+                         'and at least one bar after it.')
+    return points
+
+
+class RollingMoments:
+    """Sum and cross-product sums of the last `window` return rows, kept current incrementally"""
+
+    def __init__(self, returns, window):
+        self.returns = returns
+        self.window = window
+        self.end = None
+
+    def move_to(self, end):
+        """Make the window cover return rows end-window .. end-1"""
+        r, w = self.returns, self.window
+        if self.end is None or end - self.end >= w:
+            block = r[end - w:end]
+            self.s1 = block.sum(axis=0)
+            self.s2 = block.T @ block
+        else:
+            new, old = r[self.end:end], r[self.end - w:end - w]
+            self.s1 += new.sum(axis=0) - old.sum(axis=0)
+            self.s2 += new.T @ new - old.T @ old
+        self.end = end
+
+    def covariance(self):
+        """Annualized sample covariance, as risk_models.sample_cov computes it"""
+        w = self.window
+        return (self.s2 - np.outer(self.s1, self.s1) / w) / (w - 1) * TRADING_DAYS
+
+
+class MaxSharpe:
+    """Long-only max-Sharpe problem compiled once and re-solved with new estimates.
+
+    Same transformation as EfficientFrontier.max_sharpe: minimize y'Σy subject
+    to (mu - rf)'y = 1, y >= 0, then weights = y / sum(y). Σ enters through its
+    Cholesky factor so the problem stays parametrized (DPP) and each solve
+    reuses the compiled problem, warm-started from the last solution.
+    """
+
+    def __init__(self, n_assets):
+        if cp is None:
+            raise RuntimeError('cvxpy is required for portfolio backtests.')
+        self.factor = cp.Parameter((n_assets, n_assets))
+        self.excess = cp.Parameter(n_assets)
+        self.y = cp.Variable(n_assets, nonneg=True)
+        self.problem = cp.Problem(cp.Minimize(cp.sum_squares(self.factor @ self.y)), [self.excess @ self.y == 1])
+        self.solver = 'OSQP' if 'OSQP' in cp.installed_solvers() else None
+
+    def solve(self, mu, cov, risk_free_rate, previous=None):
+        """Weights for these estimates, or None when no asset beats the risk-free rate or the solve fails"""
+        excess = mu - risk_free_rate
+        if not np.any(excess > 0):
+            return None
+        # Small ridge so the Cholesky factor exists for (near-)singular sample covariances
+        ridge = 1e-10 * max(np.trace(cov) / len(cov), 1e-12)
+        self.factor.value = np.linalg.cholesky(cov + ridge * np.eye(len(cov))).T
+        self.excess.value = excess
+        if previous is not None:
+            scale = excess @ previous
+            if scale > 0:
+                self.y.value = previous / scale
+        try:
+            self.problem.solve(solver=self.solver, warm_start=True)
+        except cp.SolverError:
+            return None
+        if self.y.value is None or self.problem.status not in ('optimal', 'optimal_inaccurate'):
+            return None
+        w = np.clip(self.y.value, 0, None)
+        w[w < WEIGHT_CUTOFF * w.sum()] = 0
+        total = w.sum()
+        return w / total if total > 0 else None
+
+
+def _segment(returns, weights):
+    """Portfolio returns and end-of-segment drifted weights for buy-and-hold weights over a block of return rows"""
+    growth = np.cumprod(1 + returns, axis=0)
+    value = growth @ weights
+    period = np.empty_like(value)
+    period[0] = value[0] - 1
+    period[1:] = value[1:] / value[:-1] - 1
+    return period, weights * growth[-1] / value[-1]
+
+
+def backtest(prices, lookback=TRADING_DAYS, every='M', risk_free_rate=0.02, cost_bps=0.0):
+    """Re-optimize max-Sharpe weights at each rebalance date and simulate the portfolio between them"""
+    lookback = int(lookback)
+    if lookback < 2:
+        raise ValueError('lookback must be at least 2 bars.')
+    p = prices.to_numpy(dtype=np.float64)
+    returns = p[1:] / p[:-1] - 1          # row i is the return into bar i+1
+    points = rebalance_points(prices.index, every, lookback)
+    n_assets = p.shape[1]
+
+    moments = RollingMoments(returns, lookback)
+    solver = MaxSharpe(n_assets)
+    start = points[0]
+    portfolio = np.zeros(len(p) - start - 1)
+    held = None        # weights currently held (drifted)
+    rebalances, failed = [], 0
+    schedule = list(points) + [len(p) - 1]
+    for d, next_d in zip(schedule[:-1], schedule[1:]):
+        moments.move_to(d)
+        mu = (p[d] / p[d - lookback]) ** (TRADING_DAYS / lookback) - 1
+        weights = solver.solve(mu, moments.covariance(), risk_free_rate, held)
+        if weights is None:
+            failed += 1
+            weights = held if held is not None else np.full(n_assets, 1.0 / n_assets)
+        turnover = float(np.abs(weights - held).sum()) if held is not None else 1.0
+        rebalances.append((d, weights, turnover))
+        if next_d <= d:
+            continue
+        period, held = _segment(returns[d:next_d], weights)
+        # Trading costs are paid out of the first bar after the rebalance
+        period[0] = (1 + period[0]) * (1 - turnover * cost_bps / 1e4) - 1
+        portfolio[d - start:next_d - start] = period
+    return {
+        'dates': prices.index[start + 1:],
+        'returns': portfolio,
+        'rebalances': rebalances,
+        'failed_solves': failed,
+    }
+
+
+def summarize(returns, risk_free_rate=0.02):
+    """Annualized performance of a daily return series; drawdown as in the strategy backtest (peak minus value)"""
+    curve = np.cumprod(1 + returns)
+    years = len(returns) / TRADING_DAYS
+    annual_return = curve[-1] ** (1 / years) - 1 if years > 0 and curve[-1] > 0 else np.nan
+    annual_vol = returns.std(ddof=1) * np.sqrt(TRADING_DAYS) if len(returns) > 1 else np.nan
+    drawdown = np.maximum.accumulate(curve) - curve
+    return curve, {
+        'total_return': (curve[-1] - 1) * 100,
+        'annual_return': annual_return * 100,
+        'annual_volatility': annual_vol * 100,
+        'sharpe_ratio': (annual_return - risk_free_rate) / annual_vol if annual_vol else np.nan,
+        'max_drawdown': drawdown.max() * 100,
+    }
@@ -0,0 +1,203 @@
+import numpy as np
+
+# Rolling risk metrics for backtest results. Every statistic is O(n) in the
+# series length regardless of the window: sums come from cumulative sums and
+# the running peak from the van Herk/Gil-Werman block algorithm (the
+# vectorized form of a monotonic-deque sliding maximum).
+
+DEFAULT_WINDOW = 63        # about one quarter of daily bars
+DEFAULT_MAX_POINTS = 500   # cap on points returned per series
+
+
+def window_sums(x, window):
+    """Sum of each full window x[i-window+1 .. i], for i >= window-1"""
+    c = np.concatenate(([0.0], np.cumsum(x, dtype=np.float64)))
+    return c[window:] - c[:-window]
+
+
+def rolling_max(x, window):
+    """Maximum of each full window, in O(n) via per-block prefix and suffix maxima"""
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    pad = (-n) % window
+    blocks = np.concatenate((x, np.full(pad, -np.inf))).reshape(-1, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:n - window + 1], prefix[window - 1:n])
+
+
+def _finite(x):
+    # Same convention as safe_stat: undefined statistics are reported as 0
+    return np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def rolling_metrics(strategy_returns, positions=None, window=DEFAULT_WINDOW):
+    """Rolling Sharpe, volatility, Sortino, hit rate and drawdown over full windows.
+
+    Returns arrays of length n - window + 1; element k covers bars k .. k+window-1.
+    Hit rate counts winning bars among bars in the market (all bars when no
+    positions are given). Drawdown is peak-minus-value of the cumulative curve
+    within the window, like the backtest summary.
+    """
+    r = np.asarray(strategy_returns, dtype=np.float64)
+    n = len(r)
+    window = int(window)
+    if window < 2 or n < window:
+        raise ValueError(f'Rolling window must be between 2 and the number of bars ({n}).')
+
+    # Center before summing squares so the variance does not cancel catastrophically
+    centered = r - r.mean()
+    s1 = window_sums(centered, window)
+    s2 = window_sums(centered * centered, window)
+    mean = s1 / window + r.mean()
+    var = np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+    vol = np.sqrt(var)
+    downside = np.sqrt(window_sums(np.minimum(r, 0.0) ** 2, window) / window)
+
+    in_market = np.ones(n, dtype=bool) if positions is None else np.asarray(positions) != 0
+    trades = window_sums(in_market, window)
+    wins = window_sums(in_market & (r > 0), window)
+
+    curve = np.cumprod(1 + r)
+    drawdown = rolling_max(curve, window) - curve[window - 1:]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'rolling_sharpe': _finite(mean / vol),
+            'rolling_volatility': vol,
+            'rolling_sortino': _finite(mean / downside),
+            'rolling_hit_rate': _finite(wins / trades) * 100,
+            'rolling_drawdown': drawdown * 100,
+        }
+
+
+def sortino(strategy_returns):
+    """Whole-period Sortino ratio (mean over downside deviation), unannualized like the Sharpe"""
+    r = np.asarray(strategy_returns, dtype=np.float64)
+    downside = np.sqrt(np.mean(np.minimum(r, 0.0) ** 2)) if len(r) else 0.0
+    return float(_finite(r.mean() / downside)) if downside > 0 else 0.0
+
+
+def downsample_indices(n, max_points=DEFAULT_MAX_POINTS):
+    """Evenly spaced indices into a length-n series, always keeping the last point"""
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, int(max_points)).round().astype(np.int64))
+
+
+# Stationary bootstrap (Politis & Romano): resampled paths are built from
+# blocks of random start and geometric length, which keeps the short-range
+# autocorrelation of daily returns that an i.i.d. bootstrap would destroy.
+BOOTSTRAP_MAX_RESAMPLES = 100_000
+BOOTSTRAP_CHUNK_ELEMENTS = 2_000_000   # paths x bars per chunk, ~16 MB per float64 array
+
+
+def bootstrap_indices(rng, paths, n, block_length, positions=None):
+    """(paths x n) stationary-bootstrap indices into a length-n series.
+
+    `positions` may pass a reusable np.arange(paths * n) buffer (int32).
+    """
+    if positions is None or len(positions) != paths * n:
+        positions = np.arange(paths * n, dtype=np.int32)
+    # A new block starts with probability 1/block_length, and always at t = 0
+    jump = rng.random(paths * n) < 1.0 / block_length
+    jump[::n] = True
+    starts = np.flatnonzero(jump).astype(np.int32)
+    block = np.cumsum(jump, dtype=np.int32)
+    block -= 1
+    # Within a block the index advances with the flat position, so index = position + a per-block shift
+    shift = rng.integers(0, n, len(starts), dtype=np.int32) - starts
+    idx = shift[block]
+    idx += positions
+    idx[idx >= n] -= n  # blocks wrap around the end of the series
+    return idx.reshape(paths, n)
+
+
+def _path_metrics(idx, strategy_returns, log_market, in_market, wins):
+    """Summary metrics for each resampled path (one row per path), defined as in strategy.evaluate"""
+    n = idx.shape[1]
+    r = strategy_returns[idx]
+    s1 = r.sum(axis=1)
+    s2 = np.einsum('ij,ij->i', r, r)
+    trades = np.count_nonzero(in_market[idx], axis=1)
+    won = np.count_nonzero(wins[idx], axis=1)
+    # The gathered returns are a private copy, so the equity curve is built in place
+    r += 1
+    curve = np.cumprod(r, axis=1, out=r)
+    drawdown = np.maximum.accumulate(curve, axis=1)
+    drawdown -= curve
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = (s1 / n) / np.sqrt(np.maximum(s2 - s1 * s1 / n, 0.0) / (n - 1))
+        win_rate = np.where(trades > 0, won / np.maximum(trades, 1), 0.0) * 100
+    return {
+        'market_return': np.expm1(log_market[idx].sum(axis=1)) * 100,
+        'strategy_return': (curve[:, n - 1] - 1) * 100,
+        'sharpe': sharpe,
+        'trades': trades,
+        'win_rate': win_rate,
+        'max_drawdown': drawdown.max(axis=1) * 100,
+    }
+
+
+def bootstrap_options(resamples, block_length=None, confidence=0.95):
+    """Validated (resamples, block_length or None, confidence); the block length is checked against the bars later"""
+    try:
+        resamples = int(resamples)
+    except (TypeError, ValueError):
+        raise ValueError('bootstrap must be an integer number of resamples.') from None
+    if not 1 <= resamples <= BOOTSTRAP_MAX_RESAMPLES:
+        raise ValueError(f'bootstrap must be between 1 and {BOOTSTRAP_MAX_RESAMPLES} resamples.')
+    try:
+        confidence = float(confidence)
+        block_length = float(block_length) if block_length else None
+    except (TypeError, ValueError):
+        raise ValueError('bootstrap_block and confidence must be numbers.') from None
+    if not 0 < confidence < 1:
+        raise ValueError('confidence must be between 0 and 1.')
+    if block_length is not None and not block_length >= 1:
+        raise ValueError('bootstrap_block must be at least 1 bar.')
+    return resamples, block_length, confidence
+
+
+def bootstrap_summary(strategy_returns, market_returns, positions, resamples=10_000, block_length=None,
+                      confidence=0.95, seed=0):
+    """Confidence intervals for the backtest summary metrics from a stationary block bootstrap.
+
+    Paths are generated and evaluated chunk by chunk as (paths x time)
+    arrays, so memory stays bounded by BOOTSTRAP_CHUNK_ELEMENTS whatever
+    the number of resamples. Strategy returns, market returns and positions
+    are resampled with the same indices. block_length defaults to n^(1/3).
+    """
+    r = np.asarray(strategy_returns, dtype=np.float64)
+    log_market = np.log1p(np.asarray(market_returns, dtype=np.float64))
+    in_market = np.asarray(positions) != 0
+    wins = in_market & (r > 0)
+    n = len(r)
+    resamples, block_length, confidence = bootstrap_options(resamples, block_length, confidence)
+    if n < 2:
+        raise ValueError('Not enough bars to bootstrap.')
+    block_length = block_length or max(n ** (1 / 3), 1.0)
+    if not 1 <= block_length <= n:
+        raise ValueError(f'bootstrap_block must be between 1 and the number of bars ({n}).')
+
+    rng = np.random.default_rng(seed)
+    chunk = max(BOOTSTRAP_CHUNK_ELEMENTS // n, 1)
+    positions_buffer = np.arange(min(chunk, resamples) * n, dtype=np.int32)
+    metrics = {}
+    for done in range(0, resamples, chunk):
+        idx = bootstrap_indices(rng, min(chunk, resamples - done), n, block_length, positions_buffer)
+        for name, values in _path_metrics(idx, r, log_market, in_market, wins).items():
+            metrics.setdefault(name, []).append(values)
+
+    tail = (1 - confidence) / 2 * 100
+    intervals = {}
+    for name, parts in metrics.items():
+        values = _finite(np.concatenate(parts).astype(np.float64))
+        low, median, high = np.percentile(values, [tail, 50, 100 - tail])
+        intervals[name] = {'low': float(low), 'median': float(median), 'high': float(high)}
+    return {
+        'resamples': resamples,
+        'block_length': round(block_length, 2),
+        'confidence': confidence,
+        'intervals': intervals,
+    }
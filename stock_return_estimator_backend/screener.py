@@ -0,0 +1,152 @@
+import operator
+import re
+import threading
+import time
+
+import numpy as np
+
+# Cross-sectional screening. The universe keeps one row per ticker (latest
+# indicator values plus the predicted next-bar return) in a dense
+# ticker x column matrix, so a screen is a handful of column comparisons and
+# a partial sort instead of one model run per ticker. Each row carries the
+# timestamp of the bar it was computed from, so rows built from an old slice
+# of history can be told apart from current ones and dropped.
+
+OPS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+FILTER = re.compile(r'^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*$')
+MAX_TOP = 500
+
+
+def parse_filter(spec, columns):
+    """(column, op, value) from 'RSI_14 < 30' or {'column': 'RSI_14', 'op': '<', 'value': 30}"""
+    if isinstance(spec, str):
+        match = FILTER.match(spec)
+        if not match:
+            raise ValueError(f"Invalid filter '{spec}'. Use e.g. 'RSI_14 < 30'.")
+        column, op, value = match.groups()
+    elif isinstance(spec, dict):
+        column, op, value = spec.get('column'), spec.get('op'), spec.get('value')
+    else:
+        raise ValueError('Filters must be strings or objects.')
+    if column not in columns:
+        raise ValueError(f"Unknown column '{column}'. Available: {', '.join(columns)}")
+    if op not in OPS:
+        raise ValueError(f"Unknown operator '{op}'. Use one of {', '.join(OPS)}")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Filter value for '{column}' must be a number.")
+    return column, op, value
+
+
+def top_k(keys, k, descending=True):
+    """Indices of the k best keys in rank order: argpartition to select, then sort only those k"""
+    keys = -keys if descending else keys
+    if k < len(keys):
+        best = np.argpartition(keys, k - 1)[:k]
+    else:
+        best = np.arange(len(keys))
+    return best[np.argsort(keys[best], kind='stable')]
+
+
+def _date(ts):
+    return None if ts is None else time.strftime('%Y-%m-%d', time.gmtime(ts))
+
+
+class Universe:
+    """Ticker x column matrix of the latest values per ticker, updated row by row"""
+
+    def __init__(self, columns, capacity=256):
+        self.columns = list(columns)
+        self.column_index = {c: j for j, c in enumerate(self.columns)}
+        self.matrix = np.full((capacity, len(self.columns)), np.nan)
+        self.tickers = []
+        self.versions = []
+        self.as_of = []
+        self.rows = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def version(self, ticker):
+        """Whatever version the ticker's row was last computed from, or None"""
+        with self.lock:
+            i = self.rows.get(ticker)
+            return None if i is None else self.versions[i]
+
+    def update(self, ticker, values, version=None, as_of=None):
+        """Insert or replace a ticker's row; `values` maps column name to number, `as_of` is its bar's epoch seconds"""
+        row = np.array([values.get(c, np.nan) for c in self.columns], dtype=np.float64)
+        with self.lock:
+            i = self.rows.get(ticker)
+            if i is None:
+                i = len(self.tickers)
+                if i == len(self.matrix):
+                    # Grow geometrically so appends stay amortized O(1)
+                    grown = np.full((2 * len(self.matrix), len(self.columns)), np.nan)
+                    grown[:i] = self.matrix
+                    self.matrix = grown
+                self.rows[ticker] = i
+                self.tickers.append(ticker)
+                self.versions.append(version)
+                self.as_of.append(None)
+            self.matrix[i] = row
+            self.versions[i] = version
+            self.as_of[i] = as_of
+
+    def drop_older(self, cutoff):
+        """Remove rows computed from bars older than `cutoff` (epoch seconds); returns how many"""
+        with self.lock:
+            keep = [i for i, t in enumerate(self.as_of) if t is not None and t >= cutoff]
+            dropped = len(self.tickers) - len(keep)
+            if dropped:
+                self.matrix[:len(keep)] = self.matrix[keep]
+                self.matrix[len(keep):] = np.nan
+                self.tickers = [self.tickers[i] for i in keep]
+                self.versions = [self.versions[i] for i in keep]
+                self.as_of = [self.as_of[i] for i in keep]
+                self.rows = {t: i for i, t in enumerate(self.tickers)}
+            return dropped
+
+    def screen(self, filters=(), sort_by='predicted_return', top=20, descending=True, columns=None):
+        """Tickers passing every filter, best `top` by `sort_by`, with the requested columns"""
+        if sort_by not in self.column_index:
+            raise ValueError(f"Unknown sort column '{sort_by}'. Available: {', '.join(self.columns)}")
+        top = int(top)
+        if not 1 <= top <= MAX_TOP:
+            raise ValueError(f'top must be between 1 and {MAX_TOP}.')
+        filters = [parse_filter(f, self.column_index) for f in filters or ()]
+        columns = columns or [sort_by] + [c for c, _, _ in filters if c != sort_by]
+        for c in columns:
+            if c not in self.column_index:
+                raise ValueError(f"Unknown column '{c}'. Available: {', '.join(self.columns)}")
+
+        with self.lock:
+            n = len(self.tickers)
+            matrix = self.matrix[:n].copy()
+            tickers = np.array(self.tickers, dtype=object)
+            as_of = list(self.as_of)
+
+        keys = matrix[:, self.column_index[sort_by]]
+        mask = np.isfinite(keys)
+        with np.errstate(invalid='ignore'):
+            for column, op, value in filters:
+                mask &= OPS[op](matrix[:, self.column_index[column]], value)
+        matched = np.flatnonzero(mask)
+        picked = matched[top_k(keys[matched], top, descending)]
+
+        selected = matrix[np.ix_(picked, [self.column_index[c] for c in columns])]
+        results = [
+            {'ticker': tickers[i], 'as_of': _date(as_of[i]),
+             **{c: round(float(v), 4) if np.isfinite(v) else None for c, v in zip(columns, values)}}
+            for i, values in zip(picked, selected)
+        ]
+        return {'results': results, 'matched': int(len(matched)), 'universe': n}
@@ -0,0 +1,145 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+from encoding import Series, to_builtin
+
+# Nightly prediction snapshots. A batch job runs predict_prices for a ticker
+# universe over the default date range and stores each response in SQLite,
+# keyed by (ticker, start, end, feature-set hash) so /predict can answer a
+# matching request with a single primary-key lookup. The fitted model is stored
+# too, so a hit leaves the same current model (for /save_model) as a live run.
+SNAPSHOT_DB = os.getenv('SNAPSHOT_DB', 'snapshots.db')
+SNAPSHOT_TICKERS = os.getenv('SNAPSHOT_TICKERS', 'AAPL,MSFT,GOOGL,AMZN,TSLA,RELIANCE.NS,TCS.NS,INFY.NS')
+SNAPSHOT_LOOKBACK_DAYS = int(os.getenv('SNAPSHOT_LOOKBACK_DAYS', 365))  # the app's default range
+SNAPSHOT_KEEP_DAYS = int(os.getenv('SNAPSHOT_KEEP_DAYS', 7))
+
+# Response fields stored as plain lists and turned back into chart series on read
+SERIES_FIELDS = ('market_returns', 'strategy_returns')
+
+_local = threading.local()
+
+
+def _connect():
+    # One connection per thread; SQLite connections cannot be shared across threads
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != SNAPSHOT_DB:
+        conn = sqlite3.connect(SNAPSHOT_DB, timeout=5)
+        conn.execute('''CREATE TABLE IF NOT EXISTS snapshots (
+            ticker TEXT NOT NULL,
+            start TEXT NOT NULL,
+            end TEXT NOT NULL,
+            features TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            payload TEXT NOT NULL,
+            model BLOB,
+            PRIMARY KEY (ticker, start, end, features)
+        ) WITHOUT ROWID''')
+        if 'model' not in {column[1] for column in conn.execute('PRAGMA table_info(snapshots)')}:
+            # Snapshots stored before models were kept; they are ignored until rebuilt
+            conn.execute('ALTER TABLE snapshots ADD COLUMN model BLOB')
+        _local.conn, _local.path = conn, SNAPSHOT_DB
+    return conn
+
+
+def feature_key(features):
+    """Stable hash of a normalized feature list (order matters: it is the SHAP/regression order)"""
+    return hashlib.sha1(','.join(features).encode()).hexdigest()[:16]
+
+
+def default_range(today=None):
+    """(start, end) ISO dates of the app's default request: the last SNAPSHOT_LOOKBACK_DAYS days"""
+    today = today or date.today()
+    return (today - timedelta(days=SNAPSHOT_LOOKBACK_DAYS)).isoformat(), today.isoformat()
+
+
+def put(ticker, start, end, features, result, model):
+    """Store one predict_prices result and its fitted model"""
+    payload = json.dumps(result, default=to_builtin)
+    conn = _connect()
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     (ticker.upper(), start[:10], end[:10], feature_key(features), time.time(), payload, pickle.dumps(model)))
+
+
+def get(ticker, start, end, features):
+    """The stored result for this request, or None. Only the date part of start/end is compared.
+
+    A hit makes the snapshot's model the current model, as the live /predict would.
+    """
+    from utils import use_model
+
+    if not ticker or not start or not end or not os.path.exists(SNAPSHOT_DB):
+        return None
+    row = _connect().execute(
+        '''SELECT created_at, payload, model FROM snapshots
+           WHERE ticker = ? AND start = ? AND end = ? AND features = ? AND model IS NOT NULL''',
+        (ticker.upper(), start[:10], end[:10], feature_key(features))).fetchone()
+    if row is None:
+        return None
+    created_at, payload, model = row
+    use_model(pickle.loads(model))
+    result = json.loads(payload)
+    for field in SERIES_FIELDS:
+        result[field] = Series(result[field], 2)
+    result['snapshot'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(created_at))
+    return result
+
+
+def prune(keep_days=SNAPSHOT_KEEP_DAYS):
+    """Delete snapshots older than keep_days; returns the number removed"""
+    conn = _connect()
+    with conn:
+        return conn.execute('DELETE FROM snapshots WHERE created_at < ?', (time.time() - keep_days * 86400,)).rowcount
+
+
+def build(tickers, start, end, feature_sets=None):
+    """Precompute and store predictions for every ticker and feature set; returns (stored, failed)"""
+    from utils import load_prices, predict_prices, select_features
+
+    feature_sets = feature_sets or [None]
+    stored, failed = 0, {}
+    for ticker in tickers:
+        try:
+            df = load_prices(ticker, start, end)
+            for features in feature_sets:
+                features = select_features(features)
+                # A fresh copy per feature set, so every snapshot matches the live /predict result
+                put(ticker, start, end, features, *predict_prices(df.copy(), features, persist=False, return_model=True))
+                stored += 1
+        except Exception as e:
+            # One bad ticker should not stop the nightly run
+            failed[ticker] = str(e)
+    return stored, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute nightly /predict snapshots')
+    parser.add_argument('--tickers', default=SNAPSHOT_TICKERS, help='Comma-separated ticker universe')
+    parser.add_argument('--start', help='Start date (default: SNAPSHOT_LOOKBACK_DAYS before today)')
+    parser.add_argument('--end', help='End date (default: today)')
+    parser.add_argument('--features', action='append',
+                        help='Comma-separated feature set to precompute; repeat for several (default: all features)')
+    args = parser.parse_args()
+
+    start, end = default_range()
+    start, end = args.start or start, args.end or end
+    tickers = [t.strip().upper() for t in args.tickers.split(',') if t.strip()]
+    feature_sets = [f.split(',') for f in args.features] if args.features else None
+
+    began = time.perf_counter()
+    stored, failed = build(tickers, start, end, feature_sets)
+    removed = prune()
+    print(f'Stored {stored} snapshots for {start}..{end} in {time.perf_counter() - began:.1f}s; pruned {removed}')
+    for ticker, error in failed.items():
+        print(f'  {ticker}: {error}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import numpy as np
+
+# Strategy evaluation over whole arrays. Inputs are 1-D (one ticker) or 2-D
+# (time x tickers) NumPy arrays; every result keeps that shape along axis 0.
+
+
+def signals(pred, threshold=0.0, allow_short=False):
+    """+1 where the prediction clears the threshold, -1 below -threshold when shorting, else 0.
+
+    Long entries take precedence, so with a negative threshold predictions in
+    (threshold, -threshold) go long, as in run_backtest's original loop.
+    """
+    pred = np.asarray(pred, dtype=np.float64)
+    long = pred > threshold
+    sig = long.astype(np.int8)
+    if allow_short:
+        sig -= ((pred < -threshold) & ~long).astype(np.int8)
+    return sig
+
+
+def _hold_1d(sig, holding_period):
+    """Apply the holding rule to one column: an entry at i locks the position for i..i+h-1"""
+    n = len(sig)
+    # next_entry[i] = first index >= i with a non-zero signal (n if none), so
+    # flat stretches are skipped in one step and the loop runs once per trade
+    candidates = np.where(sig != 0, np.arange(n), n)
+    next_entry = np.minimum.accumulate(np.r_[candidates, n][::-1])[::-1]
+    entries = []
+    i = int(next_entry[0])
+    while i < n:
+        entries.append(i)
+        i = int(next_entry[min(i + holding_period, n)])
+    if not entries:
+        return np.zeros(n, dtype=np.int8)
+    entries = np.asarray(entries)
+    exits = np.minimum(entries + holding_period, n)
+    # Positions never overlap, so +side at each entry and -side at each exit, summed, fill the holds
+    delta = np.zeros(n + 1, dtype=np.int8)
+    delta[entries] = sig[entries]
+    np.subtract.at(delta, exits, sig[entries])
+    return np.cumsum(delta[:n], dtype=np.int8)
+
+
+def positions(pred, threshold=0.0, holding_period=1, allow_short=False):
+    """Position (+1 long, -1 short, 0 flat) held on each bar, following run_backtest's trading rule"""
+    sig = signals(pred, threshold, allow_short)
+    holding_period = max(int(holding_period), 1)
+    if holding_period == 1:
+        return sig
+    if sig.ndim == 1:
+        return _hold_1d(sig, holding_period)
+    return np.column_stack([_hold_1d(sig[:, k], holding_period) for k in range(sig.shape[1])])
+
+
+def turnover(pos):
+    """Absolute position change on each bar (entering from flat counts, a long/short flip counts twice)"""
+    pos = np.asarray(pos, dtype=np.float64)
+    prev = np.concatenate((np.zeros((1,) + pos.shape[1:]), pos[:-1]), axis=0)
+    return np.abs(pos - prev)
+
+
+def cost_rates(commission=0.0, slippage_bps=0.0, atr_slippage=0.0, atr=None, price=None):
+    """Per-bar cost per unit of turnover, as a fraction of notional.
+
+    commission is charged per side as a fraction of the traded notional,
+    slippage_bps is a fixed slippage in basis points, and atr_slippage
+    scales ATR/price (e.g. 0.1 = a tenth of the bar's ATR). Each argument may
+    be a scalar or a 1-D array of scenarios; scenarios broadcast into a
+    (time x scenarios) matrix.
+    """
+    commission = np.asarray(commission, dtype=np.float64)
+    slippage = np.asarray(slippage_bps, dtype=np.float64) / 1e4
+    atr_slippage = np.asarray(atr_slippage, dtype=np.float64)
+    sweep = max(commission.ndim, slippage.ndim, atr_slippage.ndim) > 0
+    rate = commission + slippage
+    if sweep:
+        # One column per scenario: (1 x k), or (time x k) once ATR varies per bar
+        rate = np.atleast_1d(rate)[None, :]
+        atr_slippage = np.atleast_1d(atr_slippage)[None, :]
+    if atr is not None and price is not None and np.any(atr_slippage):
+        atr_frac = np.asarray(atr, dtype=np.float64) / np.asarray(price, dtype=np.float64)
+        rate = rate + atr_slippage * (atr_frac[:, None] if sweep else atr_frac)
+    return rate
+
+
+def evaluate(returns, pos, costs=None):
+    """Strategy returns, cumulative curves, drawdown and summary metrics in one pass.
+
+    `returns` are next-bar returns aligned with `pos`. `costs` (from
+    cost_rates) are charged on every change of position; a 2-D costs matrix
+    evaluates all cost scenarios at once, one column per scenario. Drawdown
+    is measured like the original backtest: running peak minus the current
+    curve value.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    strategy_returns = pos * returns
+    if costs is not None:
+        costs = np.asarray(costs, dtype=np.float64)
+        if costs.ndim > strategy_returns.ndim:
+            # Cost sweep over a single series: one column per scenario, even when every scenario is free
+            strategy_returns = np.repeat(strategy_returns[:, None], costs.shape[-1], axis=1)
+            pos = np.asarray(pos)[:, None]
+        if np.any(costs):
+            strategy_returns = strategy_returns - turnover(pos) * costs
+    cumulative_market = np.cumprod(1 + returns, axis=0)
+    cumulative_strategy = np.cumprod(1 + strategy_returns, axis=0)
+    drawdown = np.maximum.accumulate(cumulative_strategy, axis=0) - cumulative_strategy
+
+    in_market = np.broadcast_to(np.asarray(pos) != 0, strategy_returns.shape)
+    trades = in_market.sum(axis=0)
+    wins = (in_market & (strategy_returns > 0)).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.nanmean(strategy_returns, axis=0) / np.nanstd(strategy_returns, axis=0, ddof=1)
+        win_rate = np.where(trades > 0, wins / np.maximum(trades, 1), 0.0)
+    return {
+        'strategy_returns': strategy_returns,
+        'cumulative_market': cumulative_market,
+        'cumulative_strategy': cumulative_strategy,
+        'drawdown': drawdown,
+        'market_return': cumulative_market[-1] * 100 - 100 if len(returns) else np.nan,
+        'strategy_return': cumulative_strategy[-1] * 100 - 100 if len(returns) else np.nan,
+        'sharpe': sharpe,
+        'trades': trades,
+        'win_rate': win_rate * 100,
+        'max_drawdown': drawdown.max(axis=0) * 100 if len(returns) else np.nan,
+    }
+
+
+def run_strategy(pred, returns, threshold=0.0, holding_period=1, allow_short=False, costs=None):
+    """positions() followed by evaluate(); returns the evaluation dict plus 'positions'"""
+    pos = positions(pred, threshold, holding_period, allow_short)
+    result = evaluate(returns, pos, costs)
+    result['positions'] = pos
+    return result
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+import traceback
+
+from executors import run_io, run_cpu
+from utils import bar_store, load_recent_bars, latest_prediction, bars_version
+
+# Prediction stream over WebSocket. Clients subscribe to tickers; one pump per
+# process re-checks each subscribed ticker's daily bars every STREAM_POLL
+# seconds (once per ticker, however many clients follow it), recomputes the
+# prediction only when the bars changed, and sends the same encoded message to
+# every subscriber. The first message per ticker is the full row; later ones
+# carry only the fields that changed.
+STREAM_PATH = '/ws/predictions'
+STREAM_POLL = float(os.getenv('STREAM_POLL', 60))  # the bar store still re-downloads at most once per its ttl
+STREAM_MAX_TICKERS = 50   # per connection
+STREAM_QUEUE = 100        # unsent messages before a slow client is disconnected
+DECIMALS = 6
+
+
+def _message(kind, ticker, **fields):
+    return json.dumps({'type': kind, 'ticker': ticker, **fields})
+
+
+class Client:
+    """One WebSocket connection: its tickers and an outgoing message queue"""
+
+    def __init__(self):
+        self.queue = asyncio.Queue(STREAM_QUEUE)
+        self.tickers = set()
+        self.versions = {}  # ticker -> bars version of the last row sent
+        self.closed = False
+
+    def send(self, text):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            # Too far behind; the writer closes the connection
+            self.closed = True
+
+
+class PredictionHub:
+    """Latest prediction per subscribed ticker, computed once per bar change and shared by its subscribers"""
+
+    def __init__(self):
+        self.subscribers = {}  # ticker -> set of clients
+        self.latest = {}       # ticker -> (bars version, row)
+        self.pending = {}      # ticker -> bars not yet published
+        self.lock = threading.Lock()
+        self.loop = None
+        self.wake = None
+        self.task = None
+
+    def start(self):
+        """Start the pump on the running event loop (once)"""
+        if self.task is None or self.task.done():
+            self.loop = asyncio.get_running_loop()
+            self.wake = asyncio.Event()
+            self.task = self.loop.create_task(self.pump())
+
+    def on_bars(self, ticker, interval, bars):
+        """BarStore listener (any thread): queue a subscribed ticker's daily bars for publishing"""
+        if interval != '1d' or not len(bars) or ticker not in self.subscribers:
+            return
+        with self.lock:
+            queued = self.pending.get(ticker)
+            if queued is not None and queued.last_ts > bars.last_ts:
+                return
+            self.pending[ticker] = bars
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+    async def refresh(self, tickers):
+        """Bring tickers' bars up to date; returns the tickers that could not be loaded"""
+        results = await asyncio.gather(*(run_io(load_recent_bars, t) for t in tickers), return_exceptions=True)
+        failed = []
+        for ticker, result in zip(tickers, results):
+            bars = bar_store.cached(ticker)
+            if isinstance(result, Exception) or bars is None or not len(bars):
+                failed.append(ticker)
+            elif ticker not in self.latest:
+                # Already cached bars do not reach on_bars; publish them anyway
+                with self.lock:
+                    self.pending.setdefault(ticker, bars)
+        if self.wake is not None:
+            self.wake.set()
+        return failed
+
+    async def subscribe(self, client, tickers):
+        """Add tickers to a client, sending rows already computed; returns tickers that failed to load"""
+        cold = []
+        for ticker in tickers:
+            if ticker in client.tickers:
+                continue
+            client.tickers.add(ticker)
+            self.subscribers.setdefault(ticker, set()).add(client)
+            if ticker in self.latest:
+                version, row = self.latest[ticker]
+                client.send(_message('snapshot', ticker, data=row))
+                client.versions[ticker] = version
+            else:
+                cold.append(ticker)
+        return await self.refresh(cold) if cold else []
+
+    def unsubscribe(self, client, tickers=None):
+        for ticker in list(client.tickers if tickers is None else tickers):
+            client.tickers.discard(ticker)
+            client.versions.pop(ticker, None)
+            subscribers = self.subscribers.get(ticker)
+            if subscribers is None:
+                continue
+            subscribers.discard(client)
+            if not subscribers:
+                # Nobody follows it any more: stop polling and forget the row
+                del self.subscribers[ticker]
+                self.latest.pop(ticker, None)
+
+    async def publish(self, ticker, bars):
+        """Recompute a ticker's prediction if its bars changed and fan it out"""
+        if ticker not in self.subscribers:
+            return
+        version = bars_version(bars)
+        old = self.latest.get(ticker)
+        if old is not None and (old[0] == version or version[1] < old[0][1]):
+            # Unchanged, or older bars from a historical load
+            return
+        row = await run_cpu(latest_prediction, ticker, bars)
+        if row is None:
+            return
+        row = {k: round(v, DECIMALS) if math.isfinite(v) else None for k, v in row.items()}
+        row['date'] = time.strftime('%Y-%m-%d', time.gmtime(bars.last_ts))
+        self.latest[ticker] = (version, row)
+        update = snapshot = None
+        for client in list(self.subscribers.get(ticker, ())):
+            if old is not None and client.versions.get(ticker) == old[0]:
+                # Encoded once, whatever the number of subscribers
+                update = update or _message('update', ticker, data={k: v for k, v in row.items() if old[1].get(k) != v})
+                client.send(update)
+            else:
+                snapshot = snapshot or _message('snapshot', ticker, data=row)
+                client.send(snapshot)
+            client.versions[ticker] = version
+
+    async def pump(self):
+        next_poll = self.loop.time() + STREAM_POLL
+        while True:
+            timeout = next_poll - self.loop.time()
+            if timeout <= 0:
+                await self.refresh(list(self.subscribers))
+                next_poll = self.loop.time() + STREAM_POLL
+            else:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self.wake.clear()
+            with self.lock:
+                pending, self.pending = self.pending, {}
+            results = await asyncio.gather(*(self.publish(t, b) for t, b in pending.items()), return_exceptions=True)
+            for error in results:
+                if isinstance(error, Exception):
+                    traceback.print_exception(type(error), error, error.__traceback__)
+
+
+hub = PredictionHub()
+bar_store.subscribe(hub.on_bars)
+
+
+async def _write(client, send):
+    while True:
+        text = await client.queue.get()
+        if client.closed:
+            await send({'type': 'websocket.close', 'code': 1013, 'reason': 'Client too slow'})
+            return
+        await send({'type': 'websocket.send', 'text': text})
+
+
+async def _handle(client, text):
+    try:
+        request = json.loads(text)
+        action = request.get('action')
+        tickers = request.get('tickers') or []
+        if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+            # A bare string would otherwise be taken as one ticker per character
+            raise ValueError('tickers must be a list of strings')
+        tickers = [t.strip().upper() for t in tickers if t.strip()]
+    except (ValueError, AttributeError):
+        client.send(json.dumps({'type': 'error', 'message': 'Send JSON like {"action": "subscribe", "tickers": ["TCS.NS"]}.'}))
+        return
+    if action == 'subscribe':
+        if len(client.tickers | set(tickers)) > STREAM_MAX_TICKERS:
+            client.send(json.dumps({'type': 'error', 'message': f'At most {STREAM_MAX_TICKERS} tickers per connection.'}))
+            return
+        for ticker in await hub.subscribe(client, tickers):
+            hub.unsubscribe(client, [ticker])
+            client.send(_message('error', ticker, message='No price data found for this ticker.'))
+    elif action == 'unsubscribe':
+        hub.unsubscribe(client, tickers)
+    else:
+        client.send(json.dumps({'type': 'error', 'message': "action must be 'subscribe' or 'unsubscribe'."}))
+
+
+async def serve(scope, receive, send):
+    """ASGI WebSocket handler.
+
+    Clients send {"action": "subscribe" | "unsubscribe", "tickers": [...]} and
+    receive {"type": "snapshot", "ticker", "data"} with the full row, then
+    {"type": "update", "ticker", "data"} with the changed fields whenever a new
+    bar arrives.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+    hub.start()
+    client = Client()
+    writer = asyncio.create_task(_write(client, send))
+    try:
+        while not writer.done():
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] == 'websocket.receive':
+                await _handle(client, message.get('text') or message.get('bytes'))
+    finally:
+        hub.unsubscribe(client)
+        client.closed = True
+        writer.cancel()
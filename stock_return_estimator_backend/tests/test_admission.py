@@ -0,0 +1,49 @@
+import threading
+import time
+
+import pytest
+
+from admission import Admission, Rejected, INTERACTIVE, BULK
+
+
+def test_client_budget_allows_one_overdraft_then_429():
+    ctl = Admission(client_budget=1, global_budget=0)
+    ctl.acquire('a', 5)
+    with pytest.raises(Rejected) as e:
+        ctl.acquire('a', 0.1)
+    assert e.value.status == 429 and e.value.retry_after > 1
+    ctl.acquire('b', 0.1)
+
+
+def test_queue_admits_by_priority_then_arrival():
+    ctl = Admission(client_budget=0, global_budget=1, max_wait=5)
+    held = ctl.acquire('x', 1)
+    order = []
+
+    def request(name, priority):
+        charge = ctl.acquire(name, 1, priority)
+        order.append(name)
+        ctl.release(charge)
+
+    threads = []
+    for name, priority in [('bulk', BULK), ('first', INTERACTIVE), ('second', INTERACTIVE)]:
+        threads.append(threading.Thread(target=request, args=(name, priority)))
+        threads[-1].start()
+        time.sleep(0.05)
+    ctl.release(held)
+    for t in threads:
+        t.join(5)
+    assert order == ['first', 'second', 'bulk']
+
+
+def test_full_queue_and_timeout_get_503_and_refund():
+    ctl = Admission(client_budget=10, global_budget=1, max_queue=0, max_wait=0.05)
+    ctl.acquire('a', 1)
+    with pytest.raises(Rejected) as e:
+        ctl.acquire('a', 3)
+    assert e.value.status == 503
+    assert ctl.buckets['a'][0] == pytest.approx(9, abs=0.01)
+    ctl.max_queue = 1
+    with pytest.raises(Rejected):
+        ctl.acquire('a', 1)
+    assert not ctl.waiting
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bars import Bars, BarStore
+
+
+def frame(index, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, len(index)).cumsum()
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.1, len(index)),
+        'High': close + 1,
+        'Low': close - 1,
+        'Close': close,
+        'Volume': rng.integers(1, 1000, len(index)).astype(float),
+    }, index=index)
+
+
+def test_round_trip_and_layout():
+    df = frame(pd.bdate_range('2024-01-01', periods=300))
+    bars = Bars.from_frame(df)
+    assert bars.offsets.dtype == np.int32
+    assert bars.nbytes == 24 * len(df)
+    out = bars.to_frame()
+    assert (out.index == df.index).all()
+    np.testing.assert_allclose(out['Close'], df['Close'], rtol=1e-6)
+    assert bars.last_ts == int(df.index[-1].timestamp())
+
+
+def test_wide_span_widens_offsets():
+    bars = Bars([-1_500_000_000, 1_800_000_000], [1, 2], [1, 2], [1, 2], [1, 2], [1, 2])
+    assert bars.offsets.dtype == np.int64
+    assert bars.ts.tolist() == [-1_500_000_000, 1_800_000_000]
+
+
+def test_slice_bounds():
+    bars = Bars.from_frame(frame(pd.bdate_range('2024-01-01', periods=50)))
+    ts = bars.ts
+    assert (bars.slice(ts[10], ts[20]).ts == ts[10:20]).all()
+    assert len(bars.slice(ts[-1] + 1)) == 0
+    assert len(bars.slice(-10**12, 10**13)) == len(bars)
+
+
+def test_merge_prefers_newer_bars_and_keeps_order():
+    index = pd.bdate_range('2024-01-01', periods=20)
+    old = Bars.from_frame(frame(index[:15], seed=1))
+    new = Bars.from_frame(frame(index[10:], seed=2))
+    merged = old.merge(new)
+    assert (merged.ts == Bars.from_frame(frame(index)).ts).all()
+    np.testing.assert_array_equal(merged.close[10:], new.close)
+    np.testing.assert_array_equal(merged.close[:10], old.close[:10])
+    assert old.merge(Bars.empty()) is old and Bars.empty().merge(new) is new
+
+
+def test_resample_matches_pandas():
+    index = pd.date_range('2024-01-02 00:00', periods=600, freq='min')
+    df = frame(index)
+    ours = Bars.from_frame(df, '1m').resample('15m').to_frame()
+    theirs = df.resample('15min').agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    assert (ours.index == theirs.index).all()
+    np.testing.assert_allclose(ours.to_numpy(), theirs.to_numpy(), rtol=1e-5)
+
+
+def test_weekly_buckets_start_on_monday():
+    weekly = Bars.from_frame(frame(pd.bdate_range('2024-01-03', periods=30))).resample('1wk').to_frame()
+    assert weekly.index[0] == pd.Timestamp('2024-01-03')
+    assert all(d.weekday() == 0 for d in weekly.index[1:])
+
+
+def test_resample_rejects_finer_interval():
+    with pytest.raises(ValueError):
+        Bars.from_frame(frame(pd.bdate_range('2024-01-01', periods=5))).resample('60m')
+
+
+def test_intraday_buckets_anchor_to_session_open():
+    index = pd.date_range('2025-06-02 09:15', periods=25, freq='15min', tz='Asia/Kolkata')
+    hourly = Bars.from_frame(frame(index), '15m').resample('60m').to_frame()
+    assert hourly.index.strftime('%H:%M').tolist() == ['09:15', '10:15', '11:15', '12:15', '13:15', '14:15', '15:15']
+
+
+def test_daily_buckets_follow_exchange_days():
+    # An ASX session runs 10:00-16:00 Sydney time, i.e. across UTC midnight
+    days = [pd.date_range(f'2025-06-0{d} 10:00', f'2025-06-0{d} 16:00', freq='5min', tz='Australia/Sydney') for d in (2, 3)]
+    daily = Bars.from_frame(frame(days[0].append(days[1])), '5m').resample('1d')
+    assert len(daily) == 2
+
+
+def test_store_merges_overlaps_and_notifies():
+    calls, seen = [], []
+    data = frame(pd.bdate_range('2024-01-01', '2024-12-31'))
+
+    def loader(ticker, start, end, interval):
+        calls.append((start, end))
+        return data[(data.index >= start) & (data.index < end)]
+
+    store = BarStore(loader)
+    store.subscribe(lambda ticker, interval, bars: seen.append((ticker, len(bars))))
+    store.get('abc', '2024-01-01', '2024-03-01')
+    store.get('ABC', '2024-02-01', '2024-05-01')
+    assert store.cached('ABC').ts[0] == int(pd.Timestamp('2024-01-01').timestamp())
+    assert len(store.get('ABC', '2024-01-15', '2024-04-15')) == len(data['2024-01-15':'2024-04-12'])
+    assert len(calls) == 2
+    assert seen[-1] == ('ABC', len(data[:'2024-04-30']))
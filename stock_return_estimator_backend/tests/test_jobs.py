@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture(autouse=True)
+def broker(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOBS_DB', str(tmp_path / 'jobs.db'))
+    monkeypatch.setitem(jobs.JOB_KINDS, 'echo', lambda params, progress: params)
+
+
+def expire(job_id):
+    jobs._connect().execute('UPDATE jobs SET heartbeat = ? WHERE id = ?', (time.time() - jobs.JOB_LEASE - 1, job_id))
+
+
+def test_submit_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        jobs.submit('nope')
+
+
+def test_claim_takes_oldest_job_once():
+    first = jobs.submit('echo', {'n': 1})
+    second = jobs.submit('echo', {'n': 2})
+    assert jobs.claim('w1') == (first, 'echo', {'n': 1}, ('w1', 1))
+    assert jobs.claim('w2') == (second, 'echo', {'n': 2}, ('w2', 1))
+    assert jobs.claim('w3') is None
+    job = jobs.get(first)
+    assert (job['status'], job['worker'], job['attempts']) == (jobs.RUNNING, 'w1', 1)
+
+
+def test_expired_lease_is_retried_then_failed():
+    job_id = jobs.submit('echo')
+    for attempt in range(1, jobs.JOB_MAX_ATTEMPTS + 1):
+        assert jobs.claim(f'w{attempt}')[0] == job_id
+        assert jobs.get(job_id)['attempts'] == attempt
+        expire(job_id)
+    assert jobs.claim('late') is None
+    job = jobs.get(job_id)
+    assert (job['status'], job['error']) == (jobs.FAILED, 'Worker lost')
+
+
+def test_live_lease_is_not_reclaimed():
+    job_id = jobs.submit('echo')
+    jobs.claim('w1')
+    assert jobs.claim('w2') is None
+    assert jobs.get(job_id)['worker'] == 'w1'
+
+
+def test_run_job_records_result_and_failure(monkeypatch):
+    job_id = jobs.submit('echo', {'x': 1})
+    jobs.run_job(*jobs.claim('w1'))
+    job = jobs.get(job_id)
+    assert (job['status'], job['result'], job['progress']) == (jobs.DONE, {'x': 1}, 1.0)
+
+    def boom(params, progress):
+        raise RuntimeError('bad input')
+    monkeypatch.setitem(jobs.JOB_KINDS, 'boom', boom)
+    job_id = jobs.submit('boom')
+    jobs.run_job(*jobs.claim('w1'))
+    assert (jobs.get(job_id)['status'], jobs.get(job_id)['error']) == (jobs.FAILED, 'bad input')
+
+
+def test_cancel_queued_and_running(monkeypatch):
+    queued = jobs.submit('echo')
+    assert jobs.cancel(queued)
+    assert jobs.get(queued)['status'] == jobs.CANCELLED
+    assert not jobs.cancel(queued)
+
+    def slow(params, progress):
+        jobs.cancel(job_id)
+        progress(0.5)
+    monkeypatch.setitem(jobs.JOB_KINDS, 'slow', slow)
+    job_id = jobs.submit('slow')
+    jobs.run_job(*jobs.claim('w1'))
+    assert jobs.get(job_id)['status'] == jobs.CANCELLED
+
+
+def test_expired_worker_cannot_overwrite_a_reclaimed_job(monkeypatch):
+    job_id = jobs.submit('echo', {'x': 1})
+    stale = jobs.claim('w1')
+    expire(job_id)
+    fresh = jobs.claim('w2')
+    assert fresh[3] == ('w2', 2)
+    assert not jobs._heartbeat(job_id, stale[3])
+    with pytest.raises(jobs.LeaseLost):
+        jobs._report(job_id, stale[3], 0.5, 'stale')
+    jobs.run_job(*stale)
+    job = jobs.get(job_id)
+    assert (job['status'], job['worker'], job['result'], job['message']) == (jobs.RUNNING, 'w2', None, None)
+    jobs.run_job(*fresh)
+    assert jobs.get(job_id)['status'] == jobs.DONE
+
+
+def test_same_worker_reclaiming_is_fenced_by_attempt():
+    job_id = jobs.submit('echo')
+    first = jobs.claim('w1')
+    expire(job_id)
+    second = jobs.claim('w1')
+    assert not jobs._finish(job_id, first[3], jobs.FAILED, error='late')
+    assert jobs._finish(job_id, second[3], jobs.DONE, result={})
+    assert jobs.get(job_id)['status'] == jobs.DONE
+
+
+def test_runner_stops_at_next_progress_after_losing_lease(monkeypatch):
+    steps = []
+
+    def long(params, progress):
+        jobs._connect().execute('UPDATE jobs SET status = ? WHERE id = ?', (jobs.QUEUED, job_id))
+        for i in range(3):
+            progress(i / 3)
+            steps.append(i)
+        return 'late'
+    monkeypatch.setitem(jobs.JOB_KINDS, 'long', long)
+    job_id = jobs.submit('long')
+    jobs.run_job(*jobs.claim('w1'))
+    assert steps == [] and jobs.get(job_id)['status'] == jobs.QUEUED
+
+
+def test_heartbeat_notices_lost_lease(monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_LEASE', 0.2)
+    reports = []
+
+    def stalled(params, progress):
+        jobs._connect().execute('UPDATE jobs SET worker = ? WHERE id = ?', ('w2', job_id))
+        time.sleep(0.2)
+        jobs._connect().execute('UPDATE jobs SET worker = ? WHERE id = ?', ('w1', job_id))
+        progress(0.5)
+        reports.append(0.5)
+    monkeypatch.setitem(jobs.JOB_KINDS, 'stalled', stalled)
+    job_id = jobs.submit('stalled')
+    jobs.run_job(*jobs.claim('w1'))
+    assert reports == [] and jobs.get(job_id)['status'] == jobs.RUNNING
@@ -0,0 +1,28 @@
+import pytest
+
+import montecarlo
+
+DEFAULTS = {'horizon': 60, 'paths': 10_000, 'seed': 0, 'volatility': 'garch'}
+
+
+@pytest.mark.parametrize('spec', [None, False, 0])
+def test_forecast_not_requested(spec):
+    assert montecarlo.options(spec) is None
+
+
+def test_true_and_empty_object_give_defaults():
+    assert montecarlo.options(True) == DEFAULTS
+    assert montecarlo.options({}) == DEFAULTS
+
+
+def test_horizon_and_options_object():
+    assert montecarlo.options(20) == dict(DEFAULTS, horizon=20)
+    assert montecarlo.options({'horizon': 5, 'paths': 200, 'seed': 3, 'volatility': 'bootstrap'}) == \
+        {'horizon': 5, 'paths': 200, 'seed': 3, 'volatility': 'bootstrap'}
+
+
+@pytest.mark.parametrize('spec', ['60', 60.5, [60], {'horizon': True}, {'paths': 'many'}, 1000,
+                                  {'paths': 10}, {'volatility': 'normal'}])
+def test_invalid_forecast_rejected(spec):
+    with pytest.raises(ValueError):
+        montecarlo.options(spec)
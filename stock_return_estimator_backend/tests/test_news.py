@@ -0,0 +1,82 @@
+import pytest
+
+import news
+
+DAY = 86400
+NOW = 1_750_000_000
+
+
+@pytest.fixture(autouse=True)
+def archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(news, 'NEWS_DB', str(tmp_path / 'news.db'))
+
+
+def article(title, published, url=None, polarity=0.1):
+    return {'title': title, 'description': '', 'url': url or title, 'source': 'Test',
+            'publishedAt': published, 'sentiment': {'polarity': polarity, 'subjectivity': 0.5}}
+
+
+def iso(ts):
+    import time
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+
+def test_add_indexes_mentions_and_the_fetched_ticker():
+    news.register('AAPL', 'Apple Inc.')
+    news.register('MSFT', 'Microsoft Corporation')
+    items = [article('Apple Inc. beats estimates', iso(NOW - 100)),
+             article('AAPL and MSFT rally', iso(NOW - 200)),
+             article('Apple shares jump', iso(NOW - 300))]
+    assert news.add(items) == 3
+    assert news.query('AAPL', 7, now=NOW)[2] == 2
+    # Fetched for AAPL: already stored articles are indexed under it too
+    assert news.add(items, 'AAPL') == 0
+    assert news.query('AAPL', 7, now=NOW)[2] == 3
+    assert news.query('MSFT', 7, now=NOW)[2] == 1
+
+
+def test_register_indexes_archived_articles():
+    news.add([article('Tata Consultancy Services wins contract', iso(NOW - 100))])
+    news.register('TCS.NS', 'Tata Consultancy Services')
+    assert news.query('TCS.NS', 7, now=NOW)[2] == 1
+    assert news.resolve('tata consultancy services') == 'TCS.NS'
+
+
+def test_fetch_ranges_cover_only_what_is_missing():
+    news.register('AAPL', 'Apple Inc.')
+    assert news.fetch_ranges('AAPL', 30, now=NOW) == [(NOW - 30 * DAY, NOW)]
+    news.mark_fetched('AAPL', NOW - 7 * DAY, NOW)
+    later = NOW + 600
+    assert news.fetch_ranges('AAPL', 7, now=later) == [(NOW, later)]
+    assert news.fetch_ranges('AAPL', 30, now=later) == [(NOW, later), (later - 30 * DAY, NOW - 7 * DAY)]
+
+
+def test_truncated_refresh_leaves_only_the_missing_slice():
+    news.register('AAPL', 'Apple Inc.')
+    news.mark_fetched('AAPL', NOW - 30 * DAY, NOW)
+    # A later refresh cut short after its newest articles: the slice before them stays missing
+    later = NOW + 10 * DAY
+    news.mark_fetched('AAPL', later - 2 * DAY, later)
+    assert news.fetch_ranges('AAPL', 30, now=later) == [(NOW, later - 2 * DAY)]
+    news.mark_fetched('AAPL', NOW, later - 2 * DAY)
+    assert news.fetch_ranges('AAPL', 40, now=later) == []
+
+
+def test_mark_fetched_merges_only_touching_spans():
+    news.register('AAPL', 'Apple Inc.')
+    news.mark_fetched('AAPL', 0, 5)
+    news.mark_fetched('AAPL', 10, 20)
+    news.mark_fetched('AAPL', 30, 40)
+    news.mark_fetched('AAPL', 15, 30)
+    spans = news._connect().execute('SELECT covered_from, covered_to FROM coverage ORDER BY covered_from').fetchall()
+    assert spans == [(0, 5), (10, 40)]
+
+
+def test_stale_is_throttled_by_the_last_refresh():
+    news.register('AAPL', 'Apple Inc.')
+    assert news.stale('AAPL', now=NOW)
+    news.mark_refreshed('AAPL', now=NOW)
+    # Even with nothing covered (e.g. NewsAPI failed or was truncated), wait NEWS_TTL before trying again
+    assert not news.stale('AAPL', now=NOW + news.NEWS_TTL - 1)
+    assert news.stale('AAPL', now=NOW + news.NEWS_TTL + 1)
+    assert news.stale('MSFT', now=NOW)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from risk import bootstrap_options, bootstrap_summary, BOOTSTRAP_MAX_RESAMPLES
+
+
+def test_bootstrap_options_normalizes():
+    assert bootstrap_options('200', '5', '0.9') == (200, 5.0, 0.9)
+    assert bootstrap_options(200) == (200, None, 0.95)
+
+
+@pytest.mark.parametrize('resamples, block, confidence', [
+    ('lots', None, 0.95), (0, None, 0.95), (BOOTSTRAP_MAX_RESAMPLES + 1, None, 0.95),
+    (100, 0.5, 0.95), (100, 'x', 0.95), (100, None, 1), (100, None, 'high'),
+])
+def test_bootstrap_options_rejects(resamples, block, confidence):
+    with pytest.raises(ValueError):
+        bootstrap_options(resamples, block, confidence)
+
+
+def test_bootstrap_block_is_checked_against_the_bars():
+    r = np.random.default_rng(0).normal(0, 0.01, 50)
+    with pytest.raises(ValueError, match='number of bars'):
+        bootstrap_summary(r, r, np.ones(50), 10, block_length=60)
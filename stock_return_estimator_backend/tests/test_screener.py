@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from screener import Universe, top_k
+
+
+def test_top_k_matches_full_sort():
+    keys = np.random.default_rng(0).normal(size=100)
+    assert top_k(keys, 10).tolist() == np.argsort(-keys, kind='stable')[:10].tolist()
+    assert top_k(keys, 200, descending=False).tolist() == np.argsort(keys, kind='stable').tolist()
+
+
+def test_screen_filters_sorts_and_reports_as_of():
+    universe = Universe(['predicted_return', 'RSI_14'], capacity=1)
+    for i, ticker in enumerate(['A', 'B', 'C']):
+        universe.update(ticker, {'predicted_return': i / 100, 'RSI_14': 20 + 10 * i}, as_of=1_750_000_000)
+    result = universe.screen(['RSI_14 < 35'], top=5)
+    assert [r['ticker'] for r in result['results']] == ['B', 'A']
+    assert result['results'][0] == {'ticker': 'B', 'as_of': '2025-06-15', 'predicted_return': 0.01, 'RSI_14': 30.0}
+    assert (result['matched'], result['universe']) == (2, 3)
+    with pytest.raises(ValueError):
+        universe.screen(['RSI_14 ~ 3'])
+
+
+def test_drop_older_compacts_rows():
+    universe = Universe(['predicted_return'])
+    for ticker, as_of in [('OLD', 100), ('NEW', 300), ('MID', 200), ('NONE', None)]:
+        universe.update(ticker, {'predicted_return': as_of or 0}, version=ticker, as_of=as_of)
+    assert universe.drop_older(200) == 2
+    assert universe.tickers == ['NEW', 'MID'] and universe.version('MID') == 'MID'
+    assert universe.version('OLD') is None
+    universe.update('OLD', {'predicted_return': 1000.0}, as_of=400)
+    assert [r['ticker'] for r in universe.screen(top=3)['results']] == ['OLD', 'NEW', 'MID']
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from strategy import evaluate, positions, cost_rates
+
+
+def reference_positions(pred, threshold, holding_period, allow_short):
+    """The original run_backtest loop"""
+    n = len(pred)
+    signals = [0] * n
+    i = 0
+    while i < n:
+        if pred[i] > threshold:
+            for j in range(i, min(i + holding_period, n)):
+                signals[j] = 1
+            i += holding_period
+        elif allow_short and pred[i] < -threshold:
+            for j in range(i, min(i + holding_period, n)):
+                signals[j] = -1
+            i += holding_period
+        else:
+            i += 1
+    return np.array(signals)
+
+
+def test_positions_match_reference_loop():
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        pred = rng.normal(0, 0.01, int(rng.integers(1, 80)))
+        threshold = float(rng.normal(0, 0.01))
+        holding = int(rng.integers(1, 7))
+        short = bool(rng.integers(2))
+        np.testing.assert_array_equal(positions(pred, threshold, holding, short),
+                                      reference_positions(pred, threshold, holding, short))
+
+
+def test_positions_2d_match_columns():
+    rng = np.random.default_rng(1)
+    pred = rng.normal(0, 0.01, (60, 4))
+    pos = positions(pred, 0.002, 3, True)
+    for k in range(4):
+        np.testing.assert_array_equal(pos[:, k], reference_positions(pred[:, k], 0.002, 3, True))
+
+
+def test_costs_reduce_returns_on_position_changes():
+    returns = np.array([0.01, -0.02, 0.03, 0.0])
+    pos = np.array([1, 1, -1, 0])
+    result = evaluate(returns, pos, 0.001)
+    np.testing.assert_allclose(result['strategy_returns'], pos * returns - np.array([1, 0, 2, 1]) * 0.001)
+
+
+@pytest.mark.parametrize('commission', [[0.0], [0.0, 0.0]])
+def test_zero_cost_sweep_keeps_scenario_axis(commission):
+    rng = np.random.default_rng(2)
+    returns, pos = rng.normal(0, 0.01, 50), rng.integers(-1, 2, 50)
+    result = evaluate(returns, pos, cost_rates(commission))
+    assert result['strategy_returns'].shape == (50, len(commission))
+    np.testing.assert_allclose(result['strategy_return'], evaluate(returns, pos)['strategy_return'])
+
+
+def test_cost_sweep_matches_single_scenarios():
+    rng = np.random.default_rng(3)
+    returns, pos = rng.normal(0, 0.01, 100), rng.integers(-1, 2, 100)
+    atr, close = np.full(100, 2.0), np.full(100, 100.0)
+    sweep = evaluate(returns, pos, cost_rates([0.0, 0.001], [5.0, 0.0], [0.0, 0.1], atr, close))
+    for k, (c, s, a) in enumerate([(0.0, 5.0, 0.0), (0.001, 0.0, 0.1)]):
+        single = evaluate(returns, pos, cost_rates(c, s, a, atr, close))
+        assert sweep['strategy_return'][k] == pytest.approx(single['strategy_return'])
+        assert sweep['sharpe'][k] == pytest.approx(single['sharpe'])
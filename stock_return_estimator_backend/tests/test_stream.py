@@ -0,0 +1,38 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('pandas_ta')  # stream imports utils and with it the full app dependencies
+import stream  # noqa: E402
+
+
+@pytest.fixture
+def subscribed(monkeypatch):
+    calls = []
+
+    async def subscribe(client, tickers):
+        calls.append(tickers)
+        return []
+    monkeypatch.setattr(stream.hub, 'subscribe', subscribe)
+    return calls
+
+
+def handle(payload):
+    async def run():
+        client = stream.Client()
+        await stream._handle(client, json.dumps(payload))
+        return [json.loads(client.queue.get_nowait()) for _ in range(client.queue.qsize())]
+    return asyncio.run(run())
+
+
+def test_subscribe_normalizes_tickers(subscribed):
+    assert handle({'action': 'subscribe', 'tickers': [' tcs.ns ', '', 'INFY']}) == []
+    assert subscribed == [['TCS.NS', 'INFY']]
+
+
+@pytest.mark.parametrize('tickers', ['INFY', {'INFY': 1}, [1, 2], 5])
+def test_tickers_must_be_a_list_of_strings(subscribed, tickers):
+    messages = handle({'action': 'subscribe', 'tickers': tickers})
+    assert messages[0]['type'] == 'error' and 'tickers' in messages[0]['message']
+    assert subscribed == []
@@ -0,0 +1,110 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stages timed across the request pipeline; span() accepts only these names
+STAGES = ('download', 'feature_build', 'fit', 'predict', 'explain', 'forecast', 'backtest_loop', 'risk_metrics', 'bootstrap', 'portfolio_backtest', 'screen_refresh', 'screen', 'news', 'serialize')
+
+_lock = threading.Lock()
+_histograms = {}
+_cache_counts = {}
+
+# Per-request {stage: seconds}; None when the request did not ask for timings
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def observe(stage, seconds):
+    """Record a stage duration in the global histogram and the current request's timings"""
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = _Histogram()
+        hist.observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage):
+    """Time a block of code as one pipeline stage"""
+    if stage not in STAGES:
+        raise ValueError(f"Unknown stage '{stage}'; add it to tracing.STAGES")
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0)
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup as a hit or a miss"""
+    with _lock:
+        counts = _cache_counts.setdefault(cache, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def start_request_timings(enabled=True):
+    """Begin (or explicitly skip) collecting stage timings for the current request"""
+    timings = {} if enabled else None
+    _request_timings.set(timings)
+    return timings
+
+
+def format_timings(timings):
+    """Stage timings in milliseconds, for the optional `timings` response block"""
+    return {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+
+
+def format_server_timing(timings):
+    """Stage timings as a Server-Timing header value (milliseconds)"""
+    return ', '.join(f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in timings.items())
+
+
+def render_prometheus():
+    """Render all histograms and cache counters in the Prometheus text exposition format"""
+    lines = [
+        '# HELP giltgenius_stage_seconds Time spent in each request pipeline stage.',
+        '# TYPE giltgenius_stage_seconds histogram',
+    ]
+    with _lock:
+        histograms = {k: (list(v.counts), v.total, v.count) for k, v in _histograms.items()}
+        caches = {k: list(v) for k, v in _cache_counts.items()}
+    for stage, (counts, total, count) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS, counts):
+            cumulative += n
+            lines.append(f'giltgenius_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'giltgenius_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'giltgenius_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'giltgenius_stage_seconds_count{{stage="{stage}"}} {count}')
+    lines.append('# HELP giltgenius_cache_requests_total Cache lookups by result.')
+    lines.append('# TYPE giltgenius_cache_requests_total counter')
+    for cache, (hits, misses) in sorted(caches.items()):
+        lines.append(f'giltgenius_cache_requests_total{{cache="{cache}",result="hit"}} {hits}')
+        lines.append(f'giltgenius_cache_requests_total{{cache="{cache}",result="miss"}} {misses}')
+    lines.append('# HELP giltgenius_cache_hit_ratio Fraction of cache lookups served from cache.')
+    lines.append('# TYPE giltgenius_cache_hit_ratio gauge')
+    for cache, (hits, misses) in sorted(caches.items()):
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'giltgenius_cache_hit_ratio{{cache="{cache}"}} {ratio:.4f}')
+    return '\n'.join(lines) + '\n'
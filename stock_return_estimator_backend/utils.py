@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import yfinance as yf
 from sklearn.linear_model import LinearRegression
 import pandas_ta as ta
@@ -12,6 +13,18 @@ from textblob import TextBlob
 from datetime import datetime, timedelta
 import json
 from dotenv import load_dotenv
+from bars import BarStore, INTRADAY_INTERVALS
+from tracing import span
+from encoding import Series
+from strategy import run_strategy, evaluate, cost_rates, turnover
+from risk import rolling_metrics, sortino, downsample_indices, bootstrap_summary, DEFAULT_MAX_POINTS
+from screener import Universe
+from budget import limit_bars
+import rebalance
+import montecarlo
+from movers import MoversBoard, MOVERS_LOOKBACK_DAYS
+import movers
+import news
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,10 +34,15 @@ LATEST_MODEL = os.path.join(MODEL_DIR, 'latest_model.pkl')
 
 # NewsAPI configuration (you'll need to get a free API key from newsapi.org)
 NEWS_API_KEY = os.getenv('NEWS_API_KEY', 'your_news_api_key_here')
+NEWS_PAGE_SIZE = 100
+NEWS_MAX_PAGES = int(os.getenv('NEWS_MAX_PAGES', 5))  # per refresh; NewsAPI's free plan stops after the first page
 
 # Save the model to disk
 model_cache = {}
 
+def sentiment_label(polarity):
+    return 'positive' if polarity > 0.1 else 'negative' if polarity < -0.1 else 'neutral'
+
 def analyze_sentiment(text):
     """Analyze sentiment of text using TextBlob"""
     try:
@@ -32,7 +50,7 @@ def analyze_sentiment(text):
         return {
             'polarity': blob.sentiment.polarity,  # -1 to 1 (negative to positive)
             'subjectivity': blob.sentiment.subjectivity,  # 0 to 1 (objective to subjective)
-            'sentiment': 'positive' if blob.sentiment.polarity > 0.1 else 'negative' if blob.sentiment.polarity < -0.1 else 'neutral'
+            'sentiment': sentiment_label(blob.sentiment.polarity)
         }
     except Exception as e:
         return {
@@ -41,105 +59,144 @@ def analyze_sentiment(text):
             'sentiment': 'neutral'
         }
 
-def fetch_news_sentiment(ticker, days_back=7):
-    """Fetch news articles and analyze sentiment for a given ticker"""
-    try:
-        # Get company name from yfinance for better news search
-        stock = yf.Ticker(ticker)
-        company_name = stock.info.get('longName', ticker)
-        
-        # Search for news articles
-        url = f"https://newsapi.org/v2/everything"
+def score_article(article):
+    """Sentiment of one NewsAPI-style article, in the shape the app returns"""
+    title = article.get('title', '')
+    description = article.get('description', '')
+    
+    # Combine title and description for sentiment analysis
+    text = f"{title}. {description}"
+    return {
+        'title': title,
+        'description': description,
+        'url': article.get('url', ''),
+        'publishedAt': article.get('publishedAt', ''),
+        'source': (article.get('source') or {}).get('name', ''),
+        'sentiment': analyze_sentiment(text)
+    }
+
+def sentiment_summary(avg_polarity, count):
+    return {
+        'polarity': round(avg_polarity, 3),
+        'subjectivity': 0.5,  # Average subjectivity
+        'sentiment': sentiment_label(avg_polarity),
+        'article_count': count
+    }
+
+def score_articles(articles):
+    """Run sentiment analysis over NewsAPI-style articles and summarize the result"""
+    processed_articles = [score_article(article) for article in articles]
+    sentiments = [article['sentiment']['polarity'] for article in processed_articles]
+    avg_polarity = sum(sentiments) / len(sentiments) if sentiments else 0.0
+    return {
+        'articles': processed_articles,
+        'sentiment_summary': sentiment_summary(avg_polarity, len(processed_articles))
+    }
+
+def news_api_enabled():
+    return bool(NEWS_API_KEY) and NEWS_API_KEY != 'your_news_api_key_here'
+
+def news_api_articles(query, start, end):
+    """NewsAPI articles published between two epochs, newest first, over up to NEWS_MAX_PAGES pages.
+
+    Returns (articles, complete); complete is False when more matched than
+    were received. Returns (None, False) when NewsAPI rejects the query.
+    """
+    url = f"https://newsapi.org/v2/everything"
+    articles = []
+    for page in range(1, NEWS_MAX_PAGES + 1):
         params = {
-            'q': f'"{ticker}" OR "{company_name}"',
-            'from': (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d'),
-            'to': datetime.now().strftime('%Y-%m-%d'),
+            'q': query,
+            'from': datetime.fromtimestamp(start).strftime('%Y-%m-%dT%H:%M:%S'),
+            'to': datetime.fromtimestamp(end).strftime('%Y-%m-%dT%H:%M:%S'),
             'language': 'en',
             'sortBy': 'publishedAt',
             'apiKey': NEWS_API_KEY,
-            'pageSize': 20
+            'pageSize': NEWS_PAGE_SIZE,
+            'page': page
         }
-        
         response = requests.get(url, params=params, timeout=10)
+        if page > 1 and not response.ok:
+            break  # e.g. the plan's result limit; keep the pages already received
         response.raise_for_status()
         data = response.json()
-        
         if data.get('status') != 'ok':
-            return {
-                'error': 'News API error',
-                'articles': [],
-                'sentiment_summary': {'polarity': 0.0, 'subjectivity': 0.0, 'sentiment': 'neutral'}
-            }
-        
-        articles = data.get('articles', [])
-        if not articles:
-            return {
-                'error': 'No news articles found',
-                'articles': [],
-                'sentiment_summary': {'polarity': 0.0, 'subjectivity': 0.0, 'sentiment': 'neutral'}
-            }
-        
-        # Analyze sentiment for each article
-        sentiments = []
-        processed_articles = []
-        
-        for article in articles:
-            title = article.get('title', '')
-            description = article.get('description', '')
-            content = article.get('content', '')
-            
-            # Combine title and description for sentiment analysis
-            text = f"{title}. {description}"
-            sentiment = analyze_sentiment(text)
-            
-            processed_article = {
-                'title': title,
-                'description': description,
-                'url': article.get('url', ''),
-                'publishedAt': article.get('publishedAt', ''),
-                'source': article.get('source', {}).get('name', ''),
-                'sentiment': sentiment
-            }
-            
-            processed_articles.append(processed_article)
-            sentiments.append(sentiment['polarity'])
-        
-        # Calculate overall sentiment
-        if sentiments:
-            avg_polarity = sum(sentiments) / len(sentiments)
-            overall_sentiment = 'positive' if avg_polarity > 0.1 else 'negative' if avg_polarity < -0.1 else 'neutral'
+            if page > 1:
+                break
+            return None, False
+        batch = data.get('articles', [])
+        articles.extend(batch)
+        if len(batch) < NEWS_PAGE_SIZE or len(articles) >= data.get('totalResults', 0):
+            return articles, True
+    return articles, False
+
+def refresh_news(ticker, days_back=7):
+    """Pull the parts of a ticker's last days_back days missing from the news archive out of NewsAPI; returns an error or None"""
+    # Get company name from yfinance for better news search
+    stock = yf.Ticker(ticker)
+    company_name = stock.info.get('longName', ticker)
+    news.register(ticker, company_name)
+    news.mark_refreshed(ticker)
+    for start, end in news.fetch_ranges(ticker, days_back):
+        articles, complete = news_api_articles(f'"{ticker}" OR "{company_name}"', start, end)
+        if articles is None:
+            return 'News API error'
+        # Everything returned for the ticker is indexed under it, mentioned by name or not
+        news.add((score_article(article) for article in articles), ticker)
+        if complete:
+            news.mark_fetched(ticker, start, end)
         else:
-            avg_polarity = 0.0
-            overall_sentiment = 'neutral'
+            # Truncated, newest first: only back to the oldest article received is covered,
+            # and the slice before it is what the next refresh asks for
+            news.mark_fetched(ticker, news.epoch(articles[-1]['publishedAt']), end)
+            break
+    return None
+
+def fetch_news_sentiment(ticker, days_back=7):
+    """News sentiment for a ticker over the last days_back days, answered from the local news archive.
+
+    The archive is topped up from NewsAPI first when it was last refreshed
+    more than NEWS_TTL seconds ago; otherwise it answers with what it holds.
+    """
+    empty = {'articles': [], 'sentiment_summary': {'polarity': 0.0, 'subjectivity': 0.0, 'sentiment': 'neutral'}}
+    try:
+        ticker = news.resolve(ticker) or ticker.upper()
+        error = None
+        if news_api_enabled() and news.stale(ticker):
+            try:
+                error = refresh_news(ticker, days_back)
+            except requests.exceptions.RequestException as e:
+                error = f'Network error: {str(e)}'
+            except Exception as e:
+                # Answer from what the archive already holds
+                error = f'Error fetching news: {str(e)}'
         
-        return {
-            'articles': processed_articles,
-            'sentiment_summary': {
-                'polarity': round(avg_polarity, 3),
-                'subjectivity': 0.5,  # Average subjectivity
-                'sentiment': overall_sentiment,
-                'article_count': len(processed_articles)
-            }
-        }
+        with span('news'):
+            articles, avg_polarity, count = news.query(ticker, days_back)
+        if not count:
+            return {'error': error or 'No news articles found', **empty}
         
-    except requests.exceptions.RequestException as e:
         return {
-            'error': f'Network error: {str(e)}',
-            'articles': [],
-            'sentiment_summary': {'polarity': 0.0, 'subjectivity': 0.0, 'sentiment': 'neutral'}
+            'articles': [{
+                'title': a['title'],
+                'description': a['description'],
+                'url': a['url'],
+                'publishedAt': a['publishedAt'],
+                'source': a['source'],
+                'sentiment': {'polarity': a['polarity'], 'subjectivity': a['subjectivity'],
+                              'sentiment': sentiment_label(a['polarity'])}
+            } for a in articles],
+            'sentiment_summary': sentiment_summary(avg_polarity, count)
         }
+        
     except Exception as e:
-        return {
-            'error': f'Error fetching news: {str(e)}',
-            'articles': [],
-            'sentiment_summary': {'polarity': 0.0, 'subjectivity': 0.0, 'sentiment': 'neutral'}
-        }
+        return {'error': f'Error fetching news: {str(e)}', **empty}
 
-def get_stock_sentiment(ticker):
+def get_stock_sentiment(ticker, days_back=7):
     """Get comprehensive sentiment analysis for a stock"""
     try:
         # Fetch news sentiment
-        news_data = fetch_news_sentiment(ticker)
+        news_data = fetch_news_sentiment(ticker, days_back)
         
         # Get stock info for context
         stock = yf.Ticker(ticker)
@@ -265,69 +322,104 @@ def list_models():
         return []
     return [f for f in os.listdir(MODEL_DIR) if f.endswith('.pkl')]
 
-def fetch_and_predict(ticker, start, end, features=None, model_name=None):
-    # Only keep the date part (YYYY-MM-DD)
-    start = start[:10]
-    end = end[:10]
-    df = yf.download(ticker, start=start, end=end)
-    print('Downloaded DataFrame shape:', df.shape)
-    print('Columns:', df.columns)
+def download_prices(ticker, start, end, interval='1d'):
+    """Download OHLCV bars from yfinance with flat column names"""
+    with span('download'):
+        df = yf.download(ticker, start=start, end=end, interval=interval)
     if isinstance(df.columns, pd.MultiIndex):
         df.columns = df.columns.get_level_values(0)
-    if df.empty:
-        raise ValueError('No data returned for this ticker and date range.')
-    df['Return'] = df['Close'].pct_change().shift(-1)
-    df['Return_Lag_1'] = df['Close'].pct_change(1)
-    df['Return_Lag_5'] = df['Close'].pct_change(5)
-    df['MA_10'] = df['Close'].rolling(10).mean()
-    df['RSI_14'] = ta.rsi(df['Close'], length=14)
+    return df
+
+# Compact typed bar storage shared by all endpoints
+bar_store = BarStore(download_prices, max_entries=int(os.getenv('BAR_CACHE_ENTRIES', 256)))
+
+# Gainers/losers ranking, kept current by the bar store as daily bars arrive
+movers_board = MoversBoard(movers.universe())
+bar_store.subscribe(movers_board.on_bars)
+
+def load_prices(ticker, start, end, interval='1d', resample=None):
+    """Fetch bars through the bar store and expand them into a DataFrame.
+
+    Intraday intervals keep the full timestamp; daily bars only need the
+    date part (YYYY-MM-DD). `resample` aggregates to a coarser interval.
+    """
+    interval = interval or '1d'
+    if interval not in INTRADAY_INTERVALS:
+        start = start[:10]
+        end = end[:10]
+    bars = bar_store.get(ticker, start, end, interval)
+    if resample:
+        bars = bars.resample(resample)
+    return bars.to_frame()
+
+def load_recent_bars(ticker):
+    """Make sure the bar store holds a ticker's recent daily bars (the movers board and prediction stream update from them)"""
+    end = datetime.now()
+    start = end - timedelta(days=MOVERS_LOOKBACK_DAYS)
+    load_prices(ticker, start.strftime('%Y-%m-%d'), (end + timedelta(days=1)).strftime('%Y-%m-%d'))
+
+def build_features(df, columns=None):
+    """Add the target column and all technical indicators. Lags and windows count bars, not days.
+
+    With `columns`, only those columns (plus Return) are kept. The other
+    indicators are still computed for their warm-up rows, so the result has
+    exactly the rows of a full build, but never holds them as columns.
+    Returns a new frame; the caller's `df` is left unchanged.
+    """
+    keep = None if columns is None else {'Return', *columns}
+    valid = df.notna().all(axis=1).to_numpy()
+    out = df[[c for c in df.columns if keep is None or c in keep]].copy()
+
+    def add(name, values):
+        nonlocal valid
+        if keep is None or name in keep:
+            out[name] = values
+        else:
+            valid = valid & np.asarray(pd.notna(values))
+
+    add('Return', df['Close'].pct_change().shift(-1))
+    add('Return_Lag_1', df['Close'].pct_change(1))
+    add('Return_Lag_5', df['Close'].pct_change(5))
+    add('MA_10', df['Close'].rolling(10).mean())
+    add('RSI_14', ta.rsi(df['Close'], length=14))
     bb = ta.bbands(df['Close'], length=20)
-    if bb is not None:
-        df['BBL_20'] = bb['BBL_20_2.0']
-        df['BBM_20'] = bb['BBM_20_2.0']
-        df['BBU_20'] = bb['BBU_20_2.0']
-    else:
-        df['BBL_20'] = df['BBM_20'] = df['BBU_20'] = None
+    add('BBL_20', bb['BBL_20_2.0'] if bb is not None else None)
+    add('BBM_20', bb['BBM_20_2.0'] if bb is not None else None)
+    add('BBU_20', bb['BBU_20_2.0'] if bb is not None else None)
     # --- New indicators ---
     macd = ta.macd(df['Close'])
-    if macd is not None:
-        df['MACD'] = macd['MACD_12_26_9']
-        df['MACD_signal'] = macd['MACDs_12_26_9']
-        df['MACD_hist'] = macd['MACDh_12_26_9']
-    else:
-        df['MACD'] = df['MACD_signal'] = df['MACD_hist'] = None
+    add('MACD', macd['MACD_12_26_9'] if macd is not None else None)
+    add('MACD_signal', macd['MACDs_12_26_9'] if macd is not None else None)
+    add('MACD_hist', macd['MACDh_12_26_9'] if macd is not None else None)
     stoch = ta.stoch(df['High'], df['Low'], df['Close'])
-    if stoch is not None:
-        df['STOCH_k'] = stoch['STOCHk_14_3_3']
-        df['STOCH_d'] = stoch['STOCHd_14_3_3']
-    else:
-        df['STOCH_k'] = df['STOCH_d'] = None
-    df['ATR_14'] = ta.atr(df['High'], df['Low'], df['Close'], length=14)
-    df.dropna(inplace=True)
-
+    add('STOCH_k', stoch['STOCHk_14_3_3'] if stoch is not None else None)
+    add('STOCH_d', stoch['STOCHd_14_3_3'] if stoch is not None else None)
+    del bb, macd, stoch
+    add('ATR_14', ta.atr(df['High'], df['Low'], df['Close'], length=14))
+    valid = valid & out.notna().all(axis=1).to_numpy()
+    return out.drop(index=out.index[~valid])
+
+ALL_FEATURES = [
+    'Return_Lag_1', 'Return_Lag_5', 'MA_10', 'RSI_14',
+    'BBL_20', 'BBM_20', 'BBU_20',
+    'MACD', 'MACD_signal', 'MACD_hist',
+    'STOCH_k', 'STOCH_d', 'ATR_14'
+]
+
+def select_features(features=None):
+    """Requested features that exist, in request order; all features when none are valid"""
     # Default features if not specified
-    all_features = [
-        'Return_Lag_1', 'Return_Lag_5', 'MA_10', 'RSI_14',
-        'BBL_20', 'BBM_20', 'BBU_20',
-        'MACD', 'MACD_signal', 'MACD_hist',
-        'STOCH_k', 'STOCH_d', 'ATR_14'
-    ]
     if features is None:
-        features = all_features
-    else:
-        # Only keep valid features
-        features = [f for f in features if f in all_features]
-        if not features:
-            features = all_features
+        return list(ALL_FEATURES)
+    # Only keep valid features
+    features = [f for f in features if f in ALL_FEATURES]
+    return features or list(ALL_FEATURES)
 
-    print('Features requested:', features)
-    print('DataFrame columns after feature engineering:', df.columns)
-
-    X = df[features]
-    y = df['Return']
-
-    # Model logic
+def fit_model(X, y, model_name=None, persist=True):
+    """Load the named model (fitting it if missing) or fit a new one, saving it unless persist=False"""
     global model_cache
+    if not persist:
+        return LinearRegression().fit(X, y)
     if model_name:
         # Try to load model if specified
         try:
@@ -337,43 +429,167 @@ def fetch_and_predict(ticker, start, end, features=None, model_name=None):
             model_cache['model'] = model
             save_model(model_name)
     else:
-        model = LinearRegression().fit(X, y)
-        model_cache['model'] = model
-        save_model('latest_model.pkl')
+        model = use_model(LinearRegression().fit(X, y))
 
     # Always autosave the model under the loaded model's name after prediction
     if model_name:
         save_model(model_name)
+    return model
+
+def use_model(model):
+    """Make a fitted model the current model and save it as latest_model.pkl, as a default-model prediction does"""
+    model_cache['model'] = model
+    save_model('latest_model.pkl')
+    return model
+
+def fetch_and_predict(ticker, start, end, features=None, model_name=None, interval='1d', resample=None):
+    df = load_prices(ticker, start, end, interval, resample)
+    return predict_prices(df, features, model_name)
+
+def predict_prices(df, features=None, model_name=None, persist=True, forecast=None, return_model=False):
+    """CPU-bound part of fetch_and_predict: features, fit, prediction and SHAP.
+
+    persist=False fits a throwaway model (see fit_model), for batch jobs.
+    forecast (montecarlo.options) adds simulated price quantile bands.
+    return_model=True returns (result, fitted model).
+    """
+    if df.empty:
+        raise ValueError('No data returned for this ticker and date range.')
+    df, truncated = limit_bars(df, 'predict')
+    features = select_features(features)
+    # The forecast starts from the last bar, which has no target and is dropped below
+    last_close, index = float(df['Close'].iloc[-1]), df.index
+    with span('feature_build'):
+        # Only the requested features are kept as columns (column pruning)
+        df = build_features(df, features)
+
 
-    df['Predicted_Return'] = model.predict(X)
-    df['Strategy_Return'] = df['Predicted_Return'].apply(lambda r: 1 if r > 0 else 0) * df['Return']
-    df['Cumulative_Market'] = (1 + df['Return']).cumprod()
-    df['Cumulative_Strategy'] = (1 + df['Strategy_Return']).cumprod()
+    X = df[features]
+    y = df['Return']
+
+    # Model logic
+    with span('fit'):
+        model = fit_model(X, y, model_name, persist)
 
-    # Prediction for next day
-    latest = df.iloc[-1:][features]
-    next_day_pred = model.predict(latest)[0]
+    with span('predict'):
+        predicted = model.predict(X)
+        result = run_strategy(predicted, df['Return'].to_numpy())
+
+        # Prediction for next day
+        latest = df.iloc[-1:][features]
+        next_day_pred = model.predict(latest)[0]
 
     # SHAP explanation for the latest prediction
-    try:
-        explainer = shap.Explainer(model, X)
-        shap_values = explainer(latest)
-        shap_dict = dict(zip(features, shap_values.values[0]))
-    except Exception as e:
-        shap_dict = {f: 0.0 for f in features}  # fallback if SHAP fails
+    with span('explain'):
+        try:
+            explainer = shap.Explainer(model, X)
+            shap_values = explainer(latest)
+            shap_dict = dict(zip(features, shap_values.values[0]))
+        except Exception as e:
+            shap_dict = {f: 0.0 for f in features}  # fallback if SHAP fails
 
-    return {
+    output = {
         "predicted_return": round(float(next_day_pred), 4),
-        "market_returns": df['Cumulative_Market'].round(2).tolist()[-30:],
-        "strategy_returns": df['Cumulative_Strategy'].round(2).tolist()[-30:],
+        "market_returns": Series(result['cumulative_market'][-30:], 2),
+        "strategy_returns": Series(result['cumulative_strategy'][-30:], 2),
         "summary": {
-            "market": round(df['Cumulative_Market'].iloc[-1] * 100 - 100, 2),
-            "strategy": round(df['Cumulative_Strategy'].iloc[-1] * 100 - 100, 2),
-            "sharpe": round(df['Strategy_Return'].mean() / df['Strategy_Return'].std(), 2)
+            "market": round(float(result['market_return']), 2),
+            "strategy": round(float(result['strategy_return']), 2),
+            "sharpe": round(float(result['sharpe']), 2)
         },
         "features_used": features,
         "shap_values": shap_dict
     }
+    if forecast:
+        output["forecast"] = forecast_paths(last_close, index, y.to_numpy() - predicted, next_day_pred, float(y.mean()), forecast)
+    if truncated:
+        output["truncated_bars"] = truncated
+    return (output, model) if return_model else output
+
+def forecast_paths(last_close, index, residuals, first_mean, mean, options):
+    """Monte Carlo quantile bands of the next `horizon` closes, from the model's residuals"""
+    with span('forecast'):
+        sim = montecarlo.simulate(last_close, residuals, first_mean, mean, **options)
+    result = dict(options, last_price=round(last_close, 2), prob_up=round(float(sim['prob_up']), 4),
+                  mean=Series(sim['mean'], 2), quantiles={f'{q:g}': Series(v, 2) for q, v in sim['quantiles'].items()})
+    if (index.normalize() == index).all():
+        # Daily bars: label the steps with the coming business days
+        result['dates'] = pd.bdate_range(index[-1] + pd.offsets.BDay(1), periods=options['horizon']).strftime('%Y-%m-%d').tolist()
+    return result
+
+# Screener universe: latest indicators and predicted next-bar return of every cached daily ticker
+universe = Universe(['predicted_return', 'Close'] + ALL_FEATURES)
+UNIVERSE_MAX_AGE_SESSIONS = int(os.getenv('UNIVERSE_MAX_AGE_SESSIONS', 3))  # older last bars are not screened
+
+def universe_cutoff():
+    """Epoch seconds of the oldest last bar a screener row may be computed from"""
+    return (pd.Timestamp.now('UTC').normalize() - pd.offsets.BDay(UNIVERSE_MAX_AGE_SESSIONS)).timestamp()
+
+def universe_row(df):
+    """Latest indicator values and predicted next-bar return for one ticker, as predict_prices computes them"""
+    df = build_features(df, ['Close'] + ALL_FEATURES)
+    if len(df) < len(ALL_FEATURES) + 2:
+        return None
+    X = df[ALL_FEATURES]
+    model = LinearRegression().fit(X, df['Return'])
+    latest = df.iloc[-1]
+    row = {c: float(latest[c]) for c in ['Close'] + ALL_FEATURES}
+    row['predicted_return'] = float(model.predict(X.iloc[-1:])[0])
+    return row
+
+def bars_version(bars):
+    """Changes whenever a bar is added or the latest bar is revised"""
+    return (len(bars), bars.last_ts, float(bars.close[-1]))
+
+def latest_prediction(ticker, bars):
+    """universe_row for a ticker's newly arrived bars, also stored in the screener universe"""
+    row = universe_row(bars.to_frame())
+    if row is not None:
+        universe.update(ticker, row, bars_version(bars), bars.last_ts)
+    return row
+
+def refresh_universe(interval='1d'):
+    """Recompute screener rows for cached tickers whose bars changed since their row was built,
+    and drop rows whose last bar is more than UNIVERSE_MAX_AGE_SESSIONS sessions old"""
+    cutoff = universe_cutoff()
+    stale = 0
+    for ticker in bar_store.tickers(interval):
+        bars = bar_store.cached(ticker, interval)
+        if bars is None or not len(bars) or bars.last_ts < cutoff:
+            # Only an old slice of history is cached (e.g. from a backtest), which is not current
+            continue
+        version = bars_version(bars)
+        held = universe.version(ticker)
+        if held is not None and (held == version or version[1] < held[1]):
+            # Unchanged, or a historical range replaced the recent bars
+            continue
+        row = universe_row(bars.to_frame())
+        if row is not None:
+            universe.update(ticker, row, version, bars.last_ts)
+            stale += 1
+    universe.drop_older(cutoff)
+    return stale
+
+def screen_universe(filters=None, sort_by='predicted_return', top=20, descending=True, columns=None):
+    """Bring the universe up to date, then rank it"""
+    with span('screen_refresh'):
+        refreshed = refresh_universe()
+    with span('screen'):
+        result = universe.screen(filters, sort_by, top, descending, columns)
+    result['refreshed'] = refreshed
+    return result
+
+def retrain_model(ticker, start, end, features=None, model_name='latest_model.pkl', interval='1d'):
+    """Fit a fresh model on a ticker's history and save it under model_name"""
+    global model_cache
+    df = load_prices(ticker, start, end, interval)
+    if df.empty:
+        raise ValueError('No data returned for this ticker and date range.')
+    features = select_features(features)
+    df = build_features(df, features)
+    model_cache['model'] = LinearRegression().fit(df[features], df['Return'])
+    save_model(model_name)
+    return {'model_name': model_name, 'ticker': ticker, 'rows': len(df), 'features_used': features}
 
 def safe_stat(val):
     if val is None or isinstance(val, str):
@@ -382,143 +598,130 @@ def safe_stat(val):
         return 0.0
     return float(val)
 
-def run_backtest(ticker, start, end, features=None, model_name=None, threshold=0.0, holding_period=1, allow_short=False):
-    start = start[:10]
-    end = end[:10]
-    df = yf.download(ticker, start=start, end=end)
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(0)
+def run_backtest(ticker, start, end, features=None, model_name=None, threshold=0.0, holding_period=1, allow_short=False, interval='1d', resample=None, risk_window=None, risk_points=DEFAULT_MAX_POINTS, commission=0.0, slippage_bps=0.0, atr_slippage=0.0, cost_sweep=None, bootstrap=None, bootstrap_block=None, confidence=0.95, persist=True):
+    df = load_prices(ticker, start, end, interval, resample)
+    return backtest_prices(df, features, model_name, threshold, holding_period, allow_short, interval, resample, risk_window, risk_points,
+                           commission, slippage_bps, atr_slippage, cost_sweep, bootstrap, bootstrap_block, confidence, persist)
+
+def backtest_prices(df, features=None, model_name=None, threshold=0.0, holding_period=1, allow_short=False, interval='1d', resample=None, risk_window=None, risk_points=DEFAULT_MAX_POINTS,
+                    commission=0.0, slippage_bps=0.0, atr_slippage=0.0, cost_sweep=None, bootstrap=None, bootstrap_block=None, confidence=0.95, persist=True):
+    """CPU-bound part of run_backtest, starting from downloaded bars"""
     if df.empty:
         raise ValueError('No data returned for this ticker and date range.')
-    df['Return'] = df['Close'].pct_change().shift(-1)
-    df['Return_Lag_1'] = df['Close'].pct_change(1)
-    df['Return_Lag_5'] = df['Close'].pct_change(5)
-    df['MA_10'] = df['Close'].rolling(10).mean()
-    df['RSI_14'] = ta.rsi(df['Close'], length=14)
-    bb = ta.bbands(df['Close'], length=20)
-    if bb is not None:
-        df['BBL_20'] = bb['BBL_20_2.0']
-        df['BBM_20'] = bb['BBM_20_2.0']
-        df['BBU_20'] = bb['BBU_20_2.0']
-    else:
-        df['BBL_20'] = df['BBM_20'] = df['BBU_20'] = None
-    macd = ta.macd(df['Close'])
-    if macd is not None:
-        df['MACD'] = macd['MACD_12_26_9']
-        df['MACD_signal'] = macd['MACDs_12_26_9']
-        df['MACD_hist'] = macd['MACDh_12_26_9']
-    else:
-        df['MACD'] = df['MACD_signal'] = df['MACD_hist'] = None
-    stoch = ta.stoch(df['High'], df['Low'], df['Close'])
-    if stoch is not None:
-        df['STOCH_k'] = stoch['STOCHk_14_3_3']
-        df['STOCH_d'] = stoch['STOCHd_14_3_3']
-    else:
-        df['STOCH_k'] = df['STOCH_d'] = None
-    df['ATR_14'] = ta.atr(df['High'], df['Low'], df['Close'], length=14)
-    df.dropna(inplace=True)
+    df, truncated = limit_bars(df, 'backtest')
+    features = select_features(features)
+    with span('feature_build'):
+        df = build_features(df, features + ['Close', 'ATR_14'])
 
     if df.empty:
         raise ValueError('No data available for this ticker and date range. Try a different range or ticker.')
 
-    all_features = [
-        'Return_Lag_1', 'Return_Lag_5', 'MA_10', 'RSI_14',
-        'BBL_20', 'BBM_20', 'BBU_20',
-        'MACD', 'MACD_signal', 'MACD_hist',
-        'STOCH_k', 'STOCH_d', 'ATR_14'
-    ]
-    if features is None:
-        features = all_features
-    else:
-        features = [f for f in features if f in all_features]
-        if not features:
-            features = all_features
-
     X = df[features]
     y = df['Return']
 
-    global model_cache
-    if model_name:
-        try:
-            model = load_model(model_name)
-        except Exception:
-            model = LinearRegression().fit(X, y)
-            model_cache['model'] = model
-            save_model(model_name)
-    else:
-        model = LinearRegression().fit(X, y)
-        model_cache['model'] = model
-        save_model('latest_model.pkl')
+    with span('fit'):
+        model = fit_model(X, y, model_name, persist)
 
-    if model_name:
-        save_model(model_name)
+    with span('predict'):
+        predicted = model.predict(X)
 
-    df['Predicted_Return'] = model.predict(X)
-    n = len(df)
-    signals = [0] * n
-    strat_returns = [0.0] * n
-    i = 0
-    while i < n:
-        pred = df['Predicted_Return'].iloc[i]
-        if pred > threshold:
-            # Buy and hold for holding_period days
-            for j in range(i, min(i + holding_period, n)):
-                signals[j] = 1
-                strat_returns[j] = df['Return'].iloc[j]
-            i += holding_period
-        elif allow_short and pred < -threshold:
-            # Short and hold for holding_period days
-            for j in range(i, min(i + holding_period, n)):
-                signals[j] = -1
-                strat_returns[j] = -df['Return'].iloc[j]
-            i += holding_period
-        else:
-            i += 1
-    df['Signal'] = signals
-    df['Strategy_Return'] = strat_returns
-    df['Cumulative_Market'] = (1 + df['Return']).cumprod()
-    df['Cumulative_Strategy'] = (1 + df['Strategy_Return']).cumprod()
-
-    # Trade stats
-    trades = sum(1 for s in signals if s != 0)
-    win_trades = sum(1 for s, r in zip(signals, strat_returns) if s != 0 and r > 0)
-    total_trades = sum(1 for s in signals if s != 0)
-    win_rate = win_trades / total_trades if total_trades > 0 else 0
-    max_drawdown = (df['Cumulative_Strategy'].cummax() - df['Cumulative_Strategy']).max()
-
-    sharpe = df['Strategy_Return'].mean() / df['Strategy_Return'].std()
-    trades = int(trades)
-    win_rate = win_trades / total_trades if total_trades > 0 else 0
-    max_drawdown = (df['Cumulative_Strategy'].cummax() - df['Cumulative_Strategy']).max()
+    with span('backtest_loop'):
+        atr, close = df['ATR_14'].to_numpy(), df['Close'].to_numpy()
+        costs = cost_rates(commission, slippage_bps, atr_slippage, atr, close)
+        result = run_strategy(predicted, df['Return'].to_numpy(),
+                              threshold, holding_period, allow_short, costs)
+        if cost_sweep:
+            sweep = sweep_costs(df['Return'].to_numpy(), result['positions'], cost_sweep, atr, close)
 
     summary = {
-        'market_return': df['Cumulative_Market'].iloc[-1] * 100 - 100,
-        'strategy_return': df['Cumulative_Strategy'].iloc[-1] * 100 - 100,
-        'sharpe': sharpe,
-        'trades': trades,
-        'win_rate': win_rate * 100,
-        'max_drawdown': max_drawdown * 100
+        'market_return': result['market_return'],
+        'strategy_return': result['strategy_return'],
+        'sharpe': result['sharpe'],
+        'trades': int(result['trades']),
+        'win_rate': result['win_rate'],
+        'max_drawdown': result['max_drawdown']
     }
     # Sanitize and round all float stats except trades
     for k in summary:
         if k != 'trades':
             summary[k] = round(safe_stat(summary[k]), 2)
-    return {
-        'dates': df.index.strftime('%Y-%m-%d').tolist(),
-        'signals': df['Signal'].tolist(),
-        'predicted_returns': df['Predicted_Return'].round(4).tolist(),
-        'actual_returns': df['Return'].round(4).tolist(),
-        'strategy_returns': df['Strategy_Return'].round(4).tolist(),
-        'cumulative_market': df['Cumulative_Market'].round(4).tolist(),
-        'cumulative_strategy': df['Cumulative_Strategy'].round(4).tolist(),
+    dates = df.index.strftime('%Y-%m-%d %H:%M' if (resample or interval) in INTRADAY_INTERVALS else '%Y-%m-%d').tolist()
+    output = {
+        'dates': dates,
+        'signals': Series(result['positions']),
+        'predicted_returns': Series(predicted, 4),
+        'actual_returns': Series(df['Return'].to_numpy(), 4),
+        'strategy_returns': Series(result['strategy_returns'], 4),
+        'cumulative_market': Series(result['cumulative_market'], 4),
+        'cumulative_strategy': Series(result['cumulative_strategy'], 4),
         'summary': summary,
         'features_used': features,
         'threshold': threshold,
         'holding_period': holding_period,
-        'allow_short': allow_short
+        'allow_short': allow_short,
+        'interval': resample or interval,
+        'costs': {
+            'commission': commission,
+            'slippage_bps': slippage_bps,
+            'atr_slippage': atr_slippage,
+            'total_cost_pct': round(safe_stat(float(np.sum(turnover(result['positions']) * costs)) * 100), 4)
+        }
+    }
+    if cost_sweep:
+        output['cost_sweep'] = sweep
+    if truncated:
+        output['truncated_bars'] = truncated
+    if bootstrap:
+        with span('bootstrap'):
+            ci = bootstrap_summary(result['strategy_returns'], df['Return'].to_numpy(), result['positions'],
+                                   bootstrap, bootstrap_block, confidence)
+        ci['intervals'] = {name: {k: round(safe_stat(v), 4) for k, v in bounds.items()}
+                           for name, bounds in ci['intervals'].items()}
+        output['bootstrap'] = ci
+    if risk_window:
+        with span('risk_metrics'):
+            output['rolling_metrics'] = rolling_risk(result['strategy_returns'], result['positions'], dates, risk_window, risk_points)
+    return output
+
+def sweep_costs(returns, positions, scenarios, atr, close):
+    """Evaluate one set of positions under many cost assumptions in a single batched pass"""
+    commission = [float(sc.get('commission', 0.0)) for sc in scenarios]
+    slippage_bps = [float(sc.get('slippage_bps', 0.0)) for sc in scenarios]
+    atr_slippage = [float(sc.get('atr_slippage', 0.0)) for sc in scenarios]
+    result = evaluate(returns, positions, cost_rates(commission, slippage_bps, atr_slippage, atr, close))
+    sweep = []
+    for k in range(len(scenarios)):
+        sweep.append({
+            'commission': commission[k],
+            'slippage_bps': slippage_bps[k],
+            'atr_slippage': atr_slippage[k],
+            'strategy_return': round(safe_stat(result['strategy_return'][k]), 2),
+            'sharpe': round(safe_stat(result['sharpe'][k]), 2),
+            'win_rate': round(safe_stat(result['win_rate'][k]), 2),
+            'max_drawdown': round(safe_stat(result['max_drawdown'][k]), 2),
+        })
+    return sweep
+
+def rolling_risk(strategy_returns, positions, dates, window, max_points=DEFAULT_MAX_POINTS):
+    """Rolling risk series for a backtest, downsampled to at most max_points per series"""
+    window = int(window)
+    metrics = rolling_metrics(strategy_returns, positions, window)
+    idx = downsample_indices(len(strategy_returns) - window + 1, max_points)
+    block = {
+        'window': window,
+        'sortino': round(sortino(strategy_returns), 2),
+        'dates': [dates[window - 1 + i] for i in idx],
     }
+    for name, values in metrics.items():
+        block[name] = Series(values[idx], 4)
+    return block
 
 def optimize_portfolio(tickers, quantities, risk_free_rate=0.02):
+    prices, dropped = load_portfolio_prices(tickers, quantities)
+    return optimize_prices(prices, risk_free_rate, dropped)
+
+def load_portfolio_prices(tickers, quantities):
+    """Download one year of closing prices, returning (prices, dropped_tickers)"""
     import yfinance as yf
     import numpy as np
     import pandas as pd
@@ -568,6 +771,10 @@ def optimize_portfolio(tickers, quantities, risk_free_rate=0.02):
         if isinstance(adj_close, pd.Series):
             adj_close = adj_close.to_frame(name=tickers[0])
         prices = adj_close
+    return prices, dropped
+
+def optimize_prices(prices, risk_free_rate=0.02, dropped=None):
+    """Max-Sharpe weights for a price panel (CPU-bound part of optimize_portfolio)"""
     mu = expected_returns.mean_historical_return(prices)
     S = risk_models.sample_cov(prices)
     ef = EfficientFrontier(mu, S)
@@ -587,6 +794,56 @@ def optimize_portfolio(tickers, quantities, risk_free_rate=0.02):
         result['warning'] = f"The following tickers were excluded due to missing data: {', '.join(dropped)}"
     return result
 
+PANEL_MAX_MISSING = 0.05  # tickers missing more than this share of the panel's bars are dropped
+
+def price_panel(closes):
+    """Align {ticker: close Series} into one price panel, returning (prices, dropped_tickers)"""
+    dropped = [t for t, c in closes.items() if c is None or c.empty]
+    prices = pd.concat({t: c for t, c in closes.items() if t not in dropped}, axis=1) if len(dropped) < len(closes) else pd.DataFrame()
+    if prices.empty:
+        raise ValueError('No price data found for the given tickers and period.')
+    sparse = prices.columns[prices.isna().mean() > PANEL_MAX_MISSING]
+    dropped += list(sparse)
+    prices = prices.drop(columns=sparse).ffill().dropna()
+    if prices.shape[1] == 0:
+        raise ValueError('No ticker has enough price history for this period.')
+    return prices, dropped
+
+def load_price_panel(tickers, start, end):
+    """Closing prices for many tickers from the bar store, as (prices, dropped_tickers)"""
+    closes = {}
+    for ticker in tickers:
+        try:
+            closes[ticker] = load_prices(ticker, start, end)['Close'].astype(np.float64)
+        except Exception:
+            closes[ticker] = None
+    return price_panel(closes)
+
+def backtest_portfolio_prices(prices, lookback=252, rebalance_every='M', risk_free_rate=0.02, cost_bps=0.0, dropped=None):
+    """Periodically re-optimized max-Sharpe portfolio over a price panel (CPU-bound)"""
+    with span('portfolio_backtest'):
+        run = rebalance.backtest(prices, lookback, rebalance_every, risk_free_rate, cost_bps)
+    curve, summary = rebalance.summarize(run['returns'], risk_free_rate)
+    tickers = list(prices.columns)
+    result = {
+        'dates': run['dates'].strftime('%Y-%m-%d').tolist(),
+        'cumulative_portfolio': Series(curve, 4),
+        'summary': {k: round(safe_stat(v), 2) for k, v in summary.items()},
+        'rebalances': [
+            {
+                'date': prices.index[d].strftime('%Y-%m-%d'),
+                'turnover': round(turnover, 4),
+                'weights': {tickers[i]: round(float(weights[i]), 5) for i in np.flatnonzero(weights)},
+            }
+            for d, weights, turnover in run['rebalances']
+        ],
+        'failed_solves': run['failed_solves'],
+    }
+    result['summary']['average_turnover'] = round(float(np.mean([t for _, _, t in run['rebalances']])), 4)
+    if dropped:
+        result['warning'] = f"The following tickers were excluded due to missing data: {', '.join(dropped)}"
+    return result
+
 def delete_model(model_name):
     path = os.path.join(MODEL_DIR, model_name)
     if os.path.exists(path):
@@ -1,13 +1,73 @@
+import os
+import sys
 import streamlit as st
 import pandas as pd
 import yfinance as yf
 from sklearn.linear_model import LinearRegression
-import matplotlib.pyplot as plt
+
+# Share the backend's compact bar store for downloads
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stock_return_estimator_backend'))
+from bars import BarStore
+from strategy import run_strategy
+
+FEATURES = ['Return_Lag_1', 'Return_Lag_5', 'MA_10']
+CACHE_ENTRIES = 32     # (ticker, start, end) combinations kept per cache
+CACHE_TTL = 60 * 60    # seconds
 
 st.set_page_config(page_title="Stock Return Estimator", layout="wide")
 
 st.title("📈 Stock Return Estimator")
 
+
+def download(ticker, start, end, interval='1d'):
+    df = yf.download(ticker, start=start, end=end, interval=interval)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    return df
+
+
+# --- Cached data and model layer (shared across sessions, LRU-bounded) ---
+@st.cache_resource
+def get_bar_store():
+    return BarStore(download, ttl=CACHE_TTL, max_entries=64)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def load_features(ticker, start, end):
+    df = get_bar_store().get(ticker, start, end).to_frame()
+    df['Return'] = df['Close'].pct_change().shift(-1)
+    df['Return_Lag_1'] = df['Close'].pct_change(1)
+    df['Return_Lag_5'] = df['Close'].pct_change(5)
+    df['MA_10'] = df['Close'].rolling(10).mean()
+    df.dropna(inplace=True)
+    return df
+
+
+@st.cache_resource(max_entries=CACHE_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def fit_model(ticker, start, end):
+    df = load_features(ticker, start, end)
+    return LinearRegression().fit(df[FEATURES], df['Return'])
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def predict_series(ticker, start, end):
+    """Precompute everything the page renders: the cumulative curves and the recent-predictions table"""
+    df = load_features(ticker, start, end).copy()
+    if df.empty:
+        return None, None
+    model = fit_model(ticker, start, end)
+    df['Predicted_Return'] = model.predict(df[FEATURES])
+
+    # --- Strategy Simulation ---
+    result = run_strategy(df['Predicted_Return'].to_numpy(), df['Return'].to_numpy())
+    chart = pd.DataFrame({
+        'Buy & Hold': result['cumulative_market'],
+        'Model Strategy': result['cumulative_strategy'],
+    }, index=df.index)
+    recent = df[['Close', 'Predicted_Return', 'Return']].tail(10)
+    return chart, recent
+
+
 # --- Sidebar Inputs ---
 st.sidebar.header("Stock Settings")
 ticker = st.sidebar.text_input("Enter Stock Ticker", value="AAPL")
@@ -16,34 +76,17 @@ end_date = st.sidebar.date_input("End Date", value=pd.to_datetime("2024-01-01"))
 
 if st.sidebar.button("Fetch and Predict"):
     with st.spinner("Fetching data..."):
-        df = yf.download(ticker, start=start_date, end=end_date)
-        df['Return'] = df['Close'].pct_change().shift(-1)
-        df['Return_Lag_1'] = df['Close'].pct_change(1)
-        df['Return_Lag_5'] = df['Close'].pct_change(5)
-        df['MA_10'] = df['Close'].rolling(10).mean()
-        df.dropna(inplace=True)
-
-        # --- Model Training ---
-        X = df[['Return_Lag_1', 'Return_Lag_5', 'MA_10']]
-        y = df['Return']
-        model = LinearRegression().fit(X, y)
-        df['Predicted_Return'] = model.predict(X)
-
-        # --- Strategy Simulation ---
-        df['Strategy_Return'] = df['Predicted_Return'].apply(lambda x: 1 if x > 0 else 0) * df['Return']
-        df['Cumulative_Market'] = (1 + df['Return']).cumprod()
-        df['Cumulative_Strategy'] = (1 + df['Strategy_Return']).cumprod()
+        chart, recent = predict_series(ticker.strip().upper(), start_date, end_date)
 
+    if chart is None:
+        st.error("No data returned for this ticker and date range.")
+    else:
         # --- Results ---
         st.success("Prediction complete!")
 
         st.subheader("📊 Cumulative Returns")
-        fig, ax = plt.subplots()
-        ax.plot(df.index, df['Cumulative_Market'], label='Buy & Hold')
-        ax.plot(df.index, df['Cumulative_Strategy'], label='Model Strategy')
-        ax.legend()
-        ax.set_title(f"{ticker} Strategy vs Market")
-        st.pyplot(fig)
+        st.caption(f"{ticker} Strategy vs Market")
+        st.line_chart(chart)
 
         st.subheader("📈 Recent Predictions")
-        st.dataframe(df[['Close', 'Predicted_Return', 'Return']].tail(10).style.format("{:.4f}"))
+        st.dataframe(recent.style.format("{:.4f}"))